@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Semantic answer cache for repeated questions.
+
+Answers are stored in SQLite with the (truncated, unit-length) embedding of the
+question. A lookup returns the stored answer of the most similar question if it
+is at least ANSWER_CACHE_THRESHOLD cosine-similar, younger than the TTL, and
+was answered from the same collection contents: each entry records a
+fingerprint of the collection, and entries from an older fingerprint are
+dropped as soon as a different one is looked up. Least-recently-used entries
+are evicted past ANSWER_CACHE_MAX_ENTRIES.
+
+Hit and miss counts are kept per process and as lifetime totals in the
+database, since the TUI runs one query.py process per question.
+
+    python answer_cache.py stats
+    python answer_cache.py clear
+"""
+
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+
+import numpy as np
+
+# Configuration
+ANSWER_CACHE_PATH = Path(__file__).parent / "answer_cache.sqlite"
+ANSWER_CACHE_THRESHOLD = 0.95  # cosine similarity of the questions
+ANSWER_CACHE_TTL_SECONDS = 7 * 24 * 3600
+ANSWER_CACHE_MAX_ENTRIES = 2000
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    sources: list[dict]
+    similarity: float
+
+
+class AnswerCache:
+    """SQLite-backed answer cache matched by question embedding, with TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: float = ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+    ):
+        self.path = Path(path or ANSWER_CACHE_PATH)
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # The query server answers from several threads; self.lock serialises access
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL,"
+            " question TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " answer TEXT NOT NULL,"
+            " sources TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.commit()
+
+    def _count(self, name: str):
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def lookup(self, vector: list[float], fingerprint: str) -> CachedAnswer | None:
+        """Answer of the most similar cached question, or None (counted as a miss)."""
+        query = np.asarray(vector, dtype=np.float32)
+        now = time.time()
+        with self.lock:
+            # A new fingerprint means the collection changed since these were answered
+            stale = self.conn.execute(
+                "DELETE FROM answers WHERE fingerprint != ? OR created < ?", (fingerprint, now - self.ttl)
+            ).rowcount
+            self.evictions += stale
+
+            rows = self.conn.execute("SELECT id, vector FROM answers").fetchall()
+            best_id, best_score = None, -1.0
+            if rows:
+                matrix = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float32).reshape(len(rows), -1)
+                if matrix.shape[1] == len(query):
+                    scores = matrix @ query
+                    best = int(scores.argmax())
+                    best_id, best_score = rows[best][0], float(scores[best])
+
+            if best_id is None or best_score < self.threshold:
+                self.misses += 1
+                self._count("misses")
+                self.conn.commit()
+                return None
+
+            question, answer, sources = self.conn.execute(
+                "SELECT question, answer, sources FROM answers WHERE id = ?", (best_id,)
+            ).fetchone()
+            self.conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, best_id))
+            self.hits += 1
+            self._count("hits")
+            self.conn.commit()
+        return CachedAnswer(question, answer, json.loads(sources), best_score)
+
+    def put(self, question: str, vector: list[float], fingerprint: str, answer: str, sources: list[dict]):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO answers (fingerprint, question, vector, answer, sources, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    fingerprint,
+                    question,
+                    np.asarray(vector, dtype=np.float32).tobytes(),
+                    answer,
+                    json.dumps(sources),
+                    now,
+                    now,
+                ),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Drop least-recently-used entries beyond max_entries."""
+        excess = self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+
+    def clear(self) -> int:
+        """Drop every cached answer. Returns how many there were."""
+        with self.lock:
+            removed = self.conn.execute("DELETE FROM answers").rowcount
+            self.conn.commit()
+        return removed
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            totals = dict(self.conn.execute("SELECT name, value FROM counters"))
+        lookups = self.hits + self.misses
+        total_hits, total_misses = totals.get("hits", 0), totals.get("misses", 0)
+        total_lookups = total_hits + total_misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "total_hits": total_hits,
+            "total_misses": total_misses,
+            "total_hit_rate": total_hits / total_lookups if total_lookups else 0.0,
+        }
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"Answer cache: {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.0%}), "
+                f"{s['entries']} entries; lifetime {s['total_hits']} hits, "
+                f"{s['total_misses']} misses ({s['total_hit_rate']:.0%})")
+
+    def close(self):
+        self.conn.close()
+
+
+_default_cache: AnswerCache | None = None
+_default_lock = threading.Lock()
+
+
+def get_default_answer_cache() -> AnswerCache:
+    """Process-wide cache at ANSWER_CACHE_PATH, opened on first use."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AnswerCache()
+        return _default_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the semantic answer cache")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("--path", type=Path, default=ANSWER_CACHE_PATH)
+    args = parser.parse_args()
+
+    if not args.path.exists():
+        print(f"No answer cache at {args.path}")
+        sys.exit(1)
+
+    cache = AnswerCache(args.path)
+    if args.command == "stats":
+        print(cache.summary())
+    else:
+        print(f"Removed {cache.clear()} cached answers")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Benchmark for chunk_text: legacy re-encoding chunker vs the encode-once chunker
+in pipeline.py.
+
+Builds synthetic books of increasing page count (up to 400 pages) from PDF pages
+or query_results.json passages, reports time per page for both chunkers, and
+compares the chunks they produce.
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import tiktoken
+
+from pipeline import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    PDF_DIR,
+    Chunk,
+    chunk_text,
+    extract_text_from_pdf,
+)
+
+RESULTS_PATH = Path(__file__).parent / "query_results.json"
+BOOK_PAGES = 400  # largest book size benchmarked
+
+
+def count_tokens(text: str, encoding) -> int:
+    """Count tokens in text."""
+    return len(encoding.encode(text))
+
+
+def chunk_text_legacy(
+    pages: list[tuple[int, str]],
+    book_name: str,
+    pdf_filename: str,
+    encoding,
+) -> list[Chunk]:
+    """The original chunker: re-encodes the accumulated buffer on every split."""
+    chunks = []
+    chunk_index = 0
+
+    # Combine all text with page markers
+    current_text = ""
+    current_page = pages[0][0] if pages else 1
+    current_tokens = 0
+
+    for page_num, page_text in pages:
+        # Clean the text
+        page_text = re.sub(r'\s+', ' ', page_text).strip()
+        page_tokens = count_tokens(page_text, encoding)
+
+        # If adding this page would exceed chunk size, save current chunk
+        if current_tokens + page_tokens > CHUNK_SIZE and current_text:
+            chunks.append(Chunk(
+                text=current_text.strip(),
+                book=book_name,
+                page=current_page,
+                chunk_index=chunk_index,
+                pdf_filename=pdf_filename,
+            ))
+            chunk_index += 1
+
+            # Keep overlap from the end of current text
+            overlap_text = get_overlap_text(current_text, CHUNK_OVERLAP, encoding)
+            current_text = overlap_text
+            current_tokens = count_tokens(overlap_text, encoding)
+            current_page = page_num
+
+        current_text += " " + page_text
+        current_tokens += page_tokens
+
+        # If current chunk is too large, split it
+        while current_tokens > CHUNK_SIZE:
+            # Find a good split point
+            split_text, remaining_text = split_at_token_limit(
+                current_text, CHUNK_SIZE, encoding
+            )
+
+            chunks.append(Chunk(
+                text=split_text.strip(),
+                book=book_name,
+                page=current_page,
+                chunk_index=chunk_index,
+                pdf_filename=pdf_filename,
+            ))
+            chunk_index += 1
+
+            # Keep overlap
+            overlap_text = get_overlap_text(split_text, CHUNK_OVERLAP, encoding)
+            current_text = overlap_text + remaining_text
+            current_tokens = count_tokens(current_text, encoding)
+
+    # Don't forget the last chunk
+    if current_text.strip():
+        chunks.append(Chunk(
+            text=current_text.strip(),
+            book=book_name,
+            page=current_page,
+            chunk_index=chunk_index,
+            pdf_filename=pdf_filename,
+        ))
+
+    return chunks
+
+
+def get_overlap_text(text: str, overlap_tokens: int, encoding) -> str:
+    """Get the last N tokens of text as overlap."""
+    tokens = encoding.encode(text)
+    if len(tokens) <= overlap_tokens:
+        return text
+    overlap_tokens_list = tokens[-overlap_tokens:]
+    return encoding.decode(overlap_tokens_list)
+
+
+def split_at_token_limit(text: str, limit: int, encoding) -> tuple[str, str]:
+    """Split text at approximately the token limit, preferring sentence boundaries."""
+    tokens = encoding.encode(text)
+    if len(tokens) <= limit:
+        return text, ""
+
+    # Decode up to the limit
+    split_text = encoding.decode(tokens[:limit])
+
+    # Try to find a sentence boundary
+    for sep in ['. ', '.\n', '? ', '!\n', '\n\n']:
+        last_sep = split_text.rfind(sep)
+        if last_sep > len(split_text) // 2:  # Don't split too early
+            split_point = last_sep + len(sep)
+            return text[:split_point], text[split_point:]
+
+    # Fall back to word boundary
+    last_space = split_text.rfind(' ')
+    if last_space > 0:
+        return text[:last_space], text[last_space:]
+
+    return split_text, text[len(split_text):]
+
+
+def load_pages(pdf_paths: list[Path]) -> list[str]:
+    """Page texts from PDFs, or query_results.json passages (two per page) as a fallback."""
+    pages = []
+    for pdf_path in pdf_paths:
+        pages.extend(text for _, text in extract_text_from_pdf(pdf_path))
+        if len(pages) >= BOOK_PAGES:
+            return pages
+    if pages:
+        return pages
+
+    with open(RESULTS_PATH) as f:
+        results = json.load(f)
+    passages = [s["text"] for r in results for s in r["sources"]]
+    return [" ".join(passages[i:i + 2]) for i in range(0, len(passages), 2)]
+
+
+def make_book(pages: list[str], page_count: int) -> list[tuple[int, str]]:
+    return [(i + 1, pages[i % len(pages)]) for i in range(page_count)]
+
+
+def timed(fn, *args) -> tuple[float, list[Chunk]]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunk_text scaling")
+    parser.add_argument("pdfs", nargs="*", type=Path, help="PDFs to sample pages from (default: pdfs/)")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[50, 100, 200, BOOK_PAGES],
+        help="Book sizes in pages",
+    )
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the new chunker")
+    args = parser.parse_args()
+
+    encoding = tiktoken.encoding_for_model("gpt-4")
+    pages = load_pages(args.pdfs or sorted(PDF_DIR.glob("**/*.pdf")))
+    if not pages:
+        print("No text to benchmark")
+        sys.exit(1)
+    print(f"Chunk size {CHUNK_SIZE}, overlap {CHUNK_OVERLAP}, {len(pages)} distinct pages")
+
+    print("\nBook of N pages:")
+    print(f"  {'pages':>6} {'tokens':>8} {'legacy ms':>10} {'us/page':>8} {'new ms':>8} "
+          f"{'us/page':>8} {'chunks':>7} {'identical':>9}")
+    for size in args.sizes:
+        book = make_book(pages, size)
+        tokens = sum(len(encoding.encode(re.sub(r'\s+', ' ', t))) for _, t in book)
+        new_time, new_chunks = timed(chunk_text, book, "Bench", "bench.pdf", encoding)
+
+        if args.skip_legacy:
+            legacy_cols = f"{'-':>10} {'-':>8}"
+            same = "-"
+        else:
+            legacy_time, legacy_chunks = timed(chunk_text_legacy, book, "Bench", "bench.pdf", encoding)
+            legacy_cols = f"{legacy_time * 1000:10.1f} {legacy_time / size * 1e6:8.0f}"
+            same = f"{sum(a == b for a, b in zip(legacy_chunks, new_chunks))}/{len(legacy_chunks)}"
+
+        print(f"  {size:6d} {tokens:8d} {legacy_cols} {new_time * 1000:8.1f} "
+              f"{new_time / size * 1e6:8.0f} {len(new_chunks):7d} {same:>9}")
+
+    # A single oversized page is where re-encoding the buffer on every split goes quadratic
+    print("\nSingle page of N pages' text:")
+    print(f"  {'pages':>6} {'legacy ms':>10} {'new ms':>8}")
+    for size in args.sizes:
+        page = [(1, " ".join(pages[i % len(pages)] for i in range(size)))]
+        new_time, _ = timed(chunk_text, page, "Bench", "bench.pdf", encoding)
+        if args.skip_legacy:
+            legacy_ms = "-"
+        else:
+            legacy_time, _ = timed(chunk_text_legacy, page, "Bench", "bench.pdf", encoding)
+            legacy_ms = f"{legacy_time * 1000:.1f}"
+        print(f"  {size:6d} {legacy_ms:>10} {new_time * 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Prompt size from format_context on TEST_QUERIES: the plain concatenation of
+every retrieved chunk vs merging adjacent chunks, with and without the token
+budget (query.CONTEXT_TOKEN_BUDGET).
+
+    python bench_context.py
+    python bench_context.py --budgets 1500 3000 6000
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+from query import (
+    CONTEXT_TOKEN_BUDGET, QDRANT_PATH, format_context, get_context_encoding, merge_adjacent, search
+)
+from clients import get_openai_client, get_vector_store
+from run_test_queries import TEST_QUERIES
+
+
+def concatenated(results: list[dict]) -> str:
+    """format_context before packing: every chunk in full, in rank order."""
+    return "\n---\n".join(
+        f"[Source {i}] {r['book']}, Page {r['page']}:\n{r['text']}\n" for i, r in enumerate(results, 1)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark context packing")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[CONTEXT_TOKEN_BUDGET])
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set")
+        sys.exit(1)
+
+    openai_client = get_openai_client()
+    store = get_vector_store(QDRANT_PATH)
+    encoding = get_context_encoding()
+
+    modes = {"concatenated": concatenated, "merged": lambda r: format_context(r, None)}
+    for budget in args.budgets:
+        modes[f"budget {budget}"] = lambda r, budget=budget: format_context(r, budget)
+    tokens = {mode: [] for mode in modes}
+    ms = {mode: [] for mode in modes}
+    chunks, passages = 0, 0
+
+    for query in TEST_QUERIES:
+        results = search(query, store, openai_client)
+        chunks += len(results)
+        passages += len(merge_adjacent(results))
+        for mode, build in modes.items():
+            start = time.perf_counter()
+            context = build(results)
+            ms[mode].append((time.perf_counter() - start) * 1000)
+            tokens[mode].append(len(encoding.encode(context)))
+
+    print(f"{len(TEST_QUERIES)} queries: {chunks} chunks retrieved, {passages} passages after merging\n")
+    print(f"{'mode':<14} {'mean tokens':>11} {'max tokens':>10} {'vs concat':>9} {'build ms':>9}")
+    base = statistics.mean(tokens["concatenated"])
+    for mode in modes:
+        mean = statistics.mean(tokens[mode])
+        print(f"{mode:<14} {mean:>11.0f} {max(tokens[mode]):>10} {mean / base:>9.0%} {statistics.mean(ms[mode]):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Recall, latency and memory for reduced-dimension (Matryoshka) search.
+
+Truncates the stored full vectors and the TEST_QUERIES embeddings to each size
+(what the API returns for `dimensions=N`), then compares top-k from the short
+vectors alone and from shortlisting on them and re-scoring on the full vectors
+(pipeline.SHORTLIST_DIMS with vector_store.RERANK) against exact full-size search.
+Latency is brute-force NumPy search time per query, so it scales with dims the
+way Qdrant's distance computations do.
+
+    python bench_dimensions.py --dims 256 512 1024 --oversampling 2 4 8
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+from openai import OpenAI
+from qdrant_client import QdrantClient
+
+from query import QDRANT_PATH, TOP_K, get_embedding
+from vector_store import COLLECTION_NAME, SHORTLIST_OVERSAMPLING
+from run_test_queries import TEST_QUERIES
+from bench_quantization import load_vectors, recall, rescore, top_k
+
+
+def truncate(matrix: np.ndarray, dims: int) -> np.ndarray:
+    short = np.ascontiguousarray(matrix[:, :dims])
+    return short / np.linalg.norm(short, axis=1, keepdims=True)
+
+
+def search_ms(vectors: np.ndarray, queries: np.ndarray, k: int, repeat: int = 3) -> float:
+    """Mean brute-force search time per query in ms."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            top_k((vectors @ q)[None, :], k)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reduced-dimension embeddings")
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 1024])
+    parser.add_argument("--k", type=int, default=TOP_K, help="Results per query")
+    parser.add_argument("--oversampling", type=int, nargs="+", default=[SHORTLIST_OVERSAMPLING])
+    parser.add_argument("--limit", type=int, help="Only load this many stored vectors")
+    parser.add_argument("--url", help="Qdrant server URL (default: local store)")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set")
+        sys.exit(1)
+
+    qdrant = QdrantClient(url=args.url) if args.url else QdrantClient(path=str(QDRANT_PATH))
+    vectors = load_vectors(qdrant, args.limit)
+    if not len(vectors):
+        print(f"No vectors in {COLLECTION_NAME}; run pipeline.py first")
+        sys.exit(1)
+
+    n, full_dims = vectors.shape
+    openai_client = OpenAI()
+    queries = np.asarray([get_embedding(q, openai_client, full_dims) for q in TEST_QUERIES], dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    print(f"Corpus: {n} vectors x {full_dims} dims, {len(queries)} queries, recall@{args.k}\n")
+
+    truth = top_k(queries @ vectors.T, args.k)
+
+    print(f"{'dims':>6} {'rerank':<8} {'recall':>7} {'ms/query':>9} {'RAM for corpus':>15}")
+    print(f"{full_dims:>6} {'-':<8} {1.0:>7.3f} {search_ms(vectors, queries, args.k):>9.2f} "
+          f"{n * full_dims * 4 / 1024 ** 2:>12.1f} MB")
+
+    for dims in sorted(d for d in args.dims if d < full_dims):
+        short, short_queries = truncate(vectors, dims), truncate(queries, dims)
+        scores = short_queries @ short.T
+        print(f"{dims:>6} {'no':<8} {recall(top_k(scores, args.k), truth):>7.3f} "
+              f"{search_ms(short, short_queries, args.k):>9.2f} {n * dims * 4 / 1024 ** 2:>12.1f} MB")
+        for oversampling in args.oversampling:
+            found = rescore(top_k(scores, args.k * oversampling), vectors, queries, args.k)
+            print(f"{'':>6} {f'x{oversampling}':<8} {recall(found, truth):>7.3f}")
+
+    print("\nWith re-ranking the full vectors stay on disk; RAM counts the short vectors only.")
+
+
+if __name__ == "__main__":
+    main()
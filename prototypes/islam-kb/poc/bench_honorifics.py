@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for normalize_honorifics: legacy per-pattern re.sub loop vs the
+single-pass compiled matcher in honorifics.py.
+
+Uses raw page text from PDFs when available, otherwise falls back to the source
+passages in query_results.json with their honorific parentheses stripped.
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+from pipeline import PDF_DIR
+from honorifics import (
+    HONORIFICS,
+    HONORIFIC_SKIP_WORDS,
+    ISLAMIC_NAMES,
+    normalize_honorifics,
+)
+
+RESULTS_PATH = Path(__file__).parent / "query_results.json"
+
+
+def normalize_honorifics_legacy(text: str) -> str:
+    """The original implementation: one re.sub per (honorific x name) pair."""
+    result = text
+
+    for hon in HONORIFICS:
+        for name in ISLAMIC_NAMES:
+            pattern = rf'\b({name})({hon})\b'
+            replacement = rf'\1({hon})'
+            result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
+
+    for hon in HONORIFICS:
+        pattern = rf'\b([A-Z][a-z]*[ahindrmsbl])({hon})\b'
+
+        def replace_if_valid(match):
+            name_part = match.group(1)
+            hon_part = match.group(2)
+            full = match.group(0).lower()
+            if full in HONORIFIC_SKIP_WORDS or name_part.lower() in HONORIFIC_SKIP_WORDS:
+                return match.group(0)
+            if len(name_part) < 3:
+                return match.group(0)
+            return f"{name_part}({hon_part})"
+
+        result = re.sub(pattern, replace_if_valid, result)
+
+    return result
+
+
+def load_pdf_pages(pdf_paths: list[Path], max_pages: int) -> list[str]:
+    """Raw (un-normalized) page text from the given PDFs."""
+    import fitz  # PyMuPDF
+
+    pages = []
+    for pdf_path in pdf_paths:
+        doc = fitz.open(pdf_path)
+        for page in doc:
+            text = page.get_text()
+            if text.strip():
+                pages.append(text)
+            if len(pages) >= max_pages:
+                break
+        doc.close()
+        if len(pages) >= max_pages:
+            break
+    return pages
+
+
+def load_fallback_pages() -> list[str]:
+    """Source passages from query_results.json with honorifics re-merged into names."""
+    with open(RESULTS_PATH) as f:
+        results = json.load(f)
+    merged = re.compile(r"\((" + "|".join(HONORIFICS) + r")\)")
+    return [merged.sub(r"\1", s["text"]) for r in results for s in r["sources"]]
+
+
+def time_per_page(fn, pages: list[str]) -> list[float]:
+    timings = []
+    for text in pages:
+        start = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    ms = sorted(t * 1000 for t in timings)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(f"  {label:<8} mean {statistics.mean(ms):8.3f} ms  p50 {statistics.median(ms):8.3f} ms  "
+          f"p95 {p95:8.3f} ms  total {sum(ms) / 1000:7.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark honorific normalization")
+    parser.add_argument("pdfs", nargs="*", type=Path, help="PDFs to sample pages from (default: pdfs/)")
+    parser.add_argument("--max-pages", type=int, default=300, help="Number of pages to benchmark")
+    args = parser.parse_args()
+
+    pdf_paths = args.pdfs or sorted(PDF_DIR.glob("**/*.pdf"))
+    if pdf_paths:
+        pages = load_pdf_pages(pdf_paths, args.max_pages)
+        print(f"Corpus: {len(pages)} pages from {len(pdf_paths)} PDF(s)")
+    else:
+        pages = load_fallback_pages()[:args.max_pages]
+        print(f"Corpus: {len(pages)} passages from {RESULTS_PATH.name} (no PDFs found)")
+
+    if not pages:
+        print("No text to benchmark")
+        sys.exit(1)
+
+    mismatches = sum(
+        1 for text in pages if normalize_honorifics(text) != normalize_honorifics_legacy(text)
+    )
+    print(f"Output mismatches: {mismatches}")
+
+    legacy = time_per_page(normalize_honorifics_legacy, pages)
+    compiled = time_per_page(normalize_honorifics, pages)
+
+    print("Per-page latency:")
+    report("before", legacy)
+    report("after", compiled)
+    print(f"Speedup: {sum(legacy) / sum(compiled):.1f}x")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
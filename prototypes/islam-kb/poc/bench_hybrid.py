@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Latency and exact-term recall of dense vs hybrid (dense + BM25, fused by RRF)
+retrieval on TEST_QUERIES.
+
+Latency is search only: query embeddings are fetched once up front (and then
+served by the embedding cache), since both modes embed the query the same way.
+Recall is a proxy for what dense retrieval misses: a chunk counts as relevant
+if it contains every rare term of the query (content terms per
+lexical_index.query_terms that occur in under RARE_TERM_DF of the chunks, with
+diacritics folded: names and transliterations rather than "prophet"), and
+recall@k is the share of min(k, relevant) found in the top k. Queries with no
+rare term or no such chunk are left out of the recall figures.
+
+    python bench_hybrid.py
+    python bench_hybrid.py --runs 5 --budget-ms 50
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import unicodedata
+
+from query import HYBRID_CANDIDATES, QDRANT_PATH, TOP_K, dense_search, search
+from lexical_index import LEXICAL_INDEX_PATH, get_default_index, query_terms
+from clients import get_openai_client, get_vector_store
+from run_test_queries import TEST_QUERIES
+
+RARE_TERM_DF = 0.05  # fraction of chunks
+
+
+def fold(text: str) -> set[str]:
+    """Lowercase words with diacritics removed, like the FTS5 tokenizer."""
+    stripped = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return set(re.findall(r"\w+", stripped.lower()))
+
+
+def relevant_chunks(chunks: list[tuple[str, int, set[str]]], query: str) -> set[tuple[str, int]]:
+    """Chunks containing all of the query's rare terms (empty if it has none)."""
+    df = {t: sum(t in words for _, _, words in chunks) for t in query_terms(query)}
+    rare = {t for t, n in df.items() if 0 < n < RARE_TERM_DF * len(chunks)}
+    return {(pdf, idx) for pdf, idx, words in chunks if rare and rare <= words}
+
+
+def recall_at_k(results: list[dict], relevant: set[tuple[str, int]], k: int) -> float:
+    found = {(r["pdf_filename"], r["chunk_index"]) for r in results[:k]}
+    return len(found & relevant) / min(k, len(relevant))
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dense vs hybrid retrieval")
+    parser.add_argument("--runs", type=int, default=3, help="Timed searches per query and mode")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="Allowed p95 overhead of hybrid over dense")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set")
+        sys.exit(1)
+    if not LEXICAL_INDEX_PATH.exists():
+        print(f"No lexical index at {LEXICAL_INDEX_PATH}; run pipeline.py first")
+        sys.exit(1)
+
+    openai_client = get_openai_client()
+    store = get_vector_store(QDRANT_PATH)
+    index = get_default_index()
+    chunks = [
+        (pdf, idx, fold(text))
+        for pdf, idx, text in index.conn.execute("SELECT pdf_filename, chunk_index, text FROM chunks")
+    ]
+    print(f"Corpus: {len(chunks)} chunks, {len(TEST_QUERIES)} queries, "
+          f"top {TOP_K} from {HYBRID_CANDIDATES} candidates per list\n")
+
+    modes = {
+        "dense": lambda q: dense_search(q, store, openai_client),
+        "bm25": lambda q: index.search(q, TOP_K),
+        "hybrid": lambda q: search(q, store, openai_client, hybrid=True),
+    }
+    timings = {mode: [] for mode in modes}
+    recalls = {mode: [] for mode in modes}
+
+    for query in TEST_QUERIES:
+        dense_search(query, store, openai_client)  # fetch the embedding outside the timings
+        relevant = relevant_chunks(chunks, query)
+        for mode, run in modes.items():
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                results = run(query)
+                timings[mode].append((time.perf_counter() - start) * 1000)
+            if relevant:
+                recalls[mode].append(recall_at_k(results, relevant, TOP_K))
+
+    judged = len(recalls["dense"])
+    print(f"{'mode':<8} {'p50 ms':>8} {'p95 ms':>8} {f'term recall@{TOP_K}':>16}")
+    for mode in modes:
+        recall = f"{statistics.mean(recalls[mode]):.3f}" if judged else "-"
+        print(f"{mode:<8} {statistics.median(timings[mode]):>8.1f} {percentile(timings[mode], 95):>8.1f} {recall:>16}")
+    print(f"\nRecall over {judged}/{len(TEST_QUERIES)} queries with rare terms found in the corpus")
+
+    overhead = percentile(timings["hybrid"], 95) - percentile(timings["dense"], 95)
+    print(f"Hybrid overhead: {overhead:.1f} ms at p95 (budget {args.budget_ms:.0f} ms)")
+    if overhead > args.budget_ms:
+        print("FAIL: hybrid search is over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
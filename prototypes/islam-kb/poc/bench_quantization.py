@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Recall vs memory for the quantization modes in pipeline.QUANTIZATION.
+
+Loads the stored vectors from the collection, embeds TEST_QUERIES, and compares
+each mode's top-k against exact float32 search, with and without rescoring.
+Quantization is simulated in NumPy the way Qdrant does it (int8 with a 0.99
+quantile range; sign bits compared by Hamming distance), so this runs against
+the local store, where Qdrant itself always searches exactly.
+
+    python bench_quantization.py --k 10 --oversampling 1 2 4
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+from openai import OpenAI
+from qdrant_client import QdrantClient
+
+from query import QDRANT_PATH, TOP_K, get_embedding
+from vector_store import COLLECTION_NAME, FULL_VECTOR
+from run_test_queries import TEST_QUERIES
+
+
+def load_vectors(qdrant: QdrantClient, limit: int | None) -> np.ndarray:
+    """Stored (full) vectors as a float32 matrix, L2-normalised like Qdrant's cosine distance."""
+    vectors = []
+    offset = None
+    while True:
+        points, offset = qdrant.scroll(
+            collection_name=COLLECTION_NAME,
+            limit=1000,
+            offset=offset,
+            with_payload=False,
+            with_vectors=True,
+        )
+        vectors.extend(p.vector[FULL_VECTOR] if isinstance(p.vector, dict) else p.vector for p in points)
+        if offset is None or (limit and len(vectors) >= limit):
+            break
+    matrix = np.asarray(vectors[:limit] if limit else vectors, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def scalar_scores(vectors: np.ndarray, queries: np.ndarray, quantile: float = 0.99) -> tuple[np.ndarray, int]:
+    """Scores against int8-quantized vectors. Returns (scores, bytes per vector)."""
+    lo, hi = np.quantile(vectors, [1 - quantile, quantile])
+    codes = np.round((np.clip(vectors, lo, hi) - lo) / (hi - lo) * 255).astype(np.uint8)
+    decoded = codes.astype(np.float32) * ((hi - lo) / 255) + lo
+    return queries @ decoded.T, codes.shape[1]
+
+
+def binary_scores(vectors: np.ndarray, queries: np.ndarray) -> tuple[np.ndarray, int]:
+    """Scores against 1-bit vectors (dims minus twice the Hamming distance). Returns (scores, bytes per vector)."""
+    bits = np.packbits(vectors > 0, axis=1)
+    query_bits = np.packbits(queries > 0, axis=1)
+    popcount = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int32)
+    hamming = np.stack([popcount[np.bitwise_xor(bits, q)].sum(axis=1) for q in query_bits])
+    return (vectors.shape[1] - 2 * hamming).astype(np.float32), bits.shape[1]
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores per row, best first."""
+    k = min(k, scores.shape[1])
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, idx, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def rescore(candidates: np.ndarray, vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Re-rank quantized candidates by exact float32 score."""
+    exact = np.einsum("qd,qcd->qc", queries, vectors[candidates])
+    return np.take_along_axis(candidates, top_k(exact, k), axis=1)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantization recall vs memory")
+    parser.add_argument("--k", type=int, default=TOP_K, help="Results per query")
+    parser.add_argument("--oversampling", type=float, nargs="+", default=[1.0, 2.0, 4.0])
+    parser.add_argument("--limit", type=int, help="Only load this many stored vectors")
+    parser.add_argument("--url", help="Qdrant server URL (default: local store)")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set")
+        sys.exit(1)
+
+    qdrant = QdrantClient(url=args.url) if args.url else QdrantClient(path=str(QDRANT_PATH))
+    vectors = load_vectors(qdrant, args.limit)
+    if not len(vectors):
+        print(f"No vectors in {COLLECTION_NAME}; run pipeline.py first")
+        sys.exit(1)
+
+    n, dims = vectors.shape
+    openai_client = OpenAI()
+    queries = np.asarray([get_embedding(q, openai_client, dims) for q in TEST_QUERIES], dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    print(f"Corpus: {n} vectors x {dims} dims, {len(queries)} queries, recall@{args.k}\n")
+
+    truth = top_k(queries @ vectors.T, args.k)
+
+    print(f"{'mode':<8} {'rescore':<10} {'recall':>7} {'bytes/vec':>10} {'RAM for corpus':>15}")
+    print(f"{'float32':<8} {'-':<10} {1.0:>7.3f} {dims * 4:>10} {n * dims * 4 / 1024 ** 2:>12.1f} MB")
+
+    for mode, score_fn in (("scalar", scalar_scores), ("binary", binary_scores)):
+        scores, size = score_fn(vectors, queries)
+        found = top_k(scores, args.k)
+        print(f"{mode:<8} {'no':<10} {recall(found, truth):>7.3f} {size:>10} {n * size / 1024 ** 2:>12.1f} MB")
+        for oversampling in args.oversampling:
+            candidates = top_k(scores, int(args.k * oversampling))
+            found = rescore(candidates, vectors, queries, args.k)
+            print(f"{'':<8} {f'x{oversampling:g}':<10} {recall(found, truth):>7.3f}")
+
+    print("\nRAM counts the vectors only; with quantization the float32 originals live on disk "
+          "and are read for rescoring.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Latency of the TUI's query path: a fresh `query.py --stream` process per
+question vs requests to a running query_server.py.
+
+Reports time to the first answer token and to the end of the answer for each
+path, plus how long the server takes to start. The CLI runs go first since the
+embedded Qdrant store can only be opened by one process at a time, so the
+server sees query embeddings the CLI runs already cached; run it twice to
+compare both paths with a warm cache.
+
+    python bench_query_server.py --runs 5
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python bench_query_server.py
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import http.client
+from pathlib import Path
+
+from run_test_queries import TEST_QUERIES
+from query_server import DEFAULT_HOST
+
+POC_DIR = Path(__file__).parent
+BENCH_PORT = 8767
+
+
+def time_cli(query: str) -> tuple[float, float]:
+    """(first token, total) seconds for one `query.py --stream` run."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "query.py", "--stream", query],
+        cwd=POC_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    first = proc.stdout.read1(1)
+    first_token = time.perf_counter() - start
+    proc.stdout.read()
+    if proc.wait() != 0 or not first:
+        raise RuntimeError(f"query.py exited with {proc.returncode}")
+    return first_token, time.perf_counter() - start
+
+
+def time_server(query: str, port: int) -> tuple[float, float]:
+    """(first token, total) seconds for one POST /query."""
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection(DEFAULT_HOST, port)
+    conn.request("POST", "/query", json.dumps({"query": query}), {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    first_token = None
+    for line in response:
+        event = json.loads(line)
+        if "error" in event:
+            raise RuntimeError(event["error"])
+        if "token" in event and first_token is None:
+            first_token = time.perf_counter() - start
+    conn.close()
+    return first_token, time.perf_counter() - start
+
+
+def start_server(port: int, timeout: float = 60.0) -> tuple[subprocess.Popen, float]:
+    """Launch query_server.py and wait for /health. Returns (process, startup seconds)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "query_server.py", "--port", str(port)],
+        cwd=POC_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    while time.perf_counter() - start < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"query_server.py exited with {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection(DEFAULT_HOST, port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return proc, time.perf_counter() - start
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("query_server.py did not start")
+
+
+def report(label: str, timings: list[tuple[float, float]]):
+    first = [t[0] * 1000 for t in timings]
+    total = [t[1] * 1000 for t in timings]
+    print(f"  {label:<8} first token p50 {statistics.median(first):7.0f} ms  mean {statistics.mean(first):7.0f} ms  "
+          f"| total p50 {statistics.median(total):7.0f} ms  mean {statistics.mean(total):7.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark query.py CLI vs query_server.py")
+    parser.add_argument("--runs", type=int, default=5, help="Questions per path")
+    parser.add_argument("--port", type=int, default=BENCH_PORT)
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set")
+        sys.exit(1)
+
+    queries = [TEST_QUERIES[i % len(TEST_QUERIES)] for i in range(args.runs)]
+
+    print(f"CLI: {len(queries)} runs of query.py --stream")
+    cli = [time_cli(q) for q in queries]
+
+    proc, startup = start_server(args.port)
+    try:
+        print(f"Server: started in {startup * 1000:.0f} ms, {len(queries)} requests")
+        server = [time_server(q, args.port) for q in queries]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print("\nLatency per question:")
+    report("cli", cli)
+    report("server", server)
+    print(f"First token speedup: {statistics.median(t[0] for t in cli) / statistics.median(t[0] for t in server):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
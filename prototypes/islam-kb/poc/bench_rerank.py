@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+What reranking buys on TEST_QUERIES: context tokens sent to the answer model,
+search latency, and how many relevant passages the smaller context keeps.
+
+Compares plain search (TOP_K chunks in the context) with each reranker
+(RERANK_CANDIDATES retrieved, RERANK_TOP_N kept). Relevance uses the same
+rare-term proxy as bench_hybrid.py; "kept" is the share of relevant passages in
+the baseline context that are still in the reranked one, and "found" the
+recall of relevant passages in the context.
+
+    python bench_rerank.py
+    python bench_rerank.py --rerankers terms cross-encoder
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import tiktoken
+
+from query import QDRANT_PATH, RERANK_CANDIDATES, RERANK_TOP_N, TOP_K, format_context, search
+from lexical_index import get_default_index
+from clients import get_openai_client, get_vector_store
+from run_test_queries import TEST_QUERIES
+from bench_hybrid import fold, percentile, relevant_chunks
+
+
+def keys(results: list[dict]) -> set[tuple[str, int]]:
+    return {(r["pdf_filename"], r["chunk_index"]) for r in results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the reranking stage")
+    parser.add_argument("--rerankers", nargs="+", default=["terms"], choices=["terms", "cross-encoder"])
+    parser.add_argument("--runs", type=int, default=3, help="Timed searches per query and mode")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set")
+        sys.exit(1)
+
+    openai_client = get_openai_client()
+    store = get_vector_store(QDRANT_PATH)
+    encoding = tiktoken.encoding_for_model("gpt-4o")
+    chunks = [
+        (pdf, idx, fold(text))
+        for pdf, idx, text in get_default_index().conn.execute("SELECT pdf_filename, chunk_index, text FROM chunks")
+    ]
+
+    modes = [None] + args.rerankers
+    timings = {mode: [] for mode in modes}
+    tokens = {mode: [] for mode in modes}
+    kept = {mode: [] for mode in modes}
+    found = {mode: [] for mode in modes}
+
+    for query in TEST_QUERIES:
+        search(query, store, openai_client, reranker=modes[-1])  # embedding and model load, untimed
+        relevant = relevant_chunks(chunks, query)
+        baseline = None
+        for mode in modes:
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                results = search(query, store, openai_client, reranker=mode)
+                timings[mode].append((time.perf_counter() - start) * 1000)
+            tokens[mode].append(len(encoding.encode(format_context(results))))
+            if baseline is None:
+                baseline = keys(results) & relevant
+            if baseline:
+                kept[mode].append(len(keys(results) & baseline) / len(baseline))
+            if relevant:
+                found[mode].append(len(keys(results) & relevant) / min(len(relevant), len(results)))
+
+    print(f"{len(TEST_QUERIES)} queries; baseline context {TOP_K} chunks, "
+          f"reranked {RERANK_TOP_N} of {RERANK_CANDIDATES}\n")
+    print(f"{'mode':<14} {'ctx tokens':>10} {'p50 ms':>8} {'p95 ms':>8} {'kept':>6} {'found':>6}")
+    for mode in modes:
+        kept_str = f"{statistics.mean(kept[mode]):.2f}" if kept[mode] else "-"
+        found_str = f"{statistics.mean(found[mode]):.2f}" if found[mode] else "-"
+        print(f"{mode or 'none':<14} {statistics.mean(tokens[mode]):>10.0f} "
+              f"{statistics.median(timings[mode]):>8.1f} {percentile(timings[mode], 95):>8.1f} "
+              f"{kept_str:>6} {found_str:>6}")
+    print(f"\nkept over {len(kept[None])} and found over {len(found[None])} queries with rare-term matches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Retrieval quality and cost on TEST_QUERIES, written as a JSON report so runs
+before and after a chunking, dims or index change can be diffed.
+
+For each mode (dense, bm25, hybrid, and hybrid with each --rerankers) reports
+recall@k, MRR, search latency p50/p95 (query embeddings fetched up front, as in
+bench_hybrid.py) and peak Python memory during one pass over the queries, plus
+process RSS and the on-disk size of the store and lexical index.
+
+Relevance is judged by (book, page), so labels survive re-chunking. Labels come
+from RELEVANCE_PATH, a JSON object of query -> [{"book": ..., "page": ...}];
+queries without labels fall back to bench_hybrid's rare-term proxy.
+--save-labels writes the proxy labels out as a starting point for hand-labelling.
+
+With --stub, query embeddings come from an in-process stub_embedding_server
+(no network or API spend) and a throwaway embedding cache. The stub's vectors
+are only comparable to a store ingested against the stub too, so dense recall
+is meaningful only there; latency, memory and BM25 recall are meaningful
+either way.
+
+    python bench_retrieval.py --stub --output before.json
+    python bench_retrieval.py --stub --output after.json --compare before.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import platform
+import statistics
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+
+import embedding_cache
+from embedding_cache import EmbeddingCache
+from query import (
+    EMBEDDING_DIMS, HYBRID_CANDIDATES, QDRANT_PATH, RERANK_CANDIDATES, RERANK_TOP_N, TOP_K, dense_search, search,
+)
+from vector_store import COLLECTION_NAME
+from lexical_index import LEXICAL_INDEX_PATH, get_default_index
+from clients import get_openai_client, get_vector_store
+from run_test_queries import TEST_QUERIES
+from bench_hybrid import fold, percentile, relevant_chunks
+
+# Configuration
+RELEVANCE_PATH = Path(__file__).parent / "relevance.json"
+RECALL_AT = (1, 5, 10)
+STUB_PORT = 8799
+
+
+def load_labels(path: Path) -> dict[str, set[tuple[str, int]]]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return {query: {(l["book"], l["page"]) for l in labels} for query, labels in json.load(f).items()}
+
+
+def proxy_labels(index, queries: list[str]) -> dict[str, set[tuple[str, int]]]:
+    """Pages of the chunks containing every rare term of each query (see bench_hybrid.py)."""
+    rows = index.conn.execute("SELECT pdf_filename, chunk_index, book, page, text FROM chunks").fetchall()
+    pages = {(pdf, idx): (book, page) for pdf, idx, book, page, _ in rows}
+    chunks = [(pdf, idx, fold(text)) for pdf, idx, _, _, text in rows]
+    return {query: {pages[key] for key in relevant_chunks(chunks, query)} for query in queries}
+
+
+def judge(results: list[dict], relevant: set[tuple[str, int]]) -> dict:
+    """recall@k for RECALL_AT and reciprocal rank of the first relevant result."""
+    ranked = [(r["book"], r["page"]) for r in results]
+    metrics = {}
+    for k in RECALL_AT:
+        metrics[f"recall@{k}"] = len(set(ranked[:k]) & relevant) / min(k, len(relevant))
+    first = next((i for i, page in enumerate(ranked, 1) if page in relevant), None)
+    metrics["mrr"] = 1 / first if first else 0.0
+    return metrics
+
+
+def directory_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file()) if path.exists() else 0
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** 2 if platform.system() == "Darwin" else rss / 1024
+
+
+def compare(report: dict, baseline_path: Path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nChange vs {baseline_path} ({baseline['timestamp']}):")
+    for mode, metrics in report["modes"].items():
+        old = baseline["modes"].get(mode)
+        if old is None:
+            print(f"  {mode}: not in baseline")
+            continue
+        deltas = [f"{name} {metrics[name] - old[name]:+.3f}" for name in metrics if name in old]
+        print(f"  {mode:<14} " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval recall, MRR, latency and memory")
+    parser.add_argument("--runs", type=int, default=3, help="Timed searches per query and mode")
+    parser.add_argument("--rerankers", nargs="*", default=["terms"], choices=["terms", "cross-encoder"])
+    parser.add_argument("--labels", type=Path, default=RELEVANCE_PATH, help="Labelled relevance set (JSON)")
+    parser.add_argument("--save-labels", type=Path, help="Write proxy labels for unlabelled queries here")
+    parser.add_argument("--stub", action="store_true", help="Embed queries with an in-process stub server")
+    parser.add_argument("--output", type=Path, default=Path("retrieval_report.json"))
+    parser.add_argument("--compare", type=Path, help="Earlier report to print the change against")
+    args = parser.parse_args()
+
+    if args.stub:
+        import stub_embedding_server
+        server, _ = stub_embedding_server.start_server(STUB_PORT, dims=EMBEDDING_DIMS)
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+        os.environ["OPENAI_API_KEY"] = "stub"
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set")
+        sys.exit(1)
+    if not LEXICAL_INDEX_PATH.exists():
+        print(f"No lexical index at {LEXICAL_INDEX_PATH}; run pipeline.py first")
+        sys.exit(1)
+
+    tmp = tempfile.TemporaryDirectory()
+    if args.stub:
+        # Stub vectors must not end up in (or come from) the real embedding cache
+        embedding_cache._default_cache = EmbeddingCache(Path(tmp.name) / "cache.sqlite")
+
+    openai_client = get_openai_client()
+    store = get_vector_store(QDRANT_PATH)
+    index = get_default_index()
+
+    labels = load_labels(args.labels)
+    proxy = proxy_labels(index, [q for q in TEST_QUERIES if q not in labels])
+    if args.save_labels:
+        with open(args.save_labels, "w") as f:
+            json.dump(
+                {q: [{"book": b, "page": p} for b, p in sorted(pages)] for q, pages in proxy.items() if pages},
+                f, indent=2, ensure_ascii=False,
+            )
+        print(f"Proxy labels saved to: {args.save_labels}")
+    relevance = {**proxy, **labels}
+    judged = [q for q in TEST_QUERIES if relevance.get(q)]
+
+    modes = {
+        "dense": lambda q: dense_search(q, store, openai_client),
+        "bm25": lambda q: index.search(q, TOP_K),
+        "hybrid": lambda q: search(q, store, openai_client, hybrid=True, reranker=None),
+    }
+    for reranker in args.rerankers:
+        modes[f"hybrid+{reranker}"] = lambda q, r=reranker: search(q, store, openai_client, hybrid=True, reranker=r)
+
+    for query in TEST_QUERIES:
+        for run in modes.values():
+            run(query)  # embeddings and model loads, untimed
+
+    timings = {mode: [] for mode in modes}
+    scores = {mode: [] for mode in modes}
+    per_query = []
+    for query in TEST_QUERIES:
+        row = {"query": query, "labels": "file" if query in labels else "proxy", "relevant": len(relevance.get(query, ()))}
+        for mode, run in modes.items():
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                results = run(query)
+                timings[mode].append((time.perf_counter() - start) * 1000)
+            if query in judged:
+                metrics = judge(results, relevance[query])
+                scores[mode].append(metrics)
+                row[mode] = metrics
+        per_query.append(row)
+
+    peak_kb = {}
+    for mode, run in modes.items():
+        tracemalloc.start()
+        for query in TEST_QUERIES:
+            run(query)
+        peak_kb[mode] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "collection": COLLECTION_NAME,
+            "points": len(store),
+            "lexical_chunks": len(index),
+            "embedding_dims": EMBEDDING_DIMS,
+            "top_k": TOP_K,
+            "hybrid_candidates": HYBRID_CANDIDATES,
+            "rerank_candidates": RERANK_CANDIDATES,
+            "rerank_top_n": RERANK_TOP_N,
+            "stub": args.stub,
+            "runs": args.runs,
+        },
+        "queries": len(TEST_QUERIES),
+        "judged": len(judged),
+        "labelled": sum(q in labels for q in TEST_QUERIES),
+        "modes": {
+            mode: {
+                **{
+                    name: statistics.mean(s[name] for s in scores[mode]) if judged else 0.0
+                    for name in [f"recall@{k}" for k in RECALL_AT] + ["mrr"]
+                },
+                "p50_ms": statistics.median(timings[mode]),
+                "p95_ms": percentile(timings[mode], 95),
+                "peak_python_kb": peak_kb[mode],
+            }
+            for mode in modes
+        },
+        "memory": {
+            "peak_rss_mb": peak_rss_mb(),
+            "qdrant_mb": directory_size(QDRANT_PATH) / 1024 ** 2,
+            "lexical_index_mb": directory_size(LEXICAL_INDEX_PATH) / 1024 ** 2,
+        },
+        "per_query": per_query,
+    }
+
+    print(f"{len(TEST_QUERIES)} queries, {len(judged)} judged ({report['labelled']} labelled, rest by proxy)\n")
+    recall_cols = " ".join(f"{f'R@{k}':>6}" for k in RECALL_AT)
+    print(f"{'mode':<14} {recall_cols} {'MRR':>6} {'p50 ms':>8} {'p95 ms':>8} {'peak KB':>8}")
+    for mode, m in report["modes"].items():
+        recalls = " ".join(f"{m[f'recall@{k}']:>6.3f}" for k in RECALL_AT)
+        print(f"{mode:<14} {recalls} {m['mrr']:>6.3f} {m['p50_ms']:>8.1f} {m['p95_ms']:>8.1f} "
+              f"{m['peak_python_kb']:>8.0f}")
+    memory = report["memory"]
+    print(f"\nPeak RSS {memory['peak_rss_mb']:.0f} MB; store {memory['qdrant_mb']:.1f} MB, "
+          f"lexical index {memory['lexical_index_mb']:.1f} MB")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Report saved to: {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+    embedding_cache.get_default_cache().close()
+    tmp.cleanup()
+    if args.stub:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Time to first token of query.query_events with and without speculative
+retrieval (query.SPECULATIVE_SEARCH).
+
+Each test query is answered once per mode, alternating, and each mode gets its
+own empty embedding cache so neither answers from embeddings the other already
+fetched. Also reports how often the speculative results were reused; the stub
+server's tool call echoes the question, so against it every search is reused.
+
+    python bench_speculative.py --runs 10
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python bench_speculative.py
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+import embedding_cache
+from embedding_cache import EmbeddingCache
+from query import QDRANT_PATH, query_events
+from clients import get_openai_client, get_vector_store
+from run_test_queries import TEST_QUERIES
+
+
+def time_query(query: str, speculative: bool) -> tuple[float, float, bool]:
+    """(first token, total) seconds for one answer, and whether speculative results were reused."""
+    openai_client = get_openai_client()
+    store = get_vector_store(QDRANT_PATH)
+    start = time.perf_counter()
+    first_token = None
+    reused = False
+    for kind, value in query_events(query, None, openai_client, store, speculative):
+        if kind == "token" and first_token is None:
+            first_token = time.perf_counter() - start
+        elif kind == "status" and value.endswith("(speculative)"):
+            reused = True
+    return first_token, time.perf_counter() - start, reused
+
+
+def report(label: str, timings: list[tuple[float, float, bool]]):
+    first = [t[0] * 1000 for t in timings]
+    total = [t[1] * 1000 for t in timings]
+    reused = sum(t[2] for t in timings)
+    print(f"  {label:<12} first token p50 {statistics.median(first):6.0f} ms  mean {statistics.mean(first):6.0f} ms  "
+          f"| total p50 {statistics.median(total):6.0f} ms  | reused {reused}/{len(timings)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speculative retrieval")
+    parser.add_argument("--runs", type=int, default=len(TEST_QUERIES), help="Questions per mode")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set")
+        sys.exit(1)
+
+    queries = [TEST_QUERIES[i % len(TEST_QUERIES)] for i in range(args.runs)]
+    timings = {False: [], True: []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caches = {mode: EmbeddingCache(Path(tmp) / f"cache-{mode}.sqlite") for mode in timings}
+        time_query(queries[0], False)  # open the store and connections outside the timings
+        for i, query in enumerate(queries, 1):
+            for mode in (False, True):
+                embedding_cache._default_cache = caches[mode]
+                timings[mode].append(time_query(query, mode))
+            print(f"  [{i}/{len(queries)}] {query[:60]}", flush=True)
+        for cache in caches.values():
+            cache.close()
+
+    print("\nLatency per question:")
+    report("sequential", timings[False])
+    report("speculative", timings[True])
+    saved = statistics.median(t[0] for t in timings[False]) - statistics.median(t[0] for t in timings[True])
+    print(f"First token saved: {saved * 1000:.0f} ms (p50)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Embedded Qdrant vs the NumPy vector store (exact, and with an IVF index): time
+to open, query latency, memory and recall, through query.dense_search.
+
+Queries are stored vectors with a little noise added, so no embedding API is
+needed; get_embeddings is swapped for a lookup. Each backend runs in its own
+process, so open time and memory aren't shared. Recall@k is the share of a
+backend's top k that score at least the exact k-th best score (exact ties
+between duplicate chunks make ID comparisons unreliable).
+
+Needs both stores: pipeline.py's Qdrant store and the NumPy store, e.g. from
+`python vector_store.py from-qdrant`. --ivf builds an IVF index for the run
+and removes it again unless the store already had one.
+
+    python bench_vector_store.py
+    python bench_vector_store.py --queries 200 --ivf --ivf-lists 64
+"""
+
+import sys
+import json
+import time
+import argparse
+import resource
+import platform
+import subprocess
+import tempfile
+import statistics
+from pathlib import Path
+
+import numpy as np
+
+import query
+from embedder import truncate_embedding
+from vector_store import NUMPY_STORE_PATH, NumpyVectorStore, QdrantStore
+from bench_hybrid import percentile
+
+QUERY_NOISE = 0.02  # stddev of the noise added to each dimension of a query vector
+
+
+def rss_mb() -> float:
+    """Current resident set size (peak where /proc isn't available)."""
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** 2 if platform.system() == "Darwin" else rss / 1024
+
+
+def run_backend(backend: str, queries_path: Path, limit: int) -> dict:
+    """Open one backend and time searches for every query vector. Runs in a child process."""
+    vectors = np.load(queries_path)
+    query.get_embeddings = lambda texts, dims=query.EMBEDDING_DIMS: [
+        truncate_embedding(vectors[int(text)].tolist(), dims) for text in texts
+    ]
+    before = rss_mb()
+    start = time.perf_counter()
+    if backend == "qdrant":
+        from qdrant_client import QdrantClient
+        store = QdrantStore(QdrantClient(path=str(query.QDRANT_PATH)))
+        store.dims
+    else:
+        store = NumpyVectorStore()
+        if backend == "numpy":
+            store.ivf = None
+    open_ms = (time.perf_counter() - start) * 1000
+    opened = rss_mb()
+
+    timings, scores = [], []
+    for i in range(len(vectors)):
+        start = time.perf_counter()
+        results = query.dense_search(str(i), store, None, limit)
+        timings.append((time.perf_counter() - start) * 1000)
+        scores.append([r["score"] for r in results])
+    return {
+        "open_ms": open_ms,
+        "first_ms": timings[0],
+        "timings": timings[1:] or timings,
+        "scores": scores,
+        "open_rss_mb": opened - before,
+        "rss_mb": rss_mb(),
+    }
+
+
+def recall(scores: list[list[float]], exact: list[list[float]], k: int) -> float:
+    hits = []
+    for found, best in zip(scores, exact):
+        if best:
+            threshold = best[min(k, len(best)) - 1] - 1e-5
+            hits.append(sum(s >= threshold for s in found[:k]) / min(k, len(best)))
+    return statistics.mean(hits) if hits else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedded Qdrant vs the NumPy vector store")
+    parser.add_argument("--queries", type=int, default=100, help="Query vectors to search with")
+    parser.add_argument("--limit", type=int, default=query.TOP_K)
+    parser.add_argument("--ivf", action="store_true", help="Also benchmark the NumPy store with an IVF index")
+    parser.add_argument("--ivf-lists", type=int, help="IVF clusters (default about sqrt(points))")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--queries-file", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_backend(args.child, args.queries_file, args.limit)))
+        return
+
+    if not query.QDRANT_PATH.exists():
+        print(f"No Qdrant store at {query.QDRANT_PATH}; run pipeline.py first")
+        sys.exit(1)
+    store = NumpyVectorStore()
+    if not len(store):
+        print(f"NumPy store at {NUMPY_STORE_PATH} is empty; run vector_store.py from-qdrant first")
+        sys.exit(1)
+
+    # Query vectors: random stored points, perturbed
+    rng = np.random.default_rng(0)
+    matrix, live = store._state()
+    rows = rng.choice(np.flatnonzero(live), min(args.queries, int(live.sum())), replace=False)
+    vectors = matrix[np.sort(rows)] + rng.normal(0, QUERY_NOISE, (len(rows), store.dims)).astype(np.float32)
+
+    points, dims = len(store), store.dims
+    backends = ["qdrant", "numpy"]
+    had_ivf = store.ivf is not None
+    if args.ivf:
+        start = time.perf_counter()
+        lists = store.build_ivf(args.ivf_lists)
+        print(f"Built IVF index ({lists} lists) in {time.perf_counter() - start:.2f}s")
+        backends.append("numpy-ivf")
+    store.close()
+
+    reports = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        queries_path = Path(tmp) / "queries.npy"
+        np.save(queries_path, vectors)
+        try:
+            for backend in backends:
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", backend, "--queries-file", str(queries_path),
+                     "--limit", str(args.limit)],
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                reports[backend] = json.loads(output.strip().splitlines()[-1])
+        finally:
+            if args.ivf and not had_ivf:
+                NumpyVectorStore().drop_ivf()
+
+    exact = reports["numpy"]["scores"]
+    print(f"\n{points} points x {dims} dims, {len(vectors)} queries, top {args.limit}\n")
+    print(f"{'backend':<10} {'open ms':>9} {'first ms':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'open MB':>8} {'RSS MB':>7} {f'recall@{args.limit}':>10}")
+    for backend, r in reports.items():
+        print(f"{backend:<10} {r['open_ms']:>9.1f} {r['first_ms']:>9.1f} {statistics.median(r['timings']):>8.2f} "
+              f"{percentile(r['timings'], 95):>8.2f} {r['open_rss_mb']:>8.0f} {r['rss_mb']:>7.0f} "
+              f"{recall(r['scores'], exact, args.limit):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
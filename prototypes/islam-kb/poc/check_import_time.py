@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Cold-start guard for the query entry points.
+
+Imports each module in a fresh interpreter under `python -X importtime`, reports
+the median cumulative import time and the packages that dominate it, and fails
+(exit 1) if a module pulls in an ingest-only dependency or goes over its budget.
+
+    python check_import_time.py
+    python check_import_time.py query --runs 10 --top 15
+"""
+
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+POC_DIR = Path(__file__).parent
+
+# Entry module -> import time budget (ms), median of --runs cold imports.
+# openai and qdrant_client account for most of it and are needed to answer.
+IMPORT_BUDGETS_MS = {
+    "query": 2000,
+    "run_test_queries": 2000,
+}
+
+# Ingest-only packages the query path must never load
+FORBIDDEN_IMPORTS = {"fitz", "pymupdf", "tiktoken", "pipeline"}
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure(module: str) -> tuple[float, dict[str, int]]:
+    """Cold-import `module` once. Returns (cumulative ms, self time in us per imported module)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=POC_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    self_us: dict[str, int] = {}
+    total_us = None
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        own, cumulative, indent, name = match.groups()
+        self_us[name] = int(own)
+        if name == module and len(indent) == 1:
+            total_us = int(cumulative)
+    if total_us is None:
+        raise RuntimeError(f"no importtime entry for {module}")
+    return total_us / 1000, self_us
+
+
+def by_package(self_us: dict[str, int]) -> list[tuple[str, float]]:
+    """Self time summed per top-level package, largest first, in ms."""
+    totals: dict[str, int] = {}
+    for name, us in self_us.items():
+        root = name.split(".")[0]
+        totals[root] = totals.get(root, 0) + us
+    return sorted(((root, us / 1000) for root, us in totals.items()), key=lambda t: -t[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cold-start import time of the query path")
+    parser.add_argument("modules", nargs="*", default=list(IMPORT_BUDGETS_MS), help="Entry modules to check")
+    parser.add_argument("--runs", type=int, default=5, help="Cold imports per module")
+    parser.add_argument("--top", type=int, default=8, help="Packages to list per module")
+    parser.add_argument("--budget-ms", type=float, help="Override the per-module budget")
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.modules:
+        timings, self_us = [], {}
+        for _ in range(args.runs):
+            total_ms, self_us = measure(module)
+            timings.append(total_ms)
+        median = statistics.median(timings)
+        budget = args.budget_ms or IMPORT_BUDGETS_MS.get(module)
+
+        print(f"{module}: {median:.0f} ms median over {args.runs} runs "
+              f"(min {min(timings):.0f}, max {max(timings):.0f})"
+              + (f", budget {budget:.0f} ms" if budget else ""))
+        for root, ms in by_package(self_us)[:args.top]:
+            print(f"  {root:<24} {ms:7.1f} ms")
+
+        forbidden = sorted(FORBIDDEN_IMPORTS & set(self_us))
+        if forbidden:
+            failures.append(f"{module} imports ingest-only modules: {', '.join(forbidden)}")
+        if budget and median > budget:
+            failures.append(f"{module} takes {median:.0f} ms to import (budget {budget:.0f} ms)")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Compact binary chunk files with random access by chunk index.
+
+One file per book. Chunks are stored as consecutive records (page as uint32,
+then the UTF-8 text), followed by an offset index and a small JSON footer:
+
+    magic | record 0 | record 1 | ... | offsets (uint64 x n+1) | meta JSON | trailer
+
+The trailer (index offset, chunk count, meta length, magic) sits at the end of
+the file, so a reader mmaps the file and reads one chunk without parsing the rest.
+Files are written to a temp path and renamed on close; a crashed write never
+leaves a partial file behind.
+
+    python chunk_store.py info chunks/Book.chunks
+    python chunk_store.py get Book.pdf 42
+    python chunk_store.py convert chunks/*.json
+"""
+
+import sys
+import json
+import mmap
+import struct
+import argparse
+from array import array
+from pathlib import Path
+
+CHUNKS_DIR = Path(__file__).parent / "chunks"
+CHUNK_FILE_SUFFIX = ".chunks"
+
+MAGIC = b"IKBCHNK1"
+_PAGE = struct.Struct("<I")
+_TRAILER = struct.Struct("<QQI8s")  # index offset, chunk count, meta length, magic
+
+
+def chunk_file_name(pdf_filename: str) -> str:
+    return Path(pdf_filename).stem + CHUNK_FILE_SUFFIX
+
+
+class ChunkWriter:
+    """Appends a book's chunks (as Chunk.to_dict() dicts, in chunk_index order) to a chunk file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.f = open(self.tmp_path, 'wb')
+        self.f.write(MAGIC)
+        self.offsets = array("Q", [len(MAGIC)])
+        self.meta: dict = {}
+
+    def write(self, chunks: list[dict]):
+        for chunk in chunks:
+            if chunk["chunk_index"] != len(self.offsets) - 1:
+                raise ValueError(
+                    f"{self.path.name}: expected chunk {len(self.offsets) - 1}, got {chunk['chunk_index']}"
+                )
+            if not self.meta:
+                self.meta = {"book": chunk["book"], "pdf_filename": chunk["pdf_filename"]}
+            record = _PAGE.pack(chunk["page"]) + chunk["text"].encode()
+            self.f.write(record)
+            self.offsets.append(self.offsets[-1] + len(record))
+
+    def close(self):
+        index_offset = self.offsets[-1]
+        meta = json.dumps(self.meta).encode()
+        self.f.write(self.offsets.tobytes())
+        self.f.write(meta)
+        self.f.write(_TRAILER.pack(index_offset, len(self.offsets) - 1, len(meta), MAGIC))
+        self.f.close()
+        self.tmp_path.replace(self.path)
+
+    def abort(self):
+        self.f.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ChunkReader:
+    """Memory-mapped view of one chunk file. Indexing returns a Chunk.to_dict() dict."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            size = f.seek(0, 2)
+            if size < len(MAGIC) + _TRAILER.size:
+                raise ValueError(f"{self.path.name}: not a chunk file")
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        index_offset, self.count, meta_len, magic = _TRAILER.unpack_from(self.mm, size - _TRAILER.size)
+        if self.mm[:len(MAGIC)] != MAGIC or magic != MAGIC:
+            self.mm.close()
+            raise ValueError(f"{self.path.name}: not a chunk file")
+        index_end = index_offset + 8 * (self.count + 1)
+        self.offsets = memoryview(self.mm)[index_offset:index_end].cast("Q")
+        meta = json.loads(self.mm[index_end:index_end + meta_len]) if meta_len else {}
+        self.book = meta.get("book", "")
+        self.pdf_filename = meta.get("pdf_filename", "")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, chunk_index: int) -> dict:
+        if not 0 <= chunk_index < self.count:
+            raise IndexError(f"{self.path.name}: chunk {chunk_index} out of range ({self.count} chunks)")
+        start, end = self.offsets[chunk_index], self.offsets[chunk_index + 1]
+        (page,) = _PAGE.unpack_from(self.mm, start)
+        return {
+            "text": self.mm[start + _PAGE.size:end].decode(),
+            "book": self.book,
+            "page": page,
+            "chunk_index": chunk_index,
+            "pdf_filename": self.pdf_filename,
+        }
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def close(self):
+        self.offsets.release()
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ChunkStore:
+    """Chunk files in a directory, looked up by (pdf_filename, chunk_index). Readers stay open."""
+
+    def __init__(self, root: Path | None = None):
+        self.root = Path(root or CHUNKS_DIR)
+        self.readers: dict[str, ChunkReader] = {}
+
+    def book(self, pdf_filename: str) -> ChunkReader:
+        if pdf_filename not in self.readers:
+            self.readers[pdf_filename] = ChunkReader(self.root / chunk_file_name(pdf_filename))
+        return self.readers[pdf_filename]
+
+    def get(self, pdf_filename: str, chunk_index: int) -> dict:
+        return self.book(pdf_filename)[chunk_index]
+
+    def close(self):
+        for reader in self.readers.values():
+            reader.close()
+        self.readers.clear()
+
+
+def convert_json(json_path: Path) -> Path:
+    """Convert a legacy chunks/*.json dump to a chunk file next to it. Returns the new path."""
+    with open(json_path) as f:
+        chunks = json.load(f)
+    out_path = json_path.with_suffix(CHUNK_FILE_SUFFIX)
+    with ChunkWriter(out_path) as writer:
+        writer.write(sorted(chunks, key=lambda c: c["chunk_index"]))
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and convert chunk files")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    info = sub.add_parser("info", help="Show chunk count and sizes")
+    info.add_argument("paths", nargs="+", type=Path)
+
+    get = sub.add_parser("get", help="Print one chunk as JSON")
+    get.add_argument("pdf_filename")
+    get.add_argument("chunk_index", type=int)
+    get.add_argument("--dir", type=Path, default=CHUNKS_DIR, help="Chunk file directory")
+
+    convert = sub.add_parser("convert", help="Convert legacy JSON chunk dumps")
+    convert.add_argument("paths", nargs="+", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "info":
+        for path in args.paths:
+            with ChunkReader(path) as reader:
+                text_bytes = reader.offsets[-1] - reader.offsets[0] - _PAGE.size * len(reader)
+                print(f"{path.name}: {len(reader)} chunks, {path.stat().st_size / 1024:.1f} KB "
+                      f"({text_bytes / 1024:.1f} KB text), book={reader.book!r}")
+    elif args.command == "get":
+        store = ChunkStore(args.dir)
+        try:
+            print(json.dumps(store.get(args.pdf_filename, args.chunk_index), indent=2, ensure_ascii=False))
+        except (OSError, IndexError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        finally:
+            store.close()
+    else:
+        for path in args.paths:
+            out_path = convert_json(path)
+            print(f"{path.name} ({path.stat().st_size / 1024:.1f} KB) -> "
+                  f"{out_path.name} ({out_path.stat().st_size / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
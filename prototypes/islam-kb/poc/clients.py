@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Shared OpenAI and Qdrant clients, created on first use and reused for the life
+of the process.
+
+The OpenAI client keeps connections alive between questions, so interactive
+sessions don't redo the TLS handshake each turn. Qdrant is the embedded store
+on disk by default; set QDRANT_URL to use a Qdrant server instead, e.g. one
+started with config.yaml:
+
+    docker run -p 6333:6333 -v $PWD/config.yaml:/qdrant/config/production.yaml qdrant/qdrant
+    QDRANT_URL=http://localhost:6333 python query.py
+
+get_vector_store wraps the client in a QdrantStore, or with VECTOR_STORE=numpy
+returns the in-process NumPy store instead; both implement vector_store.VectorStore.
+"""
+
+import os
+import atexit
+import threading
+from pathlib import Path
+
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+from qdrant_client import QdrantClient
+
+from vector_store import COLLECTION_NAME, VECTOR_STORE, QdrantStore, VectorStore, get_default_store
+
+# Configuration
+QDRANT_URL = os.getenv("QDRANT_URL")  # unset: embedded store at the caller's path
+OPENAI_MAX_CONNECTIONS = 20
+# httpx drops idle connections after 5 s by default, shorter than a pause between questions
+OPENAI_KEEPALIVE_SECONDS = 300
+
+_lock = threading.Lock()
+_openai_client: OpenAI | None = None
+_qdrant_clients: dict[str, QdrantClient] = {}
+_qdrant_stores: dict[tuple[str, str], QdrantStore] = {}
+
+
+def get_openai_client() -> OpenAI:
+    """Process-wide OpenAI client with a keep-alive connection pool."""
+    global _openai_client
+    with _lock:
+        if _openai_client is None:
+            _openai_client = OpenAI(
+                http_client=DefaultHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                        keepalive_expiry=OPENAI_KEEPALIVE_SECONDS,
+                    )
+                )
+            )
+        return _openai_client
+
+
+def get_qdrant_client(path: Path, url: str | None = None) -> QdrantClient:
+    """
+    Process-wide Qdrant client: the server at `url` (default QDRANT_URL) if set,
+    otherwise the embedded store at `path`, which is opened once.
+    """
+    url = url or QDRANT_URL
+    location = url or str(path)
+    with _lock:
+        if location not in _qdrant_clients:
+            _qdrant_clients[location] = QdrantClient(url=url) if url else QdrantClient(path=str(path))
+        return _qdrant_clients[location]
+
+
+def get_vector_store(path: Path, url: str | None = None, collection: str = COLLECTION_NAME) -> VectorStore:
+    """
+    The configured vector store: the NumPy store if VECTOR_STORE is "numpy", else
+    `collection` through get_qdrant_client.
+    """
+    if VECTOR_STORE == "numpy":
+        return get_default_store()
+    client = get_qdrant_client(path, url)
+    location = url or QDRANT_URL or str(path)
+    with _lock:
+        if (location, collection) not in _qdrant_stores:
+            # Only a Qdrant server takes concurrent requests; the embedded client is not thread-safe
+            _qdrant_stores[location, collection] = QdrantStore(
+                client, collection, thread_safe=bool(url or QDRANT_URL), location=location
+            )
+        return _qdrant_stores[location, collection]
+
+
+@atexit.register
+def close_clients():
+    """Close shared clients before interpreter teardown (the embedded store flushes on close)."""
+    global _openai_client
+    with _lock:
+        for client in _qdrant_clients.values():
+            client.close()
+        _qdrant_clients.clear()
+        _qdrant_stores.clear()
+        if _openai_client is not None:
+            _openai_client.close()
+            _openai_client = None
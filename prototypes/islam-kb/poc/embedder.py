@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Concurrent embedding client: packs texts into token-budgeted batches, keeps a
+bounded number of requests in flight, and backs off on 429s and transient errors.
+
+embed_texts runs on a background event loop with one shared client, so ingest
+batches and query-time calls reuse its kept-alive connections.
+
+Point OPENAI_BASE_URL at stub_embedding_server.py to run it without the real API.
+"""
+
+import sys
+import math
+import time
+import random
+import asyncio
+import threading
+
+import httpx
+from openai import (
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+
+from embedding_cache import EmbeddingCache
+from clients import OPENAI_KEEPALIVE_SECONDS, OPENAI_MAX_CONNECTIONS
+
+# Configuration
+EMBED_CONCURRENCY = 4  # requests in flight
+EMBED_BATCH_TOKENS = 50_000  # API limit is 300k tokens per request
+EMBED_BATCH_MAX_INPUTS = 2048  # API limit on inputs per request
+EMBED_MAX_RETRIES = 6
+EMBED_BACKOFF_BASE = 1.0  # seconds, doubled per attempt
+EMBED_BACKOFF_MAX = 60.0
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+def pack_batches(
+    token_counts: list[int],
+    max_tokens: int = EMBED_BATCH_TOKENS,
+    max_inputs: int = EMBED_BATCH_MAX_INPUTS,
+) -> list[list[int]]:
+    """Group input indices into consecutive batches that fit the token and input limits."""
+    batches = []
+    current: list[int] = []
+    current_tokens = 0
+    for i, tokens in enumerate(token_counts):
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def truncate_embedding(vector: list[float], dims: int) -> list[float]:
+    """
+    Shorten a text-embedding-3 vector to its first `dims` dimensions and re-normalise.
+    The models are Matryoshka-trained, so this matches requesting `dimensions=dims`.
+    """
+    prefix = vector[:dims]
+    norm = math.sqrt(sum(v * v for v in prefix)) or 1.0
+    return [v / norm for v in prefix]
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait before retrying: the server's Retry-After if given, else jittered backoff."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        headers = response.headers
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+        except ValueError:
+            pass  # HTTP-date form; fall back to backoff
+    delay = min(EMBED_BACKOFF_MAX, EMBED_BACKOFF_BASE * 2 ** attempt)
+    return delay * (0.5 + random.random() / 2)
+
+
+class _RateLimitGate:
+    """Shared pause so one 429 holds back every worker, not just the one that hit it."""
+
+    def __init__(self):
+        self.resume_at = 0.0
+
+    def pause(self, seconds: float):
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    async def wait(self):
+        delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _embed_batch(
+    client: AsyncOpenAI,
+    texts: list[str],
+    model: str,
+    dimensions: int | None,
+    gate: _RateLimitGate,
+) -> list[list[float]]:
+    extra = {"dimensions": dimensions} if dimensions else {}
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        await gate.wait()
+        try:
+            response = await client.embeddings.create(model=model, input=texts, **extra)
+        except RETRYABLE_ERRORS as e:
+            if attempt == EMBED_MAX_RETRIES:
+                raise
+            delay = retry_delay(e, attempt)
+            if isinstance(e, RateLimitError):
+                gate.pause(delay)
+            print(f"    Embedding request failed ({type(e).__name__}), retrying in {delay:.1f}s", file=sys.stderr)
+            await asyncio.sleep(delay)
+            continue
+        # The API returns items with an index; don't rely on response order
+        return [e.embedding for e in sorted(response.data, key=lambda e: e.index)]
+
+
+async def embed_texts_async(
+    texts: list[str],
+    model: str,
+    dimensions: int | None = None,
+    concurrency: int = EMBED_CONCURRENCY,
+    max_tokens: int = EMBED_BATCH_TOKENS,
+    client: AsyncOpenAI | None = None,
+    cache: EmbeddingCache | None = None,
+    progress: bool = True,
+) -> list[list[float]]:
+    """
+    Embed texts with up to `concurrency` requests in flight. Output order matches input order.
+
+    With a cache, only texts it doesn't hold are sent (each distinct text once),
+    and each batch is written back as soon as it returns. progress=False drops
+    the per-batch lines (retries are still reported, on stderr).
+    """
+    embeddings: list[list[float] | None] = [None] * len(texts)
+    if cache is not None:
+        embeddings = cache.get_many(model, dimensions, texts)
+
+    # Distinct texts still to embed, with every position they fill
+    positions: dict[str, list[int]] = {}
+    for i, (text, vector) in enumerate(zip(texts, embeddings)):
+        if vector is None:
+            positions.setdefault(text, []).append(i)
+    pending = list(positions)
+    if not pending:
+        return embeddings
+
+    import tiktoken  # only needed for sending; query.py imports this module for truncate_embedding
+
+    encoding = tiktoken.encoding_for_model(model)
+    token_counts = [len(t) for t in encoding.encode_ordinary_batch(pending)]
+    batches = pack_batches(token_counts, max_tokens)
+
+    owns_client = client is None
+    if owns_client:
+        # SDK retries are disabled so Retry-After handling and backoff happen here
+        client = AsyncOpenAI(max_retries=0)
+
+    gate = _RateLimitGate()
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def run(batch: list[int]):
+        nonlocal done
+        batch_texts = [pending[i] for i in batch]
+        async with semaphore:
+            vectors = await _embed_batch(client, batch_texts, model, dimensions, gate)
+        for text, vector in zip(batch_texts, vectors):
+            for i in positions[text]:
+                embeddings[i] = vector
+        if cache is not None:
+            cache.put_many(model, dimensions, batch_texts, vectors)
+        done += 1
+        if progress:
+            print(f"    Embedded batch {done}/{len(batches)} ({len(batch)} texts)")
+
+    tasks = [asyncio.ensure_future(run(batch)) for batch in batches]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    finally:
+        if owns_client:
+            await client.close()
+
+    return embeddings
+
+
+_loop: asyncio.AbstractEventLoop | None = None
+_client: AsyncOpenAI | None = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> tuple[asyncio.AbstractEventLoop, AsyncOpenAI]:
+    """The event loop embed_texts runs on, in a daemon thread, and its client. Started on first use."""
+    global _loop, _client
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="embedder", daemon=True).start()
+            # SDK retries are disabled so Retry-After handling and backoff happen here.
+            # The client's connections belong to this loop, so it's only used on it.
+            _client = AsyncOpenAI(
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                        keepalive_expiry=OPENAI_KEEPALIVE_SECONDS,
+                    )
+                ),
+            )
+        return _loop, _client
+
+
+def embed_texts(texts: list[str], model: str, **kwargs) -> list[list[float]]:
+    """Synchronous wrapper around embed_texts_async, on the shared loop and client. Safe to call from any thread."""
+    loop, client = _background_loop()
+    kwargs.setdefault("client", client)
+    future = asyncio.run_coroutine_threadsafe(embed_texts_async(texts, model, **kwargs), loop)
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()  # e.g. Ctrl-C in the caller: stop the requests still in flight
+        raise
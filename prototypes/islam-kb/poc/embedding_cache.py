@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Persistent, content-addressed embedding cache shared by ingest and query.
+
+Vectors are stored as float32 blobs in SQLite, keyed by sha256(model, dims, text).
+Least-recently-used entries are evicted once the stored vectors exceed the size cap.
+The stored size is counted once on open and kept up to date by puts, and hits
+update last_used in batches, so lookups don't each cost a write.
+"""
+
+import time
+import sqlite3
+import threading
+import hashlib
+from array import array
+from pathlib import Path
+
+# Configuration
+CACHE_PATH = Path(__file__).parent / "embedding_cache.sqlite"
+CACHE_MAX_BYTES = 2 * 1024 ** 3  # ~170k vectors at 3072 dims
+TOUCH_FLUSH_ENTRIES = 1000  # buffered last_used updates written together
+TOUCH_FLUSH_SECONDS = 60.0
+
+
+def cache_key(model: str, dims: int | None, text: str) -> bytes:
+    return hashlib.sha256(f"{model}\0{dims}\0{text}".encode()).digest()
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache with LRU eviction and hit/miss counters."""
+
+    def __init__(self, path: Path | None = None, max_bytes: int | None = None):
+        self.path = Path(path or CACHE_PATH)
+        self.max_bytes = max_bytes or CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Shared across ingest stage threads; self.lock serialises access
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+        # Only this process's writes are counted; _evict recounts before deleting anything
+        self.stored_bytes = self._count_bytes()
+        self._touched: dict[bytes, float] = {}
+        self._touch_flushed = time.monotonic()
+
+    def _count_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def _existing(self, keys: list[bytes]) -> set[bytes]:
+        found = set()
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            found.update(k for (k,) in self.conn.execute(
+                f"SELECT key FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+            ))
+        return found
+
+    def _flush_touches(self):
+        """Write buffered last_used updates. Call with the lock held."""
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?", [(t, k) for k, t in self._touched.items()]
+            )
+            self.conn.commit()
+            self._touched.clear()
+        self._touch_flushed = time.monotonic()
+
+    def get_many(self, model: str, dims: int | None, texts: list[str]) -> list[list[float] | None]:
+        """Look up texts; returns a vector or None per text, in order."""
+        keys = [cache_key(model, dims, t) for t in texts]
+        found = {}
+        with self.lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                found.update(rows)
+
+            now = time.time()
+            self._touched.update((k, now) for k in found)
+            if (len(self._touched) >= TOUCH_FLUSH_ENTRIES
+                    or time.monotonic() - self._touch_flushed >= TOUCH_FLUSH_SECONDS):
+                self._flush_touches()
+
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += sum(1 for k in keys if k not in found)
+
+        return [array("f", found[k]).tolist() if k in found else None for k in keys]
+
+    def get(self, model: str, dims: int | None, text: str) -> list[float] | None:
+        return self.get_many(model, dims, [text])[0]
+
+    def put_many(self, model: str, dims: int | None, texts: list[str], vectors: list[list[float]]):
+        now = time.time()
+        rows = [(cache_key(model, dims, t), array("f", v).tobytes(), now) for t, v in zip(texts, vectors)]
+        with self.lock:
+            # A key's vector size is fixed by (model, dims), so only new keys add bytes
+            existing = self._existing([key for key, _, _ in rows])
+            added = sum(len(vector) for key, vector, _ in {r[0]: r for r in rows}.values() if key not in existing)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self.conn.commit()
+            self.stored_bytes += added
+            if self.stored_bytes > self.max_bytes:
+                self._evict()
+
+    def put(self, model: str, dims: int | None, text: str, vector: list[float]):
+        self.put_many(model, dims, [text], [vector])
+
+    def _evict(self):
+        """Drop least-recently-used entries until the stored vectors fit in max_bytes."""
+        self._flush_touches()
+        total = self.stored_bytes = self._count_bytes()  # other processes may have added or evicted
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+        self.conn.commit()
+        self.stored_bytes -= freed
+        self.evictions += len(doomed)
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_mb": size / 1024 ** 2,
+        }
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"Embedding cache: {s['hits']} hits, {s['misses']} misses "
+                f"({s['hit_rate']:.0%}), {s['entries']} entries, {s['size_mb']:.1f} MB")
+
+    def close(self):
+        with self.lock:
+            self._flush_touches()
+            self.conn.close()
+
+
+_default_cache: EmbeddingCache | None = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> EmbeddingCache:
+    """Process-wide cache at CACHE_PATH, opened on first use."""
+    global _default_cache
+    if _default_cache is None:  # checked again under the lock; this path runs for every embedding lookup
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = EmbeddingCache()
+    return _default_cache
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Honorific normalization for text extracted from PDFs.
+
+Kept free of heavy imports so the query side can use it without loading the
+ingest dependencies (PyMuPDF, tiktoken) that pipeline.py needs.
+"""
+
+import re
+
+
+# Common Islamic names that may have honorifics attached
+ISLAMIC_NAMES = {
+    # Female companions and family
+    "Khadijah", "Khadija", "Aisha", "Ayesha", "Fatimah", "Fatima",
+    "Hafsa", "Hafsah", "Maryam", "Mariam", "Zainab", "Zaynab",
+    "Safiyyah", "Safiyya", "Maymunah", "Maimuna", "Sawdah", "Sawda",
+    "Juwayriyah", "Juwairiya", "Umm", "Asma", "Sumayyah", "Sumayya",
+    # Male companions
+    "Abu", "Umar", "Uthman", "Ali", "Zaid", "Zayd", "Bilal",
+    "Hamza", "Hamzah", "Abbas", "Khalid", "Salman", "Ammar",
+    "Muadh", "Saad", "Sa'd", "Talha", "Talhah", "Zubair", "Zubayr",
+    "Abdur", "Abdul", "Anas", "Jabir", "Hudhaifa", "Hudhayfah",
+    # Prophets
+    "Ibrahim", "Ibraheem", "Musa", "Moosa", "Isa", "Eisa",
+    "Nuh", "Nooh", "Yusuf", "Yaqub", "Ishaq", "Ismail",
+    "Dawud", "Dawood", "Sulaiman", "Suleiman", "Yunus", "Younus",
+    "Ayyub", "Ayub", "Zakariya", "Zakariyya", "Yahya", "Yahiya",
+    "Idris", "Hud", "Salih", "Shuaib", "Lut", "Adam",
+    "Jesus", "Christ", "Moses", "Abraham", "Noah", "Joseph",
+    # The Prophet
+    "Muhammad", "Mohammed", "Mohammad", "Prophet", "Messenger",
+    # Ahmadiyya specific
+    "Mirza", "Ghulam", "Ahmad", "Masroor", "Tahir", "Bashir",
+    "Mahmud", "Mahmood",
+    # Titles that may precede names
+    "Hadhrat", "Hadrat", "Hazrat", "Syedna", "Sayyidina",
+}
+
+# Honorific patterns (lowercase) - order matters, longer ones first
+HONORIFICS = ["pbuh", "saw", "rta", "aba", "ata", "ra", "sa", "as", "rh"]
+
+# Common English words that the generic pattern must leave alone
+HONORIFIC_SKIP_WORDS = {
+    'extra', 'ultra', 'aura', 'flora', 'zebra', 'cobra',
+    'opera', 'camera', 'era', 'umbrella', 'formula',
+    'was', 'has', 'is', 'as',
+}
+
+
+def _trie_pattern(words) -> str:
+    """Build a regex alternation from a character trie so shared prefixes are matched once."""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def walk(node: dict) -> str:
+        branches = [re.escape(ch) + walk(child) for ch, child in sorted(node.items()) if ch]
+        optional = "" in node
+        if not branches:
+            return ""
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if optional else body
+
+    return walk(trie)
+
+
+# Single-pass matcher built once at import. The first alternative is a known name
+# directly followed by an honorific (case-insensitive, one named group per honorific
+# so the canonical lowercase form can be recovered); the second is the generic
+# capitalised word ending in an honorific (case-sensitive).
+_HONORIFIC_GROUPS = "|".join(f"(?P<h{i}>{re.escape(h)})" for i, h in enumerate(HONORIFICS))
+_HONORIFIC_RE = re.compile(
+    rf"(?i:\b(?P<name>{_trie_pattern({n.lower() for n in ISLAMIC_NAMES})})(?:{_HONORIFIC_GROUPS})\b)"
+    rf"|\b(?P<word>[A-Z][a-z]*[ahindrmsbl](?:{_trie_pattern(HONORIFICS)}))\b"
+)
+_GENERIC_NAME_RE = re.compile(r"[A-Z][a-z]*[ahindrmsbl]")
+
+
+def _split_generic(word: str) -> str:
+    """
+    Peel honorifics off a capitalised word, trying each one in HONORIFICS order.
+
+    The remaining name is re-checked against the later honorifics only,
+    e.g. "Kalsara" -> "Kal(sa)(ra)".
+    """
+    suffix = ""
+    for hon in HONORIFICS:
+        if not word.endswith(hon):
+            continue
+        name_part = word[:-len(hon)]
+        if not _GENERIC_NAME_RE.fullmatch(name_part):
+            continue
+        if (word.lower() in HONORIFIC_SKIP_WORDS
+                or name_part.lower() in HONORIFIC_SKIP_WORDS
+                or len(name_part) < 3):
+            continue
+        word, suffix = name_part, f"({hon})" + suffix
+    return word + suffix
+
+
+def _replace_honorific(match: re.Match) -> str:
+    if match.group("word") is not None:
+        return _split_generic(match.group("word"))
+    hon = HONORIFICS[int(match.lastgroup[1:])]
+    # Known names still go through the generic pass afterwards
+    return _split_generic(match.group("name")) + f"({hon})"
+
+
+def normalize_honorifics(text: str) -> str:
+    """
+    Fix honorifics that got merged with names during PDF extraction.
+    e.g., "Khadijahra" -> "Khadijah(ra)", "Muhammadsaw" -> "Muhammad(saw)"
+
+    Known names (ISLAMIC_NAMES) are matched case-insensitively; other capitalised
+    words ending in an honorific are split unless they look like English words.
+    """
+    return _HONORIFIC_RE.sub(_replace_honorific, text)
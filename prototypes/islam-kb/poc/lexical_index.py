@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Local BM25 index over the chunk texts, for exact-term matches dense retrieval
+misses (Arabic transliterations, honorific-tagged names).
+
+Chunks live in a SQLite table with an FTS5 index over their text (unicode61
+tokenizer with diacritics folded, so "Khātam" matches "Khatam"); SQLite's
+bm25() does the ranking. pipeline.py keeps it in step with the Qdrant
+collection, and fills it from the chunks files if it's missing.
+
+    python lexical_index.py stats
+    python lexical_index.py authors
+    python lexical_index.py search "Khatam-un-Nabiyyin" --author Mirza-Ghulam-Ahmad
+"""
+
+import re
+import sys
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+
+from honorifics import normalize_honorifics
+
+# Configuration
+LEXICAL_INDEX_PATH = Path(__file__).parent / "lexical_index.sqlite"
+
+# Words left out of lexical queries: they match nearly every chunk
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "to", "for", "and", "or", "is", "are", "was", "were",
+    "be", "what", "who", "why", "how", "when", "where", "which", "does", "do", "did", "about",
+    "me", "tell", "explain", "please", "can", "you", "it", "its", "this", "that", "with", "by",
+}
+
+# Payload fields search results can be filtered on
+FILTER_FIELDS = {"author", "book", "pdf_filename"}
+
+
+def query_terms(text: str) -> list[str]:
+    """Distinct lowercase terms of a query, honorifics normalised as at ingest, stopwords dropped."""
+    words = re.findall(r"\w+", normalize_honorifics(text).lower())
+    return list(dict.fromkeys(w for w in words if w not in STOPWORDS))
+
+
+def match_expression(text: str) -> str | None:
+    """FTS5 query matching chunks with any of the terms (quoted, so user input can't inject syntax)."""
+    terms = query_terms(text)
+    return " OR ".join(f'"{t}"' for t in terms) if terms else None
+
+
+def filter_values(filters: dict | None) -> dict[str, list[str]]:
+    """Validated {field: [values]} from filters such as {"author": "X", "book": ["Y", "Z"]}."""
+    normalized = {}
+    for field, values in (filters or {}).items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Can't filter on {field!r}; use one of {sorted(FILTER_FIELDS)}")
+        normalized[field] = [values] if isinstance(values, str) else list(values)
+    return normalized
+
+
+class LexicalIndex:
+    """SQLite FTS5 index of chunks keyed by (pdf_filename, chunk_index)."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path or LEXICAL_INDEX_PATH)
+        # Written by the ingest upsert thread, read by query server threads
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                pdf_filename TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                book TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                author TEXT NOT NULL DEFAULT '',
+                UNIQUE (pdf_filename, chunk_index)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                text, content='chunks', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+                INSERT INTO chunks_fts (rowid, text) VALUES (new.id, new.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+                INSERT INTO chunks_fts (chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            END;
+        """)
+        # Indexes built before chunks carried an author
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(chunks)")}
+        if "author" not in columns:
+            self.conn.execute("ALTER TABLE chunks ADD COLUMN author TEXT NOT NULL DEFAULT ''")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS chunks_author ON chunks (author)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS chunks_book ON chunks (book)")
+        self.conn.commit()
+
+    def add(self, chunks: list[dict]):
+        """
+        Index chunks (dicts with text, book, page, chunk_index, pdf_filename and
+        optionally author), replacing any already there.
+        """
+        with self.lock:
+            self.conn.executemany(
+                "DELETE FROM chunks WHERE pdf_filename = ? AND chunk_index = ?",
+                [(c["pdf_filename"], c["chunk_index"]) for c in chunks],
+            )
+            self.conn.executemany(
+                "INSERT INTO chunks (pdf_filename, chunk_index, book, page, text, author) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (c["pdf_filename"], c["chunk_index"], c["book"], c["page"], c["text"], c.get("author", ""))
+                    for c in chunks
+                ],
+            )
+            self.conn.commit()
+
+    def delete_pdf(self, pdf_filename: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM chunks WHERE pdf_filename = ?", (pdf_filename,))
+            self.conn.commit()
+
+    def set_author(self, pdf_filename: str, author: str):
+        with self.lock:
+            self.conn.execute("UPDATE chunks SET author = ? WHERE pdf_filename = ?", (author, pdf_filename))
+            self.conn.commit()
+
+    def search(self, query: str, limit: int, filters: dict[str, list[str]] | None = None) -> list[dict]:
+        """
+        Best `limit` chunks by BM25, in the same shape as query.search results
+        (higher score is better), optionally restricted to filters such as
+        {"author": [...], "book": [...]}.
+        """
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        where, params = ["chunks_fts MATCH ?"], [expression]
+        for field, values in filter_values(filters).items():
+            where.append(f"c.{field} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT c.text, c.book, c.page, c.pdf_filename, c.chunk_index, c.author, bm25(chunks_fts)"
+                " FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid"
+                f" WHERE {' AND '.join(where)} ORDER BY bm25(chunks_fts) LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [
+            {
+                "text": text, "book": book, "page": page, "pdf_filename": pdf, "chunk_index": idx,
+                "author": author, "score": -rank,
+            }
+            for text, book, page, pdf, idx, author, rank in rows
+        ]
+
+    def authors(self) -> list[tuple[str, int, int]]:
+        """(author, books, chunks) for every author in the index."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT author, COUNT(DISTINCT pdf_filename), COUNT(*) FROM chunks GROUP BY author ORDER BY author"
+            ).fetchall()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+_default_index: LexicalIndex | None = None
+_default_lock = threading.Lock()
+
+
+def get_default_index() -> LexicalIndex:
+    """Process-wide index at LEXICAL_INDEX_PATH, opened (and created if needed) on first use."""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = LexicalIndex()
+        return _default_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the lexical (BM25) chunk index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Indexed chunks and books")
+    sub.add_parser("authors", help="Authors to filter on, with their book and chunk counts")
+    search_cmd = sub.add_parser("search", help="Top chunks for a query")
+    search_cmd.add_argument("query")
+    search_cmd.add_argument("--limit", type=int, default=10)
+    search_cmd.add_argument("--author", action="append", help="Only this author (repeatable)")
+    search_cmd.add_argument("--book", action="append", help="Only this book (repeatable)")
+    args = parser.parse_args()
+
+    if not LEXICAL_INDEX_PATH.exists():
+        print(f"No lexical index at {LEXICAL_INDEX_PATH}; run pipeline.py first")
+        sys.exit(1)
+
+    index = get_default_index()
+    if args.command == "stats":
+        books = index.conn.execute("SELECT COUNT(DISTINCT pdf_filename) FROM chunks").fetchone()[0]
+        size_mb = LEXICAL_INDEX_PATH.stat().st_size / 1024 ** 2
+        print(f"{len(index)} chunks from {books} books, {size_mb:.1f} MB")
+    elif args.command == "authors":
+        for author, books, chunks in index.authors():
+            print(f"  {author or '(none)':<40} {books:>5} books {chunks:>8} chunks")
+    else:
+        print(f"Match: {match_expression(args.query)}")
+        filters = {k: v for k, v in (("author", args.author), ("book", args.book)) if v}
+        for i, r in enumerate(index.search(args.query, args.limit, filters), 1):
+            print(f"  {i}. [{r['score']:.2f}] {r['book']}, p.{r['page']}: {r['text'][:100]!r}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
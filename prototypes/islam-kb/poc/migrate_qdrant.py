@@ -1,126 +1,400 @@
 #!/usr/bin/env python3
 """
 Migrate data from Qdrant SQLite storage to running Qdrant server.
+
+Points are streamed from the local store's SQLite file a row at a time, so the
+corpus never has to fit in memory: vectors are kept as float32 NumPy arrays,
+grouped into batches of about BATCH_BYTES of request body, and uploaded by
+MIGRATE_WORKERS threads with a bounded number of batches in flight. The target
+collection is created with the source collection's config (vector names and
+sizes, quantization, HNSW) read from the store's meta.json.
+
+Points keep their IDs (pipeline's chunk IDs), so uploads are idempotent and a
+rerun never needs to drop the target. Progress is checkpointed in
+MIGRATION_CHECKPOINT as the last source row up to which every batch has been
+committed; a batch that keeps failing after MIGRATE_MAX_RETRIES stops the run,
+and rerunning resumes from the checkpoint. Rows that can't be decoded are
+listed at the end (the run exits non-zero) and kept in the checkpoint, so a
+rerun tries them again. Rows the local store has written
+since (new or re-ingested points) are picked up by a later run; deleted points
+are not, use --fresh for that.
+
+Every run ends by verifying the target: point counts, and a random sample of
+points compared vector by vector with the source.
+
+This reads the embedded store's internal (pickled) storage; snapshot.py moves
+a collection through a portable, documented format instead.
+
+    python migrate_qdrant.py
+    python migrate_qdrant.py --source qdrant_data --url http://localhost:6333 --workers 8
+    python migrate_qdrant.py --verify
+    python migrate_qdrant.py --fresh
 """
 
-import sqlite3
-import pickle
+import os
+import sys
+import json
 import time
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+import pickle
+import random
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Callable, Iterator
+from collections import deque
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-# Source: SQLite file from local Qdrant
-SQLITE_PATH = "qdrant_data/collection/islamic_books/storage.sqlite"
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from qdrant_client.models import Batch, CreateCollection
 
-# Target: Running Qdrant server
-QDRANT_URL = "http://localhost:6333"
+# Configuration
+QDRANT_PATH = Path(__file__).parent / "qdrant_data"  # local store to read
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")  # server to write
 COLLECTION_NAME = "islamic_books"
-VECTOR_SIZE = 3072
+MIGRATION_CHECKPOINT = Path(__file__).parent / "migration_checkpoint.json"
+BATCH_BYTES = 8 * 1024 ** 2  # estimated JSON body per upsert; the server accepts up to 32 MB
+JSON_BYTES_PER_FLOAT = 20  # a float32 serialises as e.g. "-0.012345678918063641,"
+MIGRATE_WORKERS = 4
+MIGRATE_MAX_RETRIES = 5
+MIGRATE_BACKOFF_BASE = 1.0  # seconds, doubled per attempt
+MIGRATE_BACKOFF_MAX = 30.0
+VERIFY_SAMPLE = 200  # points compared with the source after a run
+VERIFY_TOLERANCE = 1e-5  # the server stores cosine vectors normalised
 
 
-def read_vectors_from_sqlite():
-    """Read all vectors and payloads from SQLite storage."""
-    conn = sqlite3.connect(SQLITE_PATH)
-    cursor = conn.cursor()
+def storage_path(source: Path, collection: str) -> Path:
+    return source / "collection" / collection / "storage.sqlite"
 
-    cursor.execute("SELECT id, point FROM points")
-    rows = cursor.fetchall()
-    print(f"Found {len(rows)} rows")
 
-    points = []
-    for i, (point_id, point_blob) in enumerate(rows):
-        try:
-            data = pickle.loads(point_blob)
+def collection_config(source: Path, collection: str) -> CreateCollection:
+    """The collection's creation parameters, as the local store recorded them."""
+    with open(source / "meta.json") as f:
+        return CreateCollection(**json.load(f)["collections"][collection])
 
-            vector = data.vector
-            if isinstance(vector, dict):
-                vector = vector.get('') or list(vector.values())[0]
 
-            if hasattr(vector, 'tolist'):
-                vector = vector.tolist()
-            elif not isinstance(vector, list):
-                vector = list(vector)
+def vector_sizes(vectors) -> dict[str, int]:
+    if isinstance(vectors, dict):
+        return {name: params.size for name, params in vectors.items()}
+    return {"": vectors.size}
 
-            points.append({
-                "id": i,
-                "vector": vector,
-                "payload": data.payload or {}
-            })
 
-        except Exception as e:
-            print(f"Error on point {i}: {e}")
+def load_checkpoint(path: Path, db_path: Path, url: str) -> dict:
+    """Progress of an earlier run from db_path to url, or a fresh start."""
+    fresh = {
+        "source": str(db_path.resolve()), "url": url, "collection": COLLECTION_NAME,
+        "rowid": 0, "uploaded": 0, "failed_rowids": [],
+    }
+    if not path.exists():
+        return fresh
+    with open(path) as f:
+        checkpoint = json.load(f)
+    same_run = all(checkpoint.get(key) == fresh[key] for key in ("source", "url", "collection"))
+    return {**fresh, **checkpoint} if same_run else fresh
 
-    conn.close()
-    print(f"Decoded {len(points)} points")
-    return points
 
+def save_checkpoint(path: Path, checkpoint: dict):
+    # Write-then-rename so a crash never leaves a truncated checkpoint
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump({**checkpoint, "updated": datetime.now().isoformat()}, f, indent=2)
+    tmp_path.replace(path)
 
-def migrate_to_server(points):
-    """Upload points to Qdrant server."""
-    client = QdrantClient(
-        url=QDRANT_URL,
-        timeout=120,  # Longer timeout
-        check_compatibility=False  # Skip version check
-    )
 
-    # Check if collection exists
+def decode_point(point_blob: bytes) -> tuple[int | str, dict[str, np.ndarray], dict]:
+    data = pickle.loads(point_blob)
+    vector = data.vector if isinstance(data.vector, dict) else {"": data.vector}
+    return data.id, {name: np.asarray(v, dtype=np.float32) for name, v in vector.items()}, data.payload or {}
+
+
+def iter_points(
+    db_path: Path,
+    after_rowid: int = 0,
+    retry_rowids: list[int] = (),
+    failed: list[int] | None = None,
+) -> Iterator[tuple[int, int | str, dict[str, np.ndarray], dict]]:
+    """
+    (rowid, id, {vector name: float32 array}, payload) per point after after_rowid,
+    and for retry_rowids, in row order. Rows that fail to decode are skipped and
+    their rowids appended to `failed`.
+    """
+    conn = sqlite3.connect(db_path)
     try:
-        info = client.get_collection(COLLECTION_NAME)
-        if info.points_count > 0:
-            print(f"Collection already has {info.points_count} points")
-            response = input("Delete and recreate? (y/n): ")
-            if response.lower() != 'y':
-                print("Aborting")
-                return
+        # Iterating the cursor fetches rows as they're consumed rather than all at once
+        rows = conn.execute(
+            f"SELECT rowid, point FROM points WHERE rowid > ? OR rowid IN ({','.join('?' * len(retry_rowids))})"
+            " ORDER BY rowid",
+            (after_rowid, *retry_rowids),
+        )
+        for rowid, point_blob in rows:
+            try:
+                yield rowid, *decode_point(point_blob)
+            except Exception as e:
+                print(f"Error on row {rowid}: {e}")
+                if failed is not None:
+                    failed.append(rowid)
+    finally:
+        conn.close()
+
+
+def iter_batches(
+    points: Iterator[tuple[int, int | str, dict[str, np.ndarray], dict]],
+    batch_bytes: int = BATCH_BYTES,
+) -> Iterator[tuple[int, Batch]]:
+    """Group points into upserts of about batch_bytes of request body each, with the last rowid of each."""
+    ids, vectors, payloads, size = [], [], [], 0
+    for rowid, point_id, vector, payload in points:
+        ids.append(point_id)
+        vectors.append(vector)
+        payloads.append(payload)
+        size += sum(v.size for v in vector.values()) * JSON_BYTES_PER_FLOAT + len(json.dumps(payload))
+        if size >= batch_bytes:
+            yield rowid, make_batch(ids, vectors, payloads)
+            ids, vectors, payloads, size = [], [], [], 0
+    if ids:
+        yield rowid, make_batch(ids, vectors, payloads)
+
+
+def make_batch(ids: list[int | str], vectors: list[dict[str, np.ndarray]], payloads: list[dict]) -> Batch:
+    # One contiguous (points, dims) matrix per vector name; lists only at serialisation
+    matrices = {name: np.stack([v[name] for v in vectors]) for name in vectors[0]}
+    columns = matrices[""].tolist() if list(matrices) == [""] else {n: m.tolist() for n, m in matrices.items()}
+    return Batch(ids=ids, vectors=columns, payloads=payloads)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Connection problems, timeouts, 429 and 5xx; not requests the server rejected."""
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code is not None and (error.status_code == 429 or error.status_code >= 500)
+    return isinstance(error, (ResponseHandlingException, ConnectionError, TimeoutError))
+
+
+def upsert_with_retry(client: QdrantClient, batch: Batch) -> int:
+    for attempt in range(MIGRATE_MAX_RETRIES + 1):
+        try:
+            client.upsert(collection_name=COLLECTION_NAME, points=batch)
+            return len(batch.ids)
+        except Exception as e:
+            if attempt == MIGRATE_MAX_RETRIES or not is_retryable(e):
+                raise
+            delay = min(MIGRATE_BACKOFF_MAX, MIGRATE_BACKOFF_BASE * 2 ** attempt) * (0.5 + random.random() / 2)
+            print(f"Batch starting {batch.ids[0]} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def create_target(client: QdrantClient, config: CreateCollection, fresh: bool = False):
+    """Create the target collection with the source's config, dropping an existing one if fresh."""
+    if client.collection_exists(COLLECTION_NAME):
+        if not fresh:
+            existing = client.get_collection(COLLECTION_NAME).config.params.vectors
+            if vector_sizes(existing) != vector_sizes(config.vectors):
+                raise ValueError(
+                    f"Target {COLLECTION_NAME} has vectors {vector_sizes(existing)}, source has "
+                    f"{vector_sizes(config.vectors)}. Rerun with --fresh to recreate it."
+                )
+            print(f"Collection {COLLECTION_NAME} exists, upserting into it")
+            return
         client.delete_collection(COLLECTION_NAME)
         print(f"Deleted existing collection")
-    except:
-        pass
 
-    # Create collection
     client.create_collection(
         collection_name=COLLECTION_NAME,
-        vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE),
+        vectors_config=config.vectors,
+        sparse_vectors_config=config.sparse_vectors,
+        hnsw_config=config.hnsw_config,
+        optimizers_config=config.optimizers_config,
+        quantization_config=config.quantization_config,
+        on_disk_payload=config.on_disk_payload,
     )
     print(f"Created collection {COLLECTION_NAME}")
 
-    # Upload in smaller batches
-    batch_size = 50  # Smaller batches
-    delay_between_batches = 0.2
 
-    for i in range(0, len(points), batch_size):
-        batch = points[i:i + batch_size]
+def migrate_to_server(
+    client: QdrantClient,
+    db_path: Path,
+    after_rowid: int = 0,
+    on_commit: Callable[[int, int], None] | None = None,
+    workers: int = MIGRATE_WORKERS,
+    batch_bytes: int = BATCH_BYTES,
+    retry_rowids: list[int] = (),
+    failed: list[int] | None = None,
+) -> tuple[int, float]:
+    """
+    Upload every point in db_path after after_rowid, plus the rows in
+    retry_rowids. Returns (uploaded, seconds); rows that fail to decode are
+    appended to `failed` (see iter_points).
+
+    on_commit(rowid, committed) is called whenever every row up to rowid (and
+    `committed` points in all) is in the target. Batches finish out of order, so that's the end of the longest
+    run of finished batches. A batch that fails for good stops the migration:
+    batches in flight are finished, then its error is raised.
+    """
+    conn = sqlite3.connect(db_path)
+    total = conn.execute(
+        f"SELECT COUNT(*) FROM points WHERE rowid > ? OR rowid IN ({','.join('?' * len(retry_rowids))})",
+        (after_rowid, *retry_rowids),
+    ).fetchone()[0]
+    conn.close()
+    print(f"Found {total} points to upload")
+
+    uploaded, committed = 0, 0
+    order = deque()  # last rowid of each batch not yet committed, in submission order
+    finished = {}  # last rowid -> points, of batches uploaded but not yet committed
+    failure = None
+    start = time.perf_counter()
+
+    def collect(done):
+        nonlocal uploaded, committed, failure
+        for future in done:
+            rowid, batch = pending.pop(future)
+            try:
+                finished[rowid] = future.result()
+            except Exception as e:
+                print(f"Batch starting {batch.ids[0]} failed: {e}")
+                failure = failure or e
+                continue
+            uploaded += finished[rowid]
+        last = None
+        while order and order[0] in finished:
+            last = order.popleft()
+            committed += finished.pop(last)
+        if last is not None and on_commit:
+            on_commit(last, committed)
+        elapsed = time.perf_counter() - start
+        print(f"Uploaded {uploaded}/{total} ({100 * uploaded // max(total, 1)}%), {uploaded / elapsed:.0f} points/s")
+
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="migrate") as pool:
+        for rowid, batch in iter_batches(iter_points(db_path, after_rowid, retry_rowids, failed), batch_bytes):
+            # Bound batches in flight so reading never runs ahead of the uploads
+            if len(pending) >= 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            if failure:
+                break
+            order.append(rowid)
+            pending[pool.submit(upsert_with_retry, client, batch)] = (rowid, batch)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    if failure:
+        raise failure
+    return uploaded, time.perf_counter() - start
+
+
+def verify(client: QdrantClient, db_path: Path, sample: int = VERIFY_SAMPLE) -> bool:
+    """Compare point counts, and a random sample of points' vectors and payloads, with the source."""
+    conn = sqlite3.connect(db_path)
+    source_count = conn.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+    rows = conn.execute("SELECT rowid, point FROM points ORDER BY RANDOM() LIMIT ?", (sample,)).fetchall()
+    conn.close()
+    target_count = client.count(COLLECTION_NAME, exact=True).count
+    print(f"Verify: source {source_count} points, target {target_count}")
+
+    expected, mismatched = {}, []
+    for rowid, point_blob in rows:
         try:
-            client.upsert(
-                collection_name=COLLECTION_NAME,
-                points=[
-                    PointStruct(
-                        id=p["id"],
-                        vector=p["vector"],
-                        payload=p["payload"]
-                    )
-                    for p in batch
-                ]
-            )
-            progress = min(i + batch_size, len(points))
-            print(f"Uploaded {progress}/{len(points)} ({100*progress//len(points)}%)")
+            point_id, vectors, payload = decode_point(point_blob)
         except Exception as e:
-            print(f"Error at batch {i}: {e}")
-            time.sleep(2)
+            mismatched.append((f"row {rowid}", f"can't decode: {e}"))
+            continue
+        expected[point_id] = (vectors, payload)
+    found = client.retrieve(COLLECTION_NAME, ids=list(expected), with_vectors=True, with_payload=True)
+    targets = {str(p.id).replace("-", ""): p for p in found}
+
+    for point_id, (vectors, payload) in expected.items():
+        target = targets.get(str(point_id).replace("-", ""))
+        if target is None:
+            mismatched.append((point_id, "missing"))
             continue
-        time.sleep(delay_between_batches)
+        target_vectors = target.vector if isinstance(target.vector, dict) else {"": target.vector}
+        for name, vector in vectors.items():
+            other = np.asarray(target_vectors.get(name, []), dtype=np.float32)
+            norm = np.linalg.norm(vector) or 1.0
+            if other.shape != vector.shape or not np.allclose(vector / norm, other, atol=VERIFY_TOLERANCE):
+                mismatched.append((point_id, f"vector {name or '(default)'} differs"))
+        if target.payload != payload:
+            mismatched.append((point_id, "payload differs"))
+
+    for point_id, problem in mismatched[:10]:
+        print(f"  {point_id}: {problem}")
+    print(f"Verify: {len(rows) - len({p for p, _ in mismatched})}/{len(rows)} sampled points match")
+    return source_count == target_count and not mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the local Qdrant store's collection to a Qdrant server")
+    parser.add_argument("--source", type=Path, default=QDRANT_PATH, help="Local store directory")
+    parser.add_argument("--url", default=QDRANT_URL, help="Target Qdrant server")
+    parser.add_argument("--workers", type=int, default=MIGRATE_WORKERS, help="Concurrent upserts")
+    parser.add_argument("--batch-mb", type=float, default=BATCH_BYTES / 1024 ** 2, help="Request body per upsert")
+    parser.add_argument("--sample", type=int, default=VERIFY_SAMPLE, help="Points to compare when verifying")
+    parser.add_argument("--verify", action="store_true", help="Only verify the target against the source")
+    parser.add_argument("--fresh", action="store_true", help="Drop the target and checkpoint and start over")
+    args = parser.parse_args()
+
+    db_path = storage_path(args.source, COLLECTION_NAME)
+    if not db_path.exists():
+        print(f"No collection {COLLECTION_NAME} at {args.source}")
+        sys.exit(1)
+
+    client = QdrantClient(
+        url=args.url,
+        timeout=120,  # Longer timeout
+        check_compatibility=False  # Skip version check
+    )
+    if args.verify:
+        sys.exit(0 if verify(client, db_path, args.sample) else 1)
+
+    if args.fresh:
+        MIGRATION_CHECKPOINT.unlink(missing_ok=True)
+    checkpoint = load_checkpoint(MIGRATION_CHECKPOINT, db_path, args.url)
+    create_target(client, collection_config(args.source, COLLECTION_NAME), args.fresh)
+    if checkpoint["rowid"]:
+        print(f"Resuming after row {checkpoint['rowid']} ({checkpoint['uploaded']} points already uploaded)")
+    retry_rowids = checkpoint["failed_rowids"]
+    if retry_rowids:
+        print(f"Retrying {len(retry_rowids)} rows that failed to decode before")
+    failed: list[int] = []
+
+    def commit(rowid: int, committed: int):
+        # Rows are read in order, so earlier failures up to rowid have been retried (and are in
+        # `failed` again if they still don't decode); a batch of only retried rows ends below the checkpoint
+        save_checkpoint(MIGRATION_CHECKPOINT, {
+            **checkpoint,
+            "rowid": max(rowid, checkpoint["rowid"]),
+            "uploaded": checkpoint["uploaded"] + committed,
+            "failed_rowids": sorted({*failed, *(r for r in retry_rowids if r > rowid)}),
+        })
+
+    print(f"\nMigrating to {args.url} with {args.workers} workers...")
+    try:
+        uploaded, seconds = migrate_to_server(
+            client, db_path, checkpoint["rowid"], commit, args.workers, int(args.batch_mb * 1024 ** 2),
+            retry_rowids, failed,
+        )
+    except Exception as e:
+        print(f"\nMigration stopped: {type(e).__name__}: {e}")
+        print(f"Progress is saved in {MIGRATION_CHECKPOINT}; rerun to resume")
+        sys.exit(1)
 
-    # Verify
-    info = client.get_collection(COLLECTION_NAME)
-    print(f"Migration complete! Collection has {info.points_count} points")
+    print(f"\n{uploaded} points in {seconds:.1f}s ({uploaded / max(seconds, 1e-9):.0f} points/s)")
+    if failed:
+        save_checkpoint(MIGRATION_CHECKPOINT, {**load_checkpoint(MIGRATION_CHECKPOINT, db_path, args.url),
+                                               "failed_rowids": sorted(failed)})
+        print(f"{len(failed)} rows could not be decoded and were not uploaded (rowids in {MIGRATION_CHECKPOINT}):")
+        print("  " + ", ".join(map(str, sorted(failed)[:50])) + (", ..." if len(failed) > 50 else ""))
+    if not verify(client, db_path, args.sample):
+        print("Verification failed")
+        sys.exit(1)
+    if failed:
+        print("Migration incomplete: rerun to retry the rows that failed to decode")
+        sys.exit(1)
+    print(f"Migration complete! Collection has {client.count(COLLECTION_NAME, exact=True).count} points")
 
 
 if __name__ == "__main__":
-    print("Reading from SQLite...")
-    points = read_vectors_from_sqlite()
-
-    if points:
-        print(f"\nMigrating {len(points)} points to server...")
-        migrate_to_server(points)
-    else:
-        print("No points found to migrate")
+    main()
@@ -7,100 +7,72 @@ import os
 import re
 import json
 import hashlib
-from pathlib import Path
+import queue
+import argparse
+import threading
+import multiprocessing
+from pathlib import Path, PurePosixPath
+from bisect import bisect_left
 from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor
 
 import fitz  # PyMuPDF
 import tiktoken
-from openai import OpenAI
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import (
+    Distance,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
+    PayloadSchemaType,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+from embedder import embed_texts
+from honorifics import normalize_honorifics
+from clients import QDRANT_URL, get_qdrant_client, get_vector_store
+from chunk_store import ChunkReader, ChunkWriter, chunk_file_name
+from embedding_cache import get_default_cache
+from lexical_index import LEXICAL_INDEX_PATH, get_default_index
+from vector_store import FULL_VECTOR, SHORT_VECTOR, VECTOR_STORE, VectorStore
 
 # Configuration
 CHUNK_SIZE = 512  # tokens
 CHUNK_OVERLAP = 50  # tokens
 EMBEDDING_MODEL = "text-embedding-3-large"
+# text-embedding-3 is Matryoshka-trained: 256/512/1024 also work, with smaller
+# vectors and faster search for a small loss in quality
 EMBEDDING_DIMS = 3072
 COLLECTION_NAME = "islamic_books"
+# Two-stage search: also store the first SHORTLIST_DIMS dims (re-normalised) as a
+# "short" vector kept in RAM; query.search shortlists on it and re-scores on the
+# full vectors, which stay on disk. None stores the full vector only.
+# See bench_dimensions.py for recall at each size.
+SHORTLIST_DIMS = None
+# Opt-in vector quantization: None (float32 only), "scalar" (int8, ~4x smaller)
+# or "binary" (1 bit per dim, ~32x smaller). Quantized vectors stay in RAM and the
+# float32 originals move to disk for rescoring. Needs a Qdrant server; local mode
+# always does exact search. See bench_quantization.py for recall vs memory.
+QUANTIZATION = None
+# Keyword indexes for filtered search (query.search filters). A Qdrant server
+# uses them to search only the matching points; local mode has no payload indexes.
+PAYLOAD_INDEXES = {
+    "author": PayloadSchemaType.KEYWORD,
+    "book": PayloadSchemaType.KEYWORD,
+    "pdf_filename": PayloadSchemaType.KEYWORD,
+}
 
 PDF_DIR = Path(__file__).parent / "pdfs"
 CHUNKS_DIR = Path(__file__).parent / "chunks"
 QDRANT_PATH = Path(__file__).parent / "qdrant_data"
+MANIFEST_PATH = Path(__file__).parent / "ingest_manifest.json"
 
-
-# Common Islamic names that may have honorifics attached
-ISLAMIC_NAMES = {
-    # Female companions and family
-    "Khadijah", "Khadija", "Aisha", "Ayesha", "Fatimah", "Fatima",
-    "Hafsa", "Hafsah", "Maryam", "Mariam", "Zainab", "Zaynab",
-    "Safiyyah", "Safiyya", "Maymunah", "Maimuna", "Sawdah", "Sawda",
-    "Juwayriyah", "Juwairiya", "Umm", "Asma", "Sumayyah", "Sumayya",
-    # Male companions
-    "Abu", "Umar", "Uthman", "Ali", "Zaid", "Zayd", "Bilal",
-    "Hamza", "Hamzah", "Abbas", "Khalid", "Salman", "Ammar",
-    "Muadh", "Saad", "Sa'd", "Talha", "Talhah", "Zubair", "Zubayr",
-    "Abdur", "Abdul", "Anas", "Jabir", "Hudhaifa", "Hudhayfah",
-    # Prophets
-    "Ibrahim", "Ibraheem", "Musa", "Moosa", "Isa", "Eisa",
-    "Nuh", "Nooh", "Yusuf", "Yaqub", "Ishaq", "Ismail",
-    "Dawud", "Dawood", "Sulaiman", "Suleiman", "Yunus", "Younus",
-    "Ayyub", "Ayub", "Zakariya", "Zakariyya", "Yahya", "Yahiya",
-    "Idris", "Hud", "Salih", "Shuaib", "Lut", "Adam",
-    "Jesus", "Christ", "Moses", "Abraham", "Noah", "Joseph",
-    # The Prophet
-    "Muhammad", "Mohammed", "Mohammad", "Prophet", "Messenger",
-    # Ahmadiyya specific
-    "Mirza", "Ghulam", "Ahmad", "Masroor", "Tahir", "Bashir",
-    "Mahmud", "Mahmood",
-    # Titles that may precede names
-    "Hadhrat", "Hadrat", "Hazrat", "Syedna", "Sayyidina",
-}
-
-# Honorific patterns (lowercase) - order matters, longer ones first
-HONORIFICS = ["pbuh", "saw", "rta", "aba", "ata", "ra", "sa", "as", "rh"]
-
-
-def normalize_honorifics(text: str) -> str:
-    """
-    Fix honorifics that got merged with names during PDF extraction.
-    e.g., "Khadijahra" -> "Khadijah(ra)", "Muhammadsaw" -> "Muhammad(saw)"
-    """
-    result = text
-
-    # Pattern 1: Known name + honorific directly attached
-    # Process longer honorifics first to avoid partial matches
-    for hon in HONORIFICS:
-        for name in ISLAMIC_NAMES:
-            # Case-insensitive pattern for name+honorific at word boundary
-            pattern = rf'\b({name})({hon})\b'
-            replacement = rf'\1({hon})'
-            result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
-
-    # Pattern 2: Generic pattern for names not in our list
-    # Look for words ending in common Arabic name endings + honorific
-    for hon in HONORIFICS:
-        # Match names ending in -ah, -a, -i, -d, -r, -n, -m, -s, -b, -l + honorific
-        # But only at actual word boundaries
-        pattern = rf'\b([A-Z][a-z]*[ahindrmsbl])({hon})\b'
-
-        def replace_if_valid(match):
-            name_part = match.group(1)
-            hon_part = match.group(2)
-            full = match.group(0).lower()
-            # Skip common English words
-            skip_words = {'extra', 'ultra', 'aura', 'flora', 'zebra', 'cobra',
-                         'opera', 'camera', 'era', 'umbrella', 'formula',
-                         'was', 'has', 'is', 'as'}
-            if full in skip_words or name_part.lower() in skip_words:
-                return match.group(0)
-            # Skip if name part is too short (likely not a name)
-            if len(name_part) < 3:
-                return match.group(0)
-            return f"{name_part}({hon_part})"
-
-        result = re.sub(pattern, replace_if_valid, result)
-
-    return result
+# Bump when chunk_text or normalize_honorifics output changes, so books get re-chunked
+CHUNKER_VERSION = 2
 
 
 @dataclass
@@ -115,133 +87,160 @@ class Chunk:
         return asdict(self)
 
 
+@dataclass
+class IngestJob:
+    """A PDF that needs work this run."""
+    key: str  # path relative to PDF_DIR
+    pdf_path: Path
+    action: str  # "extract" or "store" (chunks already on disk)
+    resume: int = 0  # chunks before this index are already upserted
+    replace: bool = False  # delete the book's existing points first
+
+
+@dataclass
+class IngestBatch:
+    """Consecutive chunks of one book moving through the embed and upsert stages."""
+    key: str
+    pdf_filename: str
+    start: int  # chunk_index of the first chunk
+    chunks: list[Chunk]
+    embeddings: list[list[float]] | None = None
+    replace: bool = False
+    last: bool = False  # no more chunks follow for this book
+
+
+def iter_pdf_pages(pdf_path: Path):
+    """Yield (page_num, text) for each page with text, one page at a time."""
+    doc = fitz.open(pdf_path)
+    try:
+        for page_num, page in enumerate(doc, start=1):
+            text = page.get_text()
+            if text.strip():
+                # Normalize honorifics that got merged with names
+                yield page_num, normalize_honorifics(text)
+    finally:
+        doc.close()
+
+
 def extract_text_from_pdf(pdf_path: Path) -> list[tuple[int, str]]:
     """Extract text from PDF, returning list of (page_num, text) tuples."""
-    doc = fitz.open(pdf_path)
-    pages = []
-    for page_num, page in enumerate(doc, start=1):
-        text = page.get_text()
-        if text.strip():
-            # Normalize honorifics that got merged with names
-            text = normalize_honorifics(text)
-            pages.append((page_num, text))
-    doc.close()
-    return pages
+    return list(iter_pdf_pages(pdf_path))
 
 
-def count_tokens(text: str, encoding) -> int:
-    """Count tokens in text."""
-    return len(encoding.encode(text))
+def page_token_offsets(page_text: str, encoding) -> list[int]:
+    """Encode a page once and return the start character offset of each token."""
+    return encoding.decode_with_offsets(encoding.encode(page_text))[1]
 
 
-def chunk_text(
-    pages: list[tuple[int, str]],
+# Split points tried in order before falling back to a word boundary
+SENTENCE_SEPARATORS = ['. ', '.\n', '? ', '!\n', '\n\n']
+
+
+def iter_chunks(
+    pages,
     book_name: str,
     pdf_filename: str,
     encoding,
-) -> list[Chunk]:
+):
     """
     Chunk text using a sliding window approach with overlap.
     Respects page boundaries where possible.
+
+    Takes any iterable of (page_num, text) and yields chunks as soon as they are
+    complete, so a book never has to be held in memory. Each page is encoded
+    once; the window is kept as buf[start:] plus the start offset of every
+    token in it (offsets[head:]), so splits and overlaps are found by index
+    instead of re-encoding the accumulated text.
     """
-    chunks = []
     chunk_index = 0
+    current_page = None
+
+    buf = ""
+    offsets: list[int] = []
+    head = 0
+    start = 0
 
-    # Combine all text with page markers
-    current_text = ""
-    current_page = pages[0][0] if pages else 1
-    current_tokens = 0
+    def make_chunk(end: int) -> Chunk:
+        return Chunk(
+            text=buf[start:end].strip(),
+            book=book_name,
+            page=current_page,
+            chunk_index=chunk_index,
+            pdf_filename=pdf_filename,
+        )
 
     for page_num, page_text in pages:
+        if current_page is None:
+            current_page = page_num
+
         # Clean the text
         page_text = re.sub(r'\s+', ' ', page_text).strip()
-        page_tokens = count_tokens(page_text, encoding)
+        page_offsets = page_token_offsets(page_text, encoding)
 
         # If adding this page would exceed chunk size, save current chunk
-        if current_tokens + page_tokens > CHUNK_SIZE and current_text:
-            chunks.append(Chunk(
-                text=current_text.strip(),
-                book=book_name,
-                page=current_page,
-                chunk_index=chunk_index,
-                pdf_filename=pdf_filename,
-            ))
+        if len(offsets) - head + len(page_offsets) > CHUNK_SIZE and start < len(buf):
+            yield make_chunk(len(buf))
             chunk_index += 1
 
-            # Keep overlap from the end of current text
-            overlap_text = get_overlap_text(current_text, CHUNK_OVERLAP, encoding)
-            current_text = overlap_text
-            current_tokens = count_tokens(overlap_text, encoding)
+            # Keep the last CHUNK_OVERLAP tokens as overlap
+            if len(offsets) - head > CHUNK_OVERLAP:
+                head = len(offsets) - CHUNK_OVERLAP
+                start = offsets[head]
             current_page = page_num
 
-        current_text += " " + page_text
-        current_tokens += page_tokens
+        # Drop text that has left the window before appending the next page
+        buf = buf[start:]
+        offsets = [o - start for o in offsets[head:]]
+        head = start = 0
 
-        # If current chunk is too large, split it
-        while current_tokens > CHUNK_SIZE:
-            # Find a good split point
-            split_text, remaining_text = split_at_token_limit(
-                current_text, CHUNK_SIZE, encoding
-            )
+        # The joining space belongs to the page's first token, as in encode(" " + page)
+        base = len(buf)
+        buf += " " + page_text
+        offsets.extend(base + 1 + o for o in page_offsets)
+        if page_offsets:
+            offsets[-len(page_offsets)] = base
 
-            chunks.append(Chunk(
-                text=split_text.strip(),
-                book=book_name,
-                page=current_page,
-                chunk_index=chunk_index,
-                pdf_filename=pdf_filename,
-            ))
+        # If current chunk is too large, split it
+        while len(offsets) - head > CHUNK_SIZE:
+            # Prefer a sentence boundary in the second half of the first CHUNK_SIZE tokens
+            end = offsets[head + CHUNK_SIZE]
+            split_point = end
+            for sep in SENTENCE_SEPARATORS:
+                last_sep = buf.rfind(sep, start, end)
+                if last_sep - start > (end - start) // 2:
+                    split_point = last_sep + len(sep)
+                    break
+            else:
+                # Fall back to word boundary
+                last_space = buf.rfind(' ', start, end)
+                if last_space - start > 0:
+                    split_point = last_space
+
+            yield make_chunk(split_point)
             chunk_index += 1
 
-            # Keep overlap
-            overlap_text = get_overlap_text(split_text, CHUNK_OVERLAP, encoding)
-            current_text = overlap_text + remaining_text
-            current_tokens = count_tokens(current_text, encoding)
+            # Keep overlap from the end of the emitted chunk. A chunk no longer
+            # than the overlap is not carried over, so the window always advances.
+            split_token = bisect_left(offsets, split_point, head)
+            if split_token - head > CHUNK_OVERLAP:
+                head = split_token - CHUNK_OVERLAP
+                start = offsets[head]
+            else:
+                head, start = split_token, split_point
 
     # Don't forget the last chunk
-    if current_text.strip():
-        chunks.append(Chunk(
-            text=current_text.strip(),
-            book=book_name,
-            page=current_page,
-            chunk_index=chunk_index,
-            pdf_filename=pdf_filename,
-        ))
-
-    return chunks
-
-
-def get_overlap_text(text: str, overlap_tokens: int, encoding) -> str:
-    """Get the last N tokens of text as overlap."""
-    tokens = encoding.encode(text)
-    if len(tokens) <= overlap_tokens:
-        return text
-    overlap_tokens_list = tokens[-overlap_tokens:]
-    return encoding.decode(overlap_tokens_list)
-
-
-def split_at_token_limit(text: str, limit: int, encoding) -> tuple[str, str]:
-    """Split text at approximately the token limit, preferring sentence boundaries."""
-    tokens = encoding.encode(text)
-    if len(tokens) <= limit:
-        return text, ""
-
-    # Decode up to the limit
-    split_text = encoding.decode(tokens[:limit])
+    if buf[start:].strip():
+        yield make_chunk(len(buf))
 
-    # Try to find a sentence boundary
-    for sep in ['. ', '.\n', '? ', '!\n', '\n\n']:
-        last_sep = split_text.rfind(sep)
-        if last_sep > len(split_text) // 2:  # Don't split too early
-            split_point = last_sep + len(sep)
-            return text[:split_point], text[split_point:]
 
-    # Fall back to word boundary
-    last_space = split_text.rfind(' ')
-    if last_space > 0:
-        return text[:last_space], text[last_space:]
-
-    return split_text, text[len(split_text):]
+def chunk_text(
+    pages: list[tuple[int, str]],
+    book_name: str,
+    pdf_filename: str,
+    encoding,
+) -> list[Chunk]:
+    """Chunk a whole book at once; see iter_chunks."""
+    return list(iter_chunks(pages, book_name, pdf_filename, encoding))
 
 
 def get_book_name(pdf_filename: str) -> str:
@@ -253,26 +252,20 @@ def get_book_name(pdf_filename: str) -> str:
     return ' '.join(w if w.isupper() else w.title() for w in words)
 
 
-def embed_chunks(chunks: list[Chunk], client: OpenAI) -> list[list[float]]:
-    """Generate embeddings for chunks using OpenAI."""
-    texts = [c.text for c in chunks]
-
-    # Batch requests (max 2048 inputs per request for OpenAI)
-    all_embeddings = []
-    batch_size = 100
-
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        print(f"    Embedding batch {i // batch_size + 1}/{(len(texts) - 1) // batch_size + 1}")
+def get_author(key: str) -> str:
+    """Author directory of a PDF (key is relative to PDF_DIR, as download_all_books.py lays it out)."""
+    parts = PurePosixPath(key).parts
+    return parts[0] if len(parts) > 1 else ""
 
-        response = client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=batch,
-        )
-        batch_embeddings = [e.embedding for e in response.data]
-        all_embeddings.extend(batch_embeddings)
 
-    return all_embeddings
+def embed_chunks(chunks: list[Chunk]) -> list[list[float]]:
+    """Generate embeddings for chunks using OpenAI, in order."""
+    return embed_texts(
+        [c.text for c in chunks],
+        EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMS,
+        cache=get_default_cache(),
+    )
 
 
 def chunk_id(chunk: Chunk) -> str:
@@ -281,96 +274,507 @@ def chunk_id(chunk: Chunk) -> str:
     return hashlib.md5(content.encode()).hexdigest()
 
 
-def setup_qdrant(client: QdrantClient):
-    """Set up Qdrant collection."""
+def quantization_config(mode: str | None):
+    """Qdrant quantization config for a QUANTIZATION mode."""
+    if mode is None:
+        return None
+    if mode == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if mode == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    raise ValueError(f"Unknown quantization mode: {mode}")
+
+
+def vectors_config(full_on_disk: bool) -> VectorParams | dict[str, VectorParams]:
+    """Collection vector layout: one unnamed vector, or full + short named vectors with SHORTLIST_DIMS."""
+    if SHORTLIST_DIMS is None:
+        return VectorParams(size=EMBEDDING_DIMS, distance=Distance.COSINE, on_disk=full_on_disk)
+    return {
+        FULL_VECTOR: VectorParams(size=EMBEDDING_DIMS, distance=Distance.COSINE, on_disk=True),
+        SHORT_VECTOR: VectorParams(size=SHORTLIST_DIMS, distance=Distance.COSINE),
+    }
+
+
+def vector_sizes(vectors: VectorParams | dict[str, VectorParams]) -> dict[str, int]:
+    if isinstance(vectors, dict):
+        return {name: params.size for name, params in vectors.items()}
+    return {"": vectors.size}
+
+
+def setup_qdrant(client: QdrantClient, quantization: str | None = QUANTIZATION):
+    """Set up Qdrant collection, applying the quantization mode to an existing one."""
     collections = [c.name for c in client.get_collections().collections]
+    config = quantization_config(quantization)
+    vectors = vectors_config(full_on_disk=config is not None)
+    if config is not None and not QDRANT_URL:
+        print(f"Quantization ({quantization}) needs a Qdrant server; local mode searches the float32 vectors")
 
     if COLLECTION_NAME not in collections:
         client.create_collection(
             collection_name=COLLECTION_NAME,
-            vectors_config=VectorParams(
-                size=EMBEDDING_DIMS,
-                distance=Distance.COSINE,
-            ),
+            vectors_config=vectors,
+            quantization_config=config,
         )
         print(f"Created collection: {COLLECTION_NAME}")
     else:
         print(f"Collection {COLLECTION_NAME} already exists")
+        existing = client.get_collection(COLLECTION_NAME).config
+        if vector_sizes(existing.params.vectors) != vector_sizes(vectors):
+            # Changing the layout means re-embedding everything; don't drop points implicitly
+            raise ValueError(
+                f"Collection {COLLECTION_NAME} has vectors {vector_sizes(existing.params.vectors)}, "
+                f"config wants {vector_sizes(vectors)}. Set a new COLLECTION_NAME to ingest with these dims."
+            )
+        # Local mode keeps no quantization config, so there is nothing to update
+        if QDRANT_URL and existing.quantization_config != config:
+            # Qdrant rebuilds the quantized vectors in the background
+            full = FULL_VECTOR if SHORTLIST_DIMS else ""
+            client.update_collection(
+                collection_name=COLLECTION_NAME,
+                vectors_config={full: VectorParamsDiff(on_disk=SHORTLIST_DIMS is not None or config is not None)},
+                quantization_config=config or Disabled.DISABLED,
+            )
+            print(f"Quantization set to: {quantization or 'none'}")
+
+    if QDRANT_URL:
+        # Creating an index that already exists is a no-op
+        for field, schema in PAYLOAD_INDEXES.items():
+            client.create_payload_index(COLLECTION_NAME, field_name=field, field_schema=schema)
 
 
 def store_chunks(
     chunks: list[Chunk],
     embeddings: list[list[float]],
-    qdrant: QdrantClient,
+    store: VectorStore,
+    author: str = "",
 ):
-    """Store chunks and embeddings in Qdrant."""
-    points = []
-    for chunk, embedding in zip(chunks, embeddings):
-        point = PointStruct(
-            id=chunk_id(chunk),
-            vector=embedding,
-            payload=chunk.to_dict(),
-        )
-        points.append(point)
-
-    # Upsert in batches
-    batch_size = 100
-    for i in range(0, len(points), batch_size):
-        batch = points[i:i + batch_size]
-        qdrant.upsert(collection_name=COLLECTION_NAME, points=batch)
-
-
-MAX_PAGES = 400  # Skip documents larger than this
+    """Store chunks and embeddings in the vector store."""
+    payloads = [{**chunk.to_dict(), "author": author} for chunk in chunks]
+    store.upsert([chunk_id(chunk) for chunk in chunks], embeddings, payloads)
+
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Streaming ingest: chunks flow extraction -> embedding -> upsert in batches,
+# and every queue is bounded so a slow stage holds back the ones before it
+# instead of buffering whole books in memory
+STREAM_BATCH_CHUNKS = 64  # chunks per message from extraction
+EMBED_STAGE_CHUNKS = 400  # queued chunks coalesced into one embed_texts call
+QUEUE_DEPTH = 4  # batches buffered between stages
+
+# Set in each extraction worker by _init_worker
+_worker_queue = None
+_worker_cancel = None
+_worker_encoding = None
+
+
+def _exit_with_parent():
+    """Pool workers block on their task queue forever if the ingest process is killed; exit with it."""
+    multiprocessing.parent_process().join()
+    os._exit(1)
+
+
+def _init_worker(out_queue, cancel):
+    global _worker_queue, _worker_cancel, _worker_encoding
+    _worker_queue = out_queue
+    _worker_cancel = cancel
+    if multiprocessing.parent_process() is not None:
+        threading.Thread(target=_exit_with_parent, daemon=True).start()
+    _worker_encoding = tiktoken.encoding_for_model("gpt-4")
+
+
+def _send_batches(out_queue, cancel, key: str, chunks) -> int:
+    """Send chunks to out_queue in STREAM_BATCH_CHUNKS batches. Returns the count sent."""
+    batch, sent = [], 0
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == STREAM_BATCH_CHUNKS:
+            if cancel.is_set():
+                raise RuntimeError("cancelled")
+            out_queue.put(("chunks", key, sent, batch))
+            sent += len(batch)
+            batch = []
+    if batch:
+        out_queue.put(("chunks", key, sent, batch))
+        sent += len(batch)
+    return sent
+
+
+def stream_pdf(pdf_path: Path, key: str):
+    """
+    Extraction stage (runs in a worker): stream a PDF's chunks to the worker queue.
+    Sends ("chunks", key, first_index, chunks) messages, then ("done", key, count)
+    or ("failed", key, error).
+    """
+    try:
+        if _worker_cancel.is_set():
+            raise RuntimeError("cancelled")
+        pages = iter_pdf_pages(pdf_path)
+        chunks = iter_chunks(pages, get_book_name(pdf_path.name), pdf_path.name, _worker_encoding)
+        count = _send_batches(_worker_queue, _worker_cancel, key, chunks)
+        _worker_queue.put(("done", key, count))
+    except Exception as e:
+        _worker_queue.put(("failed", key, str(e)))
+
+
+def stream_stored(jobs: list[IngestJob], manifest: dict, out_queue, cancel):
+    """Send chunks already on disk for "store" jobs, in the same messages as stream_pdf."""
+    for job in jobs:
+        try:
+            chunks = load_chunks(manifest[job.key])
+            count = _send_batches(out_queue, cancel, job.key, chunks)
+            out_queue.put(("done", job.key, count))
+        except Exception as e:
+            out_queue.put(("failed", job.key, str(e)))
+
+
+def _report_crash(future, key: str, out_queue):
+    """stream_pdf reports its own errors; a worker process that dies outright can't."""
+    if not future.cancelled() and future.exception() is not None:
+        out_queue.put(("failed", key, str(future.exception())))
+
+
+def stream_extracted(jobs: list[IngestJob], out_queue, cancel):
+    """Run stream_pdf for each job in this process (the --workers 1 path)."""
+    _init_worker(out_queue, cancel)
+    for job in jobs:
+        stream_pdf(job.pdf_path, job.key)
+
+
+def embed_stage(inbox: queue.Queue, outbox: queue.Queue, errors: list):
+    """Embedding stage: coalesce queued batches, embed them in one call, pass them on in order."""
+    finished = False
+    while not finished:
+        batches, size = [], 0
+        item = inbox.get()
+        while True:
+            if item is None:
+                finished = True
+                break
+            batches.append(item)
+            size += len(item.chunks)
+            if size >= EMBED_STAGE_CHUNKS:
+                break
+            try:
+                item = inbox.get_nowait()
+            except queue.Empty:
+                break
+
+        if errors or not batches:
+            continue
+        try:
+            embeddings = embed_chunks([c for b in batches for c in b.chunks])
+        except Exception as e:
+            errors.append(e)
+            continue
+        offset = 0
+        for batch in batches:
+            batch.embeddings = embeddings[offset:offset + len(batch.chunks)]
+            offset += len(batch.chunks)
+            outbox.put(batch)
+    outbox.put(None)
+
+
+def upsert_stage(
+    inbox: queue.Queue,
+    store: VectorStore,
+    manifest: dict,
+    lock: threading.Lock,
+    errors: list,
+):
+    """Upsert stage: store batches in order and record progress in the manifest."""
+    while (batch := inbox.get()) is not None:
+        if errors:
+            continue
+        try:
+            if batch.replace:
+                # Re-chunked: drop the previous upload so no stale chunks remain
+                store.delete_pdf(batch.pdf_filename)
+                get_default_index().delete_pdf(batch.pdf_filename)
+            if batch.chunks:
+                author = get_author(batch.key)
+                store_chunks(batch.chunks, batch.embeddings, store, author)
+                get_default_index().add([{**c.to_dict(), "author": author} for c in batch.chunks])
+            with lock:
+                entry = manifest[batch.key]
+                entry["upserted"] = batch.start + len(batch.chunks)
+                entry["status"] = "done" if batch.last else "upserting"
+                entry.pop("replace", None)
+                save_manifest(manifest)
+            if batch.last:
+                print(f"  Stored {batch.key} ({entry['upserted']} chunks)")
+        except Exception as e:
+            errors.append(e)
+
+
+def chunker_params() -> dict:
+    return {"version": CHUNKER_VERSION, "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+
+
+def embedding_params() -> dict:
+    params = {"model": EMBEDDING_MODEL, "dims": EMBEDDING_DIMS, "collection": COLLECTION_NAME}
+    if SHORTLIST_DIMS:
+        params["shortlist_dims"] = SHORTLIST_DIMS
+    if VECTOR_STORE != "qdrant":
+        # Switching stores re-upserts every book (embeddings come from the cache)
+        params["store"] = VECTOR_STORE
+    return params
+
+
+def load_manifest() -> dict:
+    """Per-PDF ingest state, keyed by path relative to PDF_DIR."""
+    if not MANIFEST_PATH.exists():
+        return {}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict):
+    # Write-then-rename so a crash never leaves a truncated manifest
+    tmp_path = MANIFEST_PATH.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    tmp_path.replace(MANIFEST_PATH)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pdf_fingerprint(pdf_path: Path, entry: dict | None) -> dict:
+    """Size, mtime and content hash; the hash is reused when size and mtime are unchanged."""
+    stat = pdf_path.stat()
+    if entry and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+        sha256 = entry["sha256"]
+    else:
+        sha256 = file_sha256(pdf_path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256}
 
 
-def process_pdf(
-    pdf_path: Path,
-    encoding,
-    openai_client: OpenAI,
-    qdrant_client: QdrantClient,
-) -> int:
-    """Process a single PDF file. Returns number of chunks created."""
-    print(f"\nProcessing: {pdf_path.name}")
+def plan_pdf(pdf_path: Path, key: str, entry: dict | None, fingerprint: dict) -> IngestJob | None:
+    """
+    Decide what a PDF needs. Returns None when it is fully ingested with the
+    current parameters, otherwise a job that either re-extracts the PDF or
+    streams its chunks from disk ("store"), skipping chunks already upserted.
+    """
+    if entry is None:
+        # A chunks file without an entry comes from a run before the manifest existed
+        untracked = any(
+            (CHUNKS_DIR / name).exists() for name in (f"{pdf_path.stem}.json", chunk_file_name(pdf_path.name))
+        )
+        return IngestJob(key, pdf_path, "extract", replace=untracked)
 
-    # Check page count first
-    doc = fitz.open(pdf_path)
-    page_count = len(doc)
-    doc.close()
+    same_source = entry["sha256"] == fingerprint["sha256"] and entry.get("chunker") == chunker_params()
+    same_embedding = same_source and entry.get("embedding") == embedding_params()
+    # Entries from before the binary chunk store point at JSON dumps; re-extract those
+    chunks_file = chunk_file_name(pdf_path.name)
+    chunks_on_disk = (
+        same_source and entry.get("chunked") and entry["chunks_file"] == chunks_file
+        and (CHUNKS_DIR / chunks_file).exists()
+    )
+    if chunks_on_disk and same_embedding and entry.get("status") == "done":
+        return None
 
-    if page_count > MAX_PAGES:
-        print(f"  Skipping: {page_count} pages (max {MAX_PAGES})")
-        return 0
+    # Extraction is deterministic, so with unchanged inputs the stored prefix is still valid
+    resume = entry.get("upserted", 0) if same_embedding else 0
+    replace = entry.get("replace", False) or (not same_source and entry.get("upserted", 0) > 0)
+    return IngestJob(key, pdf_path, "store" if chunks_on_disk else "extract", resume, replace)
 
-    # Extract text
-    print(f"  Extracting text ({page_count} pages)...")
-    pages = extract_text_from_pdf(pdf_path)
-    if not pages:
-        print("  No text found, skipping")
-        return 0
 
-    # Chunk
-    print("  Chunking...")
-    book_name = get_book_name(pdf_path.name)
-    chunks = chunk_text(pages, book_name, pdf_path.name, encoding)
-    print(f"  Created {len(chunks)} chunks")
+def load_chunks(entry: dict) -> list[Chunk]:
+    with ChunkReader(CHUNKS_DIR / entry["chunks_file"]) as reader:
+        return [Chunk(**c) for c in reader]
 
-    # Save chunks to JSON for inspection
-    chunks_file = CHUNKS_DIR / f"{pdf_path.stem}.json"
-    with open(chunks_file, 'w') as f:
-        json.dump([c.to_dict() for c in chunks], f, indent=2)
 
-    # Embed
-    print("  Embedding...")
-    embeddings = embed_chunks(chunks, openai_client)
+def backfill_lexical_index(manifest: dict) -> int:
+    """
+    Build the lexical index from the chunks files for everything already in
+    the vector store, for collections ingested before it existed. Returns chunks indexed.
+    """
+    index = get_default_index()
+    total = 0
+    for entry in manifest.values():
+        chunks_path = CHUNKS_DIR / entry["chunks_file"]
+        if not entry.get("upserted") or not chunks_path.exists() or chunks_path.suffix == ".json":
+            continue
+        with ChunkReader(chunks_path) as reader:
+            chunks = [reader[i] for i in range(min(entry["upserted"], len(reader)))]
+        index.add([{**c, "author": entry.get("author", "")} for c in chunks])
+        total += len(chunks)
+    return total
+
+
+def backfill_authors(manifest: dict, store: VectorStore) -> int:
+    """
+    Add the author to points and lexical index rows stored before ingest
+    recorded it. Returns the number of books updated.
+    """
+    updated = 0
+    for key, entry in manifest.items():
+        if "author" in entry:
+            continue
+        author = get_author(key)
+        pdf_filename = PurePosixPath(key).name
+        if entry.get("upserted"):
+            store.set_author(pdf_filename, author)
+            get_default_index().set_author(pdf_filename, author)
+            updated += 1
+        entry["author"] = author
+    save_manifest(manifest)
+    return updated
+
+
+def ingest(
+    jobs: list[IngestJob],
+    fingerprints: dict,
+    manifest: dict,
+    store: VectorStore,
+    workers: int,
+) -> int:
+    """
+    Run the streaming ingest for the given jobs. Returns number of chunks stored.
 
-    # Store
-    print("  Storing in Qdrant...")
-    store_chunks(chunks, embeddings, qdrant_client)
+    Extraction/chunking runs in worker processes (or a thread with workers=1);
+    this thread routes their chunk batches to the chunks files and the embed
+    stage; embedding and upserting run in their own threads. Upserts stay in
+    this process since the local Qdrant store allows a single client.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    source = ctx.Queue(maxsize=QUEUE_DEPTH + 2 * workers)
+    cancel = ctx.Event()
+    embed_queue = queue.Queue(maxsize=QUEUE_DEPTH)
+    upsert_queue = queue.Queue(maxsize=QUEUE_DEPTH)
+    lock = threading.Lock()
+    errors: list[Exception] = []
+
+    jobs_by_key = {job.key: job for job in jobs}
+    writers = {}
+    pending_replace = {job.key for job in jobs if job.replace}
+
+    # Record every job as in progress before any of its chunks can be upserted
+    with lock:
+        for job in jobs:
+            previous = manifest.get(job.key, {})
+            manifest[job.key] = {
+                **fingerprints[job.key],
+                "author": get_author(job.key),
+                "chunks_file": chunk_file_name(job.pdf_path.name),
+                "chunker": chunker_params(),
+                "embedding": embedding_params(),
+                "chunked": job.action == "store",
+                "chunk_count": previous.get("chunk_count", 0) if job.action == "store" else 0,
+                "status": "upserting",
+                "upserted": job.resume,
+                "replace": job.replace,
+            }
+        save_manifest(manifest)
+
+    stages = [
+        threading.Thread(target=embed_stage, args=(embed_queue, upsert_queue, errors), daemon=True),
+        threading.Thread(
+            target=upsert_stage, args=(upsert_queue, store, manifest, lock, errors), daemon=True
+        ),
+    ]
+    extract_jobs = [j for j in jobs if j.action == "extract"]
+    store_jobs = [j for j in jobs if j.action == "store"]
+    stages.append(threading.Thread(
+        target=stream_stored, args=(store_jobs, manifest, source, cancel), daemon=True
+    ))
+
+    executor = None
+    if workers > 1 and extract_jobs:
+        executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(source, cancel)
+        )
+        for job in extract_jobs:
+            future = executor.submit(stream_pdf, job.pdf_path, job.key)
+            future.add_done_callback(lambda f, key=job.key: _report_crash(f, key, source))
+    else:
+        stages.append(threading.Thread(
+            target=stream_extracted, args=(extract_jobs, source, cancel), daemon=True
+        ))
 
-    return len(chunks)
+    for stage in stages:
+        stage.start()
+
+    def forward(batch: IngestBatch):
+        batch.replace = batch.key in pending_replace
+        pending_replace.discard(batch.key)
+        if not errors:
+            embed_queue.put(batch)
+
+    finished = 0
+    while finished < len(jobs):
+        kind, key, *rest = source.get()
+        job = jobs_by_key[key]
+
+        if errors and not cancel.is_set():
+            print(f"Stopping after error: {errors[0]}")
+            cancel.set()
+
+        if kind == "chunks":
+            first, chunks = rest
+            if job.action == "extract":
+                if key not in writers:
+                    writers[key] = ChunkWriter(CHUNKS_DIR / manifest[key]["chunks_file"])
+                writers[key].write([c.to_dict() for c in chunks])
+            # Chunks before the resume point are already in the vector store
+            skip = max(0, job.resume - first)
+            if skip < len(chunks):
+                forward(IngestBatch(key, job.pdf_path.name, first + skip, chunks[skip:]))
+            continue
+
+        finished += 1
+        if kind == "failed":
+            if key in writers:
+                writers.pop(key).abort()
+            print(f"[{finished}/{len(jobs)}] {key}: Failed: {rest[0]}")
+            continue
+
+        count = rest[0]
+        if job.action == "extract":
+            writer = writers.pop(key, None) or ChunkWriter(CHUNKS_DIR / manifest[key]["chunks_file"])
+            writer.close()
+        with lock:
+            manifest[key].update(chunked=True, chunk_count=count)
+            save_manifest(manifest)
+        print(f"[{finished}/{len(jobs)}] {key}: {count} chunks")
+        forward(IngestBatch(key, job.pdf_path.name, max(count, job.resume), [], last=True))
+
+    embed_queue.put(None)
+    for stage in stages:
+        stage.join()
+    if executor:
+        executor.shutdown()
+    if errors:
+        raise errors[0]
+
+    with lock:
+        return sum(manifest[j.key]["upserted"] - j.resume for j in jobs)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Ingest PDFs into the Islamic Knowledge Base")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Processes for PDF extraction and chunking (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--quantization",
+        choices=["none", "scalar", "binary"],
+        default=QUANTIZATION or "none",
+        help="Vector quantization for the collection (Qdrant server only)",
+    )
+    args = parser.parse_args()
+
     # Check for API key
     if not os.getenv("OPENAI_API_KEY"):
         print("Error: OPENAI_API_KEY environment variable not set")
@@ -378,13 +782,11 @@ def main():
 
     # Setup
     CHUNKS_DIR.mkdir(exist_ok=True)
-    QDRANT_PATH.mkdir(exist_ok=True)
 
-    encoding = tiktoken.encoding_for_model("gpt-4")
-    openai_client = OpenAI()
-    qdrant_client = QdrantClient(path=str(QDRANT_PATH))
-
-    setup_qdrant(qdrant_client)
+    if VECTOR_STORE == "qdrant":
+        QDRANT_PATH.mkdir(exist_ok=True)
+        setup_qdrant(get_qdrant_client(QDRANT_PATH), None if args.quantization == "none" else args.quantization)
+    store = get_vector_store(QDRANT_PATH, collection=COLLECTION_NAME)
 
     # Process all PDFs (including in subdirectories)
     pdf_files = sorted(PDF_DIR.glob("**/*.pdf"))
@@ -394,20 +796,35 @@ def main():
     pdf_files = [p for p in pdf_files if "Mirza-Tahir-Ahmad" not in str(p)]
     print(f"After excluding Mirza-Tahir-Ahmad: {len(pdf_files)} PDF files")
 
-    # Check which ones are already processed (use relative path as key)
-    processed = {f.stem for f in CHUNKS_DIR.glob("*.json")}
-    to_process = [p for p in pdf_files if p.stem not in processed]
-    print(f"Already processed: {len(processed)}, remaining: {len(to_process)}")
-
-    total_chunks = 0
-    for pdf_path in to_process:
-        chunks = process_pdf(pdf_path, encoding, openai_client, qdrant_client)
-        total_chunks += chunks
+    # Compare each PDF against the manifest (keyed by path relative to PDF_DIR)
+    manifest = load_manifest()
+    if not LEXICAL_INDEX_PATH.exists() and manifest:
+        print("Building lexical index from stored chunks...")
+        print(f"Indexed {backfill_lexical_index(manifest)} chunks")
+    if any("author" not in entry for entry in manifest.values()):
+        print(f"Recorded author for {backfill_authors(manifest, store)} previously stored books")
+    fingerprints = {}
+    jobs = []
+    for pdf_path in pdf_files:
+        key = pdf_path.relative_to(PDF_DIR).as_posix()
+        fingerprints[key] = pdf_fingerprint(pdf_path, manifest.get(key))
+        job = plan_pdf(pdf_path, key, manifest.get(key), fingerprints[key])
+        if job:
+            jobs.append(job)
+    to_extract = sum(1 for j in jobs if j.action == "extract")
+    print(f"Up to date: {len(pdf_files) - len(jobs)}, to extract: {to_extract}, "
+          f"to embed/upsert from disk: {len(jobs) - to_extract}")
+    print(f"Extracting with {args.workers} worker(s)\n")
+
+    total_chunks = ingest(jobs, fingerprints, manifest, store, args.workers)
 
     print(f"\n{'='*50}")
-    print(f"Total chunks created: {total_chunks}")
+    print(f"Total chunks stored: {total_chunks}")
+    print(get_default_cache().summary())
     print(f"Chunks saved to: {CHUNKS_DIR}")
-    print(f"Qdrant data saved to: {QDRANT_PATH}")
+    print(f"Manifest saved to: {MANIFEST_PATH}")
+    print(f"Vectors saved to: {store.location}")
+    print(f"Lexical index saved to: {LEXICAL_INDEX_PATH}")
 
 
 if __name__ == "__main__":
@@ -4,19 +4,51 @@ Query the Islamic Knowledge Base using RAG.
 """
 
 import os
+import re
 import sys
 import json
 import argparse
 from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
 from openai import OpenAI
-from qdrant_client import QdrantClient
-from pipeline import normalize_honorifics
+from embedder import embed_texts, truncate_embedding
+from embedding_cache import get_default_cache
+from answer_cache import CachedAnswer, get_default_answer_cache
+from lexical_index import LEXICAL_INDEX_PATH, STOPWORDS, get_default_index
+from reranker import rerank
+from vector_store import VectorStore
+from clients import get_openai_client, get_vector_store
 
 # Configuration
 EMBEDDING_MODEL = "text-embedding-3-large"
-COLLECTION_NAME = "islamic_books"
+EMBEDDING_DIMS = 3072
 TOP_K = 10
+# Speculative retrieval: search for the raw question while the tool-decision call
+# is in flight, and reuse those results if the model's search query shares at
+# least this fraction of content words with it (Jaccard); otherwise search again.
+SPECULATIVE_SEARCH = False
+SPECULATIVE_MIN_OVERLAP = 0.5
+# Semantic answer cache (answer_cache.py) for questions asked without conversation
+# history; questions are compared on embeddings truncated to ANSWER_CACHE_DIMS.
+ANSWER_CACHE = True
+ANSWER_CACHE_DIMS = 512
+# Hybrid retrieval: fuse the top HYBRID_CANDIDATES dense and BM25 (lexical_index.py)
+# results by reciprocal rank fusion, score = sum of 1 / (RRF_K + rank).
+# Dense only when HYBRID_SEARCH is off or the lexical index hasn't been built.
+HYBRID_SEARCH = True
+HYBRID_CANDIDATES = 30
+RRF_K = 60
+# Optional reranking (reranker.py): "cross-encoder", "terms" or None. Retrieves
+# RERANK_CANDIDATES, reranks them and keeps the best RERANK_TOP_N for the context.
+RERANKER = None
+RERANK_CANDIDATES = 50
+RERANK_TOP_N = 5
+# format_context: adjacent chunks of a book are merged (minus their sliding-window
+# overlap) and passages packed best-first into this many tokens; None = no limit.
+CONTEXT_TOKEN_BUDGET = 3000
+CONTEXT_ENCODING = "o200k_base"  # gpt-4o and later
+CONTEXT_MIN_TAIL_TOKENS = 100  # smallest truncated passage worth adding at the end
 QDRANT_PATH = Path(__file__).parent / "qdrant_data"
 
 QUERY_SYNTHESIS_PROMPT = """You are a query synthesizer for a RAG system about Islamic literature.
@@ -84,13 +116,33 @@ SEARCH_TOOL = {
 }
 
 
-def get_embedding(text: str, client: OpenAI) -> list[float]:
-    """Get embedding for a query."""
+_speculative_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative-search")
+
+
+def get_embedding(text: str, client: OpenAI, dims: int = EMBEDDING_DIMS) -> list[float]:
+    """Get embedding for a query, reusing the on-disk cache for repeated questions."""
+    cache = get_default_cache()
+    cached = cache.get(EMBEDDING_MODEL, dims, text)
+    if cached is not None:
+        return cached
+
     response = client.embeddings.create(
         model=EMBEDDING_MODEL,
         input=text,
+        dimensions=dims,
     )
-    return response.data[0].embedding
+    embedding = response.data[0].embedding
+    cache.put(EMBEDDING_MODEL, dims, text, embedding)
+    return embedding
+
+
+def get_embeddings(texts: list[str], dims: int = EMBEDDING_DIMS) -> list[list[float]]:
+    """
+    get_embedding for many queries, through the on-disk cache. The rest go to
+    embedder.embed_texts, which packs them into as few requests as the limits
+    allow and retries rate limits and transient errors.
+    """
+    return embed_texts(texts, EMBEDDING_MODEL, dimensions=dims, cache=get_default_cache(), progress=False)
 
 
 def synthesize_search_query(
@@ -141,35 +193,212 @@ def synthesize_search_query(
     return synthesized
 
 
-def search(query: str, qdrant: QdrantClient, openai_client: OpenAI) -> list[dict]:
-    """Search for relevant chunks."""
-    query_embedding = get_embedding(query, openai_client)
+def dense_search(
+    query: str,
+    store: VectorStore,
+    openai_client: OpenAI,
+    limit: int = TOP_K,
+    filters: dict[str, list[str]] | None = None,
+) -> list[dict]:
+    """Vector search, in whichever vector layout the collection was built with (or the NumPy store)."""
+    return dense_search_many([query], store, openai_client, limit, filters)[0]
+
+
+def dense_search_many(
+    queries: list[str],
+    store: VectorStore,
+    openai_client: OpenAI,
+    limit: int = TOP_K,
+    filters: dict[str, list[str]] | None = None,
+) -> list[list[dict]]:
+    """
+    dense_search for several queries: the uncached ones are embedded together
+    (get_embeddings), then the store searches for them all at once.
+    """
+    if not queries:
+        return []
+    dims = store.dims
+    if dims is None:
+        return [[] for _ in queries]  # nothing stored yet
+    return store.search_many(get_embeddings(queries, dims), limit, filters)
 
-    results = qdrant.query_points(
-        collection_name=COLLECTION_NAME,
-        query=query_embedding,
-        limit=TOP_K,
-    ).points
 
-    return [
-        {
-            "text": r.payload["text"],
-            "book": r.payload["book"],
-            "page": r.payload["page"],
-            "score": r.score,
-        }
-        for r in results
-    ]
+def reciprocal_rank_fusion(rankings: list[list[dict]], limit: int, k: int = RRF_K) -> list[dict]:
+    """
+    Merge ranked result lists by RRF; the same chunk in several lists adds up.
+    The fused value goes in "rrf_score". "score" stays the first list's score
+    (the dense cosine, from search), or None for chunks only later lists found.
+    """
+    fused: dict[tuple, dict] = {}
+    for i, ranking in enumerate(rankings):
+        for rank, r in enumerate(ranking, 1):
+            key = (r["pdf_filename"], r["chunk_index"])
+            if key not in fused:
+                fused[key] = {**r, "score": r["score"] if i == 0 else None, "rrf_score": 0.0}
+            fused[key]["rrf_score"] += 1 / (k + rank)
+    return sorted(fused.values(), key=lambda r: -r["rrf_score"])[:limit]
+
+
+def search(
+    query: str,
+    store: VectorStore,
+    openai_client: OpenAI,
+    hybrid: bool = HYBRID_SEARCH,
+    reranker: str | None = RERANKER,
+    filters: dict[str, list[str]] | None = None,
+) -> list[dict]:
+    """
+    Search for relevant chunks: dense retrieval, fused with BM25 when hybrid and
+    the index exists, then reranked down to RERANK_TOP_N if a reranker is set.
+    filters, e.g. {"author": ["Mirza-Ghulam-Ahmad"]}, restrict both to matching chunks.
+    "score" is the dense cosine similarity (None for chunks only BM25 found);
+    fused results also carry "rrf_score", which orders them.
+    """
+    return search_many([query], store, openai_client, hybrid, reranker, filters)[0]
+
+
+def search_many(
+    queries: list[str],
+    store: VectorStore,
+    openai_client: OpenAI,
+    hybrid: bool = HYBRID_SEARCH,
+    reranker: str | None = RERANKER,
+    filters: dict[str, list[str]] | None = None,
+) -> list[list[dict]]:
+    """search for a batch of queries, with the dense searches batched (see dense_search_many)."""
+    limit = RERANK_CANDIDATES if reranker else TOP_K
+    if hybrid and LEXICAL_INDEX_PATH.exists():
+        candidates = max(HYBRID_CANDIDATES, limit)
+        dense = dense_search_many(queries, store, openai_client, candidates, filters)
+        index = get_default_index()
+        results = [
+            reciprocal_rank_fusion([d, index.search(q, candidates, filters)], limit) for q, d in zip(queries, dense)
+        ]
+    else:
+        results = dense_search_many(queries, store, openai_client, limit, filters)
+
+    if reranker:
+        results = [rerank(q, r, reranker)[:RERANK_TOP_N] for q, r in zip(queries, results)]
+    return results
+
+
+def content_words(text: str) -> set[str]:
+    return {w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS}
 
 
-def format_context(results: list[dict]) -> str:
-    """Format search results as context for the LLM."""
+def query_overlap(a: str, b: str) -> float:
+    """Jaccard overlap of the content words of two queries (1.0 if both have none)."""
+    words_a, words_b = content_words(a), content_words(b)
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def speculative_results(speculative: Future | None, question: str, search_query: str) -> list[dict] | None:
+    """
+    Results of the speculative search for `question` if they can stand in for
+    `search_query`, else None. Always waits for the search to finish, so the
+    caller can use the (not thread-safe) embedded store afterwards.
+    """
+    if speculative is None:
+        return None
+    if speculative.exception() is not None:
+        return None
+    if query_overlap(question, search_query) < SPECULATIVE_MIN_OVERLAP:
+        return None
+    return speculative.result()
+
+
+def cached_answer(
+    query: str, openai_client: OpenAI, store: VectorStore
+) -> tuple[CachedAnswer | None, list[float], str]:
+    """Look the question up in the answer cache. Returns (hit or None, question vector, fingerprint)."""
+    vector = truncate_embedding(get_embedding(query, openai_client), ANSWER_CACHE_DIMS)
+    fingerprint = store.fingerprint()
+    return get_default_answer_cache().lookup(vector, fingerprint), vector, fingerprint
+
+
+_context_encoding = None
+
+
+def get_context_encoding():
+    """Tokenizer for context budgets, loaded on first use (tiktoken is slow to import)."""
+    global _context_encoding
+    if _context_encoding is None:
+        import tiktoken
+        _context_encoding = tiktoken.get_encoding(CONTEXT_ENCODING)
+    return _context_encoding
+
+
+def overlap_length(a: str, b: str) -> int:
+    """Length of the longest suffix of `a` that is also a prefix of `b`."""
+    probe = b[:32]
+    if not probe:
+        return 0
+    pos = a.find(probe)
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return len(a) - pos
+        pos = a.find(probe, pos + 1)
+    return 0
+
+
+def merge_adjacent(results: list[dict]) -> list[dict]:
+    """
+    Merge results that are consecutive chunks of the same book into one passage,
+    dropping the text each chunk repeats from the one before, and drop repeats
+    of the same chunk. Passages keep the rank of their best chunk and come back
+    in that order, with a "pages" (first, last) range.
+    """
+    runs: list[dict] = []
+    by_chunk: dict[tuple, dict] = {}
+    ordered = sorted(
+        enumerate(results),
+        key=lambda item: (item[1].get("pdf_filename") or "", item[1].get("chunk_index") or 0, item[0]),
+    )
+    for rank, r in ordered:
+        key = (r.get("pdf_filename"), r.get("chunk_index"))
+        if key[1] is not None and key in by_chunk:
+            continue  # same chunk again (e.g. from two result lists)
+        previous = by_chunk.get((key[0], key[1] - 1)) if key[1] is not None else None
+        if previous is not None:
+            previous["text"] += r["text"][overlap_length(previous["text"], r["text"]):]
+            previous["pages"] = (previous["pages"][0], r["page"])
+            previous["rank"] = min(previous["rank"], rank)
+            run = previous
+        else:
+            run = {"book": r["book"], "text": r["text"], "pages": (r["page"], r["page"]), "rank": rank}
+            runs.append(run)
+        if key[1] is not None:
+            by_chunk[key] = run
+    return sorted(runs, key=lambda run: run["rank"])
+
+
+def format_context(results: list[dict], token_budget: int | None = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Format search results as context for the LLM: adjacent chunks merged, then
+    passages added best-first until token_budget; a passage that doesn't fit is
+    cut to the remaining budget if that leaves at least CONTEXT_MIN_TAIL_TOKENS.
+    """
+    separator = "\n---\n"
+    encoding = get_context_encoding() if token_budget else None
+    used = 0
     context_parts = []
-    for i, r in enumerate(results, 1):
-        context_parts.append(
-            f"[Source {i}] {r['book']}, Page {r['page']}:\n{r['text']}\n"
-        )
-    return "\n---\n".join(context_parts)
+    for i, run in enumerate(merge_adjacent(results), 1):
+        first, last = run["pages"]
+        pages = f"Page {first}" if first == last else f"Pages {first}-{last}"
+        header = f"[Source {i}] {run['book']}, {pages}:\n"
+        part = f"{header}{run['text']}\n"
+        if encoding is not None:
+            cost = len(encoding.encode(part + separator))
+            if used + cost > token_budget:
+                room = token_budget - used - len(encoding.encode(header + "\n" + separator))
+                if room >= CONTEXT_MIN_TAIL_TOKENS:
+                    context_parts.append(f"{header}{encoding.decode(encoding.encode(run['text'])[:room])}\n")
+                break
+            used += cost
+        context_parts.append(part)
+    return separator.join(context_parts)
 
 
 def generate_answer(
@@ -216,52 +445,118 @@ def generate_answer(
         yield response.choices[0].message.content
 
 
-def query_kb(query: str, stream: bool = False):
-    """Main query function. If stream=True, yields tokens and returns sources at end."""
+def query_kb(
+    query: str,
+    stream: bool = False,
+    answer_cache: bool = ANSWER_CACHE,
+    filters: dict[str, list[str]] | None = None,
+):
+    """
+    Main query function. Returns (answer, sources); if stream=True, returns a
+    generator that yields tokens and returns sources at end. Repeated questions
+    are answered from the answer cache when it's enabled; scoped (filtered)
+    questions always search.
+    """
+    answer_cache = answer_cache and not filters
     if not os.getenv("OPENAI_API_KEY"):
         raise ValueError("OPENAI_API_KEY environment variable not set")
 
-    openai_client = OpenAI()
-    qdrant_client = QdrantClient(path=str(QDRANT_PATH))
+    openai_client = get_openai_client()
+    store = get_vector_store(QDRANT_PATH)
+
+    if stream:
+        return _query_kb_tokens(query, openai_client, store, answer_cache, filters)
+
+    if answer_cache:
+        hit, vector, fingerprint = cached_answer(query, openai_client, store)
+        if hit:
+            print(f"Answered from cache (similarity {hit.similarity:.3f})", file=sys.stderr)
+            return hit.answer, hit.sources
 
     # Search
     print("Searching...", file=sys.stderr)
-    results = search(query, qdrant_client, openai_client)
+    results = search(query, store, openai_client, filters=filters)
 
     if not results:
-        if stream:
-            yield "No relevant information found in the knowledge base."
-            return []
         return "No relevant information found in the knowledge base.", []
 
-    # Format context
-    context = format_context(results)
-
     # Generate answer
     print("Generating answer...", file=sys.stderr)
+    answer = "".join(generate_answer(query, format_context(results), openai_client, stream=False))
+    if answer_cache:
+        get_default_answer_cache().put(query, vector, fingerprint, answer, results)
+    return answer, results
 
-    if stream:
-        for token in generate_answer(query, context, openai_client, stream=True):
-            yield token
-        return results
-    else:
-        answer = "".join(generate_answer(query, context, openai_client, stream=False))
-        return answer, results
+
+def _query_kb_tokens(
+    query: str,
+    openai_client: OpenAI,
+    store: VectorStore,
+    answer_cache: bool,
+    filters: dict[str, list[str]] | None,
+):
+    """Streaming half of query_kb: yields tokens, returns sources."""
+    if answer_cache:
+        hit, vector, fingerprint = cached_answer(query, openai_client, store)
+        if hit:
+            print(f"Answered from cache (similarity {hit.similarity:.3f})", file=sys.stderr)
+            yield hit.answer
+            return hit.sources
+
+    print("Searching...", file=sys.stderr)
+    results = search(query, store, openai_client, filters=filters)
+
+    if not results:
+        yield "No relevant information found in the knowledge base."
+        return []
+
+    print("Generating answer...", file=sys.stderr)
+    tokens = []
+    for token in generate_answer(query, format_context(results), openai_client, stream=True):
+        tokens.append(token)
+        yield token
+    if answer_cache:
+        get_default_answer_cache().put(query, vector, fingerprint, "".join(tokens), results)
+    return results
 
 
-def query_kb_stream(query: str, conversation_history: list[dict] | None = None):
+def query_events(
+    query: str,
+    conversation_history: list[dict] | None,
+    openai_client: OpenAI,
+    store: VectorStore,
+    speculative: bool = SPECULATIVE_SEARCH,
+    answer_cache: bool = ANSWER_CACHE,
+    filters: dict[str, list[str]] | None = None,
+):
     """
-    Stream query results using tool-use pattern.
+    Answer a query using the tool-use pattern, as a stream of events:
+    ("status", message) and ("token", text) while working, then ("sources", list).
 
     The model decides whether to search the knowledge base or answer directly
     from conversation context. This produces more natural conversations.
-    """
-    if not os.getenv("OPENAI_API_KEY"):
-        print(json.dumps({"error": "OPENAI_API_KEY not set"}), file=sys.stderr)
-        sys.exit(1)
 
-    openai_client = OpenAI()
-    qdrant_client = QdrantClient(path=str(QDRANT_PATH))
+    With speculative=True the raw question is searched concurrently with that
+    decision, taking the embedding and Qdrant round trips off the critical path
+    when the model's search query turns out to be close to it.
+
+    A question without conversation history is first looked up in the answer
+    cache, so a hit costs no chat call; answers grounded in search results are
+    added to it.
+
+    filters restrict every search to matching chunks (see search).
+    """
+    # Follow-ups depend on the conversation, so only standalone, unscoped questions are cached
+    answer_cache = answer_cache and not conversation_history and not filters
+    if answer_cache:
+        # Checked before the tool decision so a hit never pays for it. The question's embedding
+        # is cached on the way, so a search for the question itself doesn't wait for it again.
+        hit, vector, fingerprint = cached_answer(query, openai_client, store)
+        if hit:
+            yield "status", "Answering from cache..."
+            yield "token", hit.answer
+            yield "sources", hit.sources[:5]
+            return
 
     # Build message history
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
@@ -273,88 +568,137 @@ def query_kb_stream(query: str, conversation_history: list[dict] | None = None):
 
     messages.append({"role": "user", "content": query})
 
-    # First call: let model decide if it needs to search
-    print("Thinking...", file=sys.stderr)
-    response = openai_client.chat.completions.create(
-        model="gpt-4o",  # Use 4o for tool decisions (faster, cheaper than 5.2)
-        messages=messages,
-        tools=[SEARCH_TOOL],
-        tool_choice="auto",  # Model decides whether to use tool
-        temperature=0.3,
+    speculative_search = (
+        _speculative_pool.submit(search, query, store, openai_client, filters=filters)
+        if speculative else None
     )
 
-    assistant_message = response.choices[0].message
-    sources = []
-
-    # Check if model wants to search
-    if assistant_message.tool_calls:
-        tool_call = assistant_message.tool_calls[0]
-        if tool_call.function.name == "search_islamic_texts":
-            # Extract search query from tool call
-            tool_args = json.loads(tool_call.function.arguments)
-            search_query = tool_args.get("query", query)
-
-            print(f"Searching: {search_query}", file=sys.stderr)
+    try:
+        # First call: let model decide if it needs to search
+        yield "status", "Thinking..."
+        response = openai_client.chat.completions.create(
+            model="gpt-4o",  # Use 4o for tool decisions (faster, cheaper than 5.2)
+            messages=messages,
+            tools=[SEARCH_TOOL],
+            tool_choice="auto",  # Model decides whether to use tool
+            temperature=0.3,
+        )
 
-            # Execute search
-            results = search(search_query, qdrant_client, openai_client)
+        assistant_message = response.choices[0].message
+        sources = []
+        tokens = []
+
+        # Check if model wants to search
+        if assistant_message.tool_calls:
+            tool_call = assistant_message.tool_calls[0]
+            if tool_call.function.name == "search_islamic_texts":
+                # Extract search query from tool call
+                tool_args = json.loads(tool_call.function.arguments)
+                search_query = tool_args.get("query", query)
+
+                # Execute search, unless the speculative one already answers it
+                results = speculative_results(speculative_search, query, search_query)
+                if results is not None:
+                    yield "status", f"Searching: {search_query} (speculative)"
+                else:
+                    yield "status", f"Searching: {search_query}"
+                    results = search(search_query, store, openai_client, filters=filters)
+
+                if results:
+                    context = format_context(results)
+                    sources = [
+                        {"book": r["book"], "page": r["page"], "score": r["score"], "text": r["text"]}
+                        for r in results[:5]
+                    ]
+                else:
+                    context = "No relevant information found in the knowledge base."
+
+                # Add assistant's tool call and tool result to messages
+                messages.append(assistant_message)
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "content": context,
+                })
+
+                # Generate final response with search results
+                yield "status", "Generating..."
+                response = openai_client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=messages,
+                    temperature=0.3,
+                    max_completion_tokens=1000,
+                    stream=True,
+                )
+
+                for chunk in response:
+                    if chunk.choices[0].delta.content:
+                        tokens.append(chunk.choices[0].delta.content)
+                        yield "token", chunk.choices[0].delta.content
+        else:
+            # Model chose not to search - use the response directly
+            yield "status", "Answering from context..."
 
-            if results:
-                context = format_context(results)
-                sources = [
-                    {"book": r["book"], "page": r["page"], "score": r["score"], "text": r["text"]}
-                    for r in results[:5]
-                ]
+            if assistant_message.content:
+                # Use the already-generated response
+                yield "token", assistant_message.content
             else:
-                context = "No relevant information found in the knowledge base."
-
-            # Add assistant's tool call and tool result to messages
-            messages.append(assistant_message)
-            messages.append({
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "content": context,
-            })
-
-            # Generate final response with search results
-            print("Generating...", file=sys.stderr)
-            response = openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=messages,
-                temperature=0.3,
-                max_completion_tokens=1000,
-                stream=True,
-            )
-
-            for chunk in response:
-                if chunk.choices[0].delta.content:
-                    print(chunk.choices[0].delta.content, end="", flush=True)
-    else:
-        # Model chose not to search - use the response directly
-        print("Answering from context...", file=sys.stderr)
+                # Fallback: re-request if content was empty (shouldn't happen)
+                response = openai_client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=messages,
+                    temperature=0.3,
+                    max_completion_tokens=1000,
+                    stream=True,
+                )
+                for chunk in response:
+                    if chunk.choices[0].delta.content:
+                        yield "token", chunk.choices[0].delta.content
+
+        if answer_cache and sources:
+            get_default_answer_cache().put(query, vector, fingerprint, "".join(tokens), sources)
+
+        # Sources are empty if no search was performed
+        yield "sources", sources
+    finally:
+        # Also on errors and when the consumer stops early (a client disconnect): the
+        # speculative search must be done before the caller uses the store again
+        if speculative_search is not None:
+            speculative_search.cancel()
+            wait([speculative_search])
+
+
+def query_kb_stream(
+    query: str,
+    conversation_history: list[dict] | None = None,
+    speculative: bool = SPECULATIVE_SEARCH,
+    answer_cache: bool = ANSWER_CACHE,
+    filters: dict[str, list[str]] | None = None,
+):
+    """
+    Stream an answer for the TUI: status lines on stderr, answer tokens on stdout,
+    then a ---SOURCES--- line and the sources as JSON.
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        print(json.dumps({"error": "OPENAI_API_KEY not set"}), file=sys.stderr)
+        sys.exit(1)
 
-        if assistant_message.content:
-            # Use the already-generated response
-            print(assistant_message.content, end="", flush=True)
+    openai_client = get_openai_client()
+    store = get_vector_store(QDRANT_PATH)
+
+    for kind, value in query_events(
+        query, conversation_history, openai_client, store, speculative, answer_cache, filters
+    ):
+        if kind == "status":
+            print(value, file=sys.stderr)
+        elif kind == "token":
+            print(value, end="", flush=True)
         else:
-            # Fallback: re-request if content was empty (shouldn't happen)
-            response = openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=messages,
-                temperature=0.3,
-                max_completion_tokens=1000,
-                stream=True,
-            )
-            for chunk in response:
-                if chunk.choices[0].delta.content:
-                    print(chunk.choices[0].delta.content, end="", flush=True)
-
-    # Print sources (empty if no search was performed)
-    print("\n---SOURCES---")
-    print(json.dumps(sources))
-
-
-def interactive_mode():
+            print("\n---SOURCES---")
+            print(json.dumps(value))
+
+
+def interactive_mode(answer_cache: bool = ANSWER_CACHE, filters: dict[str, list[str]] | None = None):
     """Run in interactive mode."""
     print("Islamic Knowledge Base - Interactive Query")
     print("Type 'quit' to exit\n")
@@ -362,19 +706,22 @@ def interactive_mode():
     while True:
         query = input("\nYour question: ").strip()
         if query.lower() in ('quit', 'exit', 'q'):
+            if answer_cache:
+                print(get_default_answer_cache().summary())
             break
         if not query:
             continue
 
         try:
-            answer, sources = query_kb(query)
+            answer, sources = query_kb(query, answer_cache=answer_cache, filters=filters)
             print(f"\n{'='*60}")
             print("ANSWER:")
             print(answer)
             print(f"\n{'='*60}")
             print("SOURCES:")
             for i, s in enumerate(sources[:5], 1):
-                print(f"  {i}. {s['book']}, p.{s['page']} (score: {s['score']:.3f})")
+                score = "keyword match" if s["score"] is None else f"score: {s['score']:.3f}"
+                print(f"  {i}. {s['book']}, p.{s['page']} ({score})")
         except Exception as e:
             print(f"Error: {e}")
 
@@ -388,7 +735,23 @@ def main():
         type=str,
         help="JSON conversation history: [{question, answer}, ...]",
     )
+    parser.add_argument(
+        "--speculative",
+        action="store_true",
+        default=SPECULATIVE_SEARCH,
+        help="With --stream, search for the question while the model decides whether to search",
+    )
+    parser.add_argument(
+        "--no-answer-cache",
+        dest="answer_cache",
+        action="store_false",
+        default=ANSWER_CACHE,
+        help="Always search and generate, even for a question answered before",
+    )
+    parser.add_argument("--author", action="append", help="Only search this author's books (repeatable)")
+    parser.add_argument("--book", action="append", help="Only search this book (repeatable)")
     args = parser.parse_args()
+    filters = {field: values for field, values in (("author", args.author), ("book", args.book)) if values}
 
     # Parse conversation history if provided
     conversation_history = None
@@ -404,16 +767,16 @@ def main():
             print("Error: query required with --stream", file=sys.stderr)
             sys.exit(1)
         query = " ".join(args.query)
-        query_kb_stream(query, conversation_history)
+        query_kb_stream(query, conversation_history, args.speculative, args.answer_cache, filters)
     elif args.query:
         query = " ".join(args.query)
-        answer, sources = query_kb(query)
+        answer, sources = query_kb(query, answer_cache=args.answer_cache, filters=filters)
         print(f"\nAnswer:\n{answer}")
         print(f"\nSources:")
         for i, s in enumerate(sources[:5], 1):
             print(f"  {i}. {s['book']}, p.{s['page']}")
     else:
-        interactive_mode()
+        interactive_mode(args.answer_cache, filters)
 
 
 if __name__ == "__main__":
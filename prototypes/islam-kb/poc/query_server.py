@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Long-lived query server for the TUI.
+
+Keeps the OpenAI client (and its keep-alive connection pool), the vector store
+and the embedding cache open across questions, so a turn no longer pays Python
+startup, imports and opening the store. Answers are streamed from
+query.query_events as newline-delimited JSON:
+
+    POST /query  {"query": "...", "history": [{"question": ..., "answer": ...}],
+                  "filters": {"author": [...], "book": [...]}}
+      -> {"status": "Thinking..."}
+         {"token": "..."} ...
+         {"sources": [...]}          (or {"error": "..."})
+    GET /health  -> {"status": "ok", "uptime": seconds, "queries": n}
+
+    python query_server.py --port 8766 [--speculative]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from query import QDRANT_PATH, RERANKER, SPECULATIVE_SEARCH, query_events
+from reranker import get_cross_encoder
+from embedding_cache import get_default_cache
+from lexical_index import filter_values
+from clients import get_openai_client, get_vector_store
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+
+
+class QueryService:
+    """Clients shared by every request."""
+
+    def __init__(self, speculative: bool = SPECULATIVE_SEARCH):
+        self.speculative = speculative
+        self.openai_client = get_openai_client()
+        self.store = get_vector_store(QDRANT_PATH)
+        # The embedded Qdrant store isn't safe for concurrent use; answer one question at a time.
+        self.lock = nullcontext() if self.store.thread_safe else threading.Lock()
+        self.started = time.monotonic()
+        self.queries = 0
+        self.queries_lock = threading.Lock()  # self.lock is a no-op for thread-safe stores
+
+    def count_query(self):
+        with self.queries_lock:
+            self.queries += 1
+
+    def warm_up(self):
+        """Load the collection, the embedding cache and any reranking model before the first question."""
+        self.store.fingerprint()
+        get_default_cache()
+        if RERANKER == "cross-encoder":
+            get_cross_encoder()
+
+    def health(self) -> dict:
+        return {"status": "ok", "uptime": round(time.monotonic() - self.started, 1), "queries": self.queries}
+
+
+def make_handler(service: QueryService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_event(self, event: dict):
+            data = json.dumps(event).encode() + b"\n"
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/health":
+                self.send_json(200, service.health())
+            else:
+                self.send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/query":
+                self.send_json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                query = body["query"].strip()
+                history = body.get("history") or None
+                filters = body.get("filters") or None
+                filter_values(filters)  # unknown fields are a bad request, not a failed query
+            except (KeyError, AttributeError, ValueError) as e:
+                self.send_json(400, {"error": f"Bad request: {e}"})
+                return
+            if not query:
+                self.send_json(400, {"error": "Bad request: empty query"})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                service.count_query()
+                with service.lock:
+                    try:
+                        for kind, value in query_events(
+                            query, history, service.openai_client, service.store, service.speculative,
+                            filters=filters,
+                        ):
+                            self.send_event({kind: value})
+                    except (BrokenPipeError, ConnectionResetError):
+                        raise
+                    except Exception as e:
+                        print(f"Query failed: {type(e).__name__}: {e}", file=sys.stderr)
+                        self.send_event({"error": f"{type(e).__name__}: {e}"})
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client went away mid-answer
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Islamic KB queries over HTTP")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--speculative",
+        action="store_true",
+        default=SPECULATIVE_SEARCH,
+        help="Search for each question while the model decides whether to search",
+    )
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set")
+        sys.exit(1)
+
+    service = QueryService(args.speculative)
+    service.warm_up()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Query server on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nServed {service.queries} queries")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Second-stage reranking of search candidates on the CPU.
+
+Two scorers:
+
+- "cross-encoder": a small MS MARCO cross-encoder (RERANK_MODEL, ~22M params)
+  via sentence-transformers, which reads query and passage together. Optional
+  dependency: pip install sentence-transformers. Without it, "terms" is used.
+- "terms": weighted query-term coverage of each passage, with a bonus for
+  query terms appearing next to each other. No model, microseconds per passage.
+
+The cross-encoder scores candidates best-first in batches until
+RERANK_TIMEOUT_SECONDS runs out; any not scored by then keep their first-stage
+order after the scored ones.
+"""
+
+import sys
+import math
+import time
+import threading
+
+from lexical_index import query_terms
+
+# Configuration
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_BATCH_SIZE = 16
+RERANK_TIMEOUT_SECONDS = 0.5  # excludes loading the model on first use
+RERANK_MAX_CHARS = 2000  # the model reads at most 512 tokens anyway
+
+_lock = threading.Lock()
+_cross_encoder = None
+_cross_encoder_missing = False
+
+
+def term_scores(query: str, texts: list[str]) -> list[float]:
+    """
+    Share of the query's term weight each text covers (IDF within this
+    candidate set, so terms every candidate has count for little), plus up to
+    0.5 for adjacent query-term pairs found in the text.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return [0.0] * len(texts)
+    words = [query_terms(t) for t in texts]
+    word_sets = [set(w) for w in words]
+    weights = {t: math.log(1 + len(texts) / (1 + sum(t in ws for ws in word_sets))) for t in terms}
+    total = sum(weights.values()) or 1.0
+    pairs = list(zip(terms, terms[1:]))
+
+    scores = []
+    for ws, w in zip(word_sets, words):
+        coverage = sum(weights[t] for t in terms if t in ws) / total
+        if pairs:
+            adjacent = set(zip(w, w[1:]))
+            coverage += 0.5 * sum(p in adjacent for p in pairs) / len(pairs)
+        scores.append(coverage)
+    return scores
+
+
+def get_cross_encoder():
+    """The cross-encoder, loaded on first use; None if sentence-transformers isn't installed."""
+    global _cross_encoder, _cross_encoder_missing
+    with _lock:
+        if _cross_encoder is None and not _cross_encoder_missing:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError:
+                _cross_encoder_missing = True
+                print("Reranker: sentence-transformers not installed, using term scoring", file=sys.stderr)
+                return None
+            _cross_encoder = CrossEncoder(RERANK_MODEL, device="cpu")
+        return _cross_encoder
+
+
+def rerank(
+    query: str,
+    results: list[dict],
+    method: str = "cross-encoder",
+    timeout: float = RERANK_TIMEOUT_SECONDS,
+    batch_size: int = RERANK_BATCH_SIZE,
+) -> list[dict]:
+    """Re-order search results by reranker score; each scored result gets a "rerank_score"."""
+    model = get_cross_encoder() if method == "cross-encoder" else None
+    if model is None:
+        scores = term_scores(query, [r["text"] for r in results])
+        scored = [{**r, "rerank_score": s} for r, s in zip(results, scores)]
+    else:
+        deadline = time.monotonic() + timeout
+        scored = []
+        for i in range(0, len(results), batch_size):
+            if i and time.monotonic() >= deadline:
+                break
+            batch = results[i:i + batch_size]
+            pairs = [(query, r["text"][:RERANK_MAX_CHARS]) for r in batch]
+            scores = model.predict(pairs, batch_size=batch_size, show_progress_bar=False)
+            scored.extend({**r, "rerank_score": float(s)} for r, s in zip(batch, scores))
+
+    scored.sort(key=lambda r: -r["rerank_score"])
+    return scored + results[len(scored):]
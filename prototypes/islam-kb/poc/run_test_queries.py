@@ -1,17 +1,31 @@
 #!/usr/bin/env python3
 """
 Run test queries against the Islamic KB and save results for analysis.
+
+Queries are searched SEARCH_BATCH_SIZE at a time (query.search_many: one
+embedding request and one batch vector query per batch), then answered with up
+to ANSWER_CONCURRENCY chat requests in flight. Results keep the query order.
+
+    python run_test_queries.py
+    python run_test_queries.py --queries eval_questions.txt --concurrency 16
 """
 
 import os
 import json
 import sys
+import time
+import argparse
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from query import search_many, format_context, generate_answer, QDRANT_PATH
+from embedding_cache import get_default_cache
+from clients import get_openai_client, get_vector_store
 
-from openai import OpenAI
-from qdrant_client import QdrantClient
-from query import search, format_context, generate_answer, QDRANT_PATH
+# Configuration
+SEARCH_BATCH_SIZE = 64  # queries per search_many call
+ANSWER_CONCURRENCY = 8  # answer generations in flight; keep within clients.OPENAI_MAX_CONNECTIONS
 
 # Test queries covering different aspects of the Seal of Prophets book
 TEST_QUERIES = [
@@ -42,78 +56,114 @@ TEST_QUERIES = [
 ]
 
 
-def run_queries():
-    """Run all test queries and collect results."""
+def answer_query(query: str, sources: list[dict], openai_client) -> dict:
+    """Generate the answer for one searched query and build its result record."""
+    if not sources:
+        return {
+            "query": query,
+            "answer": "No relevant information found in the knowledge base.",
+            "sources": [],
+            "timestamp": datetime.now().isoformat(),
+            "success": True,
+        }
+
+    # Format context and generate answer
+    context = format_context(sources)
+    answer = "".join(generate_answer(query, context, openai_client, stream=False))
+    return {
+        "query": query,
+        "answer": answer,
+        "sources": [
+            {
+                "book": s["book"],
+                "page": s["page"],
+                "score": s["score"],
+                "text": s["text"],
+            }
+            for s in sources[:5]  # Top 5 sources
+        ],
+        "timestamp": datetime.now().isoformat(),
+        "success": True,
+    }
+
+
+def failed_query(query: str, error: Exception) -> dict:
+    return {
+        "query": query,
+        "answer": None,
+        "sources": [],
+        "timestamp": datetime.now().isoformat(),
+        "success": False,
+        "error": str(error),
+    }
+
+
+def run_queries(queries: list[str] = TEST_QUERIES, concurrency: int = ANSWER_CONCURRENCY) -> list[dict]:
+    """Run all test queries and collect results, in query order."""
     if not os.getenv("OPENAI_API_KEY"):
         raise ValueError("OPENAI_API_KEY environment variable not set")
 
-    openai_client = OpenAI()
-    qdrant_client = QdrantClient(path=str(QDRANT_PATH))
-
-    results = []
-
-    for i, query in enumerate(TEST_QUERIES, 1):
-        print(f"\n[{i}/{len(TEST_QUERIES)}] Query: {query}")
-        print("-" * 60)
-
-        try:
-            # Search for relevant chunks
-            sources = search(query, qdrant_client, openai_client)
-
-            if not sources:
-                result = {
-                    "query": query,
-                    "answer": "No relevant information found in the knowledge base.",
-                    "sources": [],
-                    "timestamp": datetime.now().isoformat(),
-                    "success": True,
-                }
+    openai_client = get_openai_client()
+    store = get_vector_store(QDRANT_PATH)
+
+    results: list[dict | None] = [None] * len(queries)
+    retrieved: list[int] = [0] * len(queries)
+    futures = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="answer") as pool:
+        # Answers for one batch are generated while the next batch is searched
+        for start in range(0, len(queries), SEARCH_BATCH_SIZE):
+            batch = queries[start:start + SEARCH_BATCH_SIZE]
+            began = time.perf_counter()
+            try:
+                # Search for relevant chunks
+                batch_sources = search_many(batch, store, openai_client)
+            except Exception as e:
+                print(f"Search failed for queries {start + 1}-{start + len(batch)}: {e}")
+                for i, query in enumerate(batch, start):
+                    results[i] = failed_query(query, e)
+                continue
+            print(f"Searched queries {start + 1}-{start + len(batch)} in {time.perf_counter() - began:.2f}s")
+            for i, (query, sources) in enumerate(zip(batch, batch_sources), start):
+                retrieved[i] = len(sources)
+                futures[pool.submit(answer_query, query, sources, openai_client)] = i
+
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            query = queries[i]
+            print(f"\n[{done}/{len(futures)}] Query: {query}")
+            print("-" * 60)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = failed_query(query, e)
+                print(f"Error: {e}")
             else:
-                # Format context and generate answer
-                context = format_context(sources)
-                answer = "".join(generate_answer(query, context, openai_client, stream=False))
-
-                result = {
-                    "query": query,
-                    "answer": answer,
-                    "sources": [
-                        {
-                            "book": s["book"],
-                            "page": s["page"],
-                            "score": s["score"],
-                            "text": s["text"],
-                        }
-                        for s in sources[:5]  # Top 5 sources
-                    ],
-                    "timestamp": datetime.now().isoformat(),
-                    "success": True,
-                }
-
-                print(f"Answer preview: {answer[:200]}...")
-                print(f"Sources: {len(sources)} chunks retrieved")
-
-        except Exception as e:
-            result = {
-                "query": query,
-                "answer": None,
-                "sources": [],
-                "timestamp": datetime.now().isoformat(),
-                "success": False,
-                "error": str(e),
-            }
-            print(f"Error: {e}")
-
-        results.append(result)
+                if result["sources"]:
+                    print(f"Answer preview: {result['answer'][:200]}...")
+                    print(f"Sources: {retrieved[i]} chunks retrieved")
+            results[i] = result
 
     return results
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Run test queries and save the answers")
+    parser.add_argument("--queries", type=Path, help="File of queries, one per line (default: TEST_QUERIES)")
+    parser.add_argument("--concurrency", type=int, default=ANSWER_CONCURRENCY, help="Answers generated at once")
+    args = parser.parse_args()
+
+    queries = TEST_QUERIES
+    if args.queries:
+        queries = [line.strip() for line in args.queries.read_text().splitlines() if line.strip()]
+
     print("=" * 60)
     print("Running Test Queries on Islamic Knowledge Base")
     print("=" * 60)
 
-    results = run_queries()
+    start = time.perf_counter()
+    results = run_queries(queries, args.concurrency)
+    seconds = time.perf_counter() - start
 
     # Save to JSON
     output_path = Path(__file__).parent / "query_results.json"
@@ -125,6 +175,8 @@ def main():
     print(f"Total queries: {len(results)}")
     print(f"Successful: {sum(1 for r in results if r['success'])}")
     print(f"Failed: {sum(1 for r in results if not r['success'])}")
+    print(f"Time: {seconds:.1f}s ({len(results) / max(seconds, 1e-9):.1f} queries/s)")
+    print(get_default_cache().summary())
 
 
 if __name__ == "__main__":
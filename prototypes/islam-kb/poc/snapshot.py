@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Portable snapshots of the vector store, for backups and for moving a
+collection between the embedded store and a Qdrant server without going
+through either one's internal storage format.
+
+A snapshot is a directory:
+
+    manifest.json           format, version, collection, count, config, checksums
+    ids.npy                 point IDs, (count,) unicode strings
+    vectors.npy             (count, dims) float32, one file per vector name:
+    vectors-<name>.npy      vectors-full.npy, vectors-short.npy for named vectors
+    payload-<field>.jsonl   one JSON value per line, row-aligned with ids.npy
+
+The arrays are NumPy .npy files (a documented header plus raw little-endian
+data), so they can be memory-mapped and are read and written sequentially;
+nothing is pickled. Payloads are stored a column per field; null means the
+point has no such field. manifest.json records the collection config needed to
+recreate it (vector names, sizes, distance, quantization), whether IDs are
+integers or UUIDs, and the sha256 of every file, which import checks first.
+
+Export pages through the collection with scroll, so it works the same against
+the embedded store and a server; import creates the collection and bulk-loads
+it with upload_collection.
+
+    python snapshot.py export backups/2026-10-18
+    python snapshot.py import backups/2026-10-18 --url http://localhost:6333
+    python snapshot.py info backups/2026-10-18
+"""
+
+import sys
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from datetime import datetime
+from contextlib import ExitStack
+from typing import Iterator
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import CreateCollection
+
+from clients import get_qdrant_client
+
+# Configuration
+QDRANT_PATH = Path(__file__).parent / "qdrant_data"
+COLLECTION_NAME = "islamic_books"
+SNAPSHOT_FORMAT = "islam-kb-snapshot"
+SNAPSHOT_VERSION = 1
+EXPORT_PAGE_SIZE = 256  # points per scroll request
+IMPORT_BATCH_SIZE = 256  # points per upsert
+IMPORT_PARALLEL = 1  # upload processes; more only helps against a server
+
+
+def vector_file(name: str) -> str:
+    return f"vectors-{name}.npy" if name else "vectors.npy"
+
+
+def payload_file(field: str) -> str:
+    return f"payload-{field}.jsonl"
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(snapshot: Path) -> dict:
+    with open(snapshot / "manifest.json") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"{snapshot} is not a version {SNAPSHOT_VERSION} {SNAPSHOT_FORMAT} "
+            f"(found {manifest.get('format')} version {manifest.get('version')})"
+        )
+    return manifest
+
+
+def export_snapshot(client: QdrantClient, snapshot: Path, collection: str = COLLECTION_NAME) -> dict:
+    """Write every point of the collection to the snapshot directory. Returns the manifest."""
+    info = client.get_collection(collection)
+    config = CreateCollection(
+        vectors=info.config.params.vectors,
+        quantization_config=info.config.quantization_config,
+        on_disk_payload=info.config.params.on_disk_payload,
+    )
+    sizes = (
+        {name: params.size for name, params in config.vectors.items()}
+        if isinstance(config.vectors, dict) else {"": config.vectors.size}
+    )
+    count = client.count(collection, exact=True).count
+    snapshot.mkdir(parents=True, exist_ok=True)
+
+    ids = np.lib.format.open_memmap(snapshot / "ids.npy", mode="w+", dtype="<U36", shape=(count,))
+    vectors = {
+        name: np.lib.format.open_memmap(snapshot / vector_file(name), mode="w+", dtype="<f4", shape=(count, dims))
+        for name, dims in sizes.items()
+    }
+    integer_ids = True
+    written = 0
+    with ExitStack() as stack:
+        columns = {}
+
+        def column(field: str):
+            # A field first seen at row n gets n leading nulls
+            if field not in columns:
+                columns[field] = stack.enter_context(open(snapshot / payload_file(field), "w"))
+                columns[field].write("null\n" * written)
+            return columns[field]
+
+        offset = None
+        while written < count:
+            records, offset = client.scroll(
+                collection, limit=EXPORT_PAGE_SIZE, offset=offset, with_payload=True, with_vectors=True
+            )
+            records = records[:count - written]  # points added since counting wait for the next export
+            for record in records:
+                ids[written] = str(record.id)
+                integer_ids = integer_ids and isinstance(record.id, int)
+                point_vectors = record.vector if isinstance(record.vector, dict) else {"": record.vector}
+                for name in sizes:
+                    vectors[name][written] = point_vectors[name]
+                payload = record.payload or {}
+                for field in payload.keys() - columns.keys():
+                    column(field)
+                for field, f in columns.items():
+                    f.write(json.dumps(payload.get(field), ensure_ascii=False) + "\n")
+                written += 1
+            print(f"Exported {written}/{count}", flush=True)
+            if offset is None:
+                break
+        fields = sorted(columns)
+
+    ids.flush()
+    for matrix in vectors.values():
+        matrix.flush()
+    del ids, vectors
+
+    files = ["ids.npy"] + [vector_file(name) for name in sizes] + [payload_file(field) for field in fields]
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "collection": collection,
+        "created": datetime.now().isoformat(),
+        # Fewer than counted if points were deleted mid-export; arrays are sized for the count
+        "count": written,
+        "id_type": "int" if integer_ids else "uuid",
+        "config": config.model_dump(mode="json", exclude_none=True),
+        "vectors": {name: {"file": vector_file(name), "dims": dims} for name, dims in sizes.items()},
+        "payload_fields": {field: payload_file(field) for field in fields},
+        "sha256": {name: file_sha256(snapshot / name) for name in files},
+    }
+    with open(snapshot / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def check_snapshot(snapshot: Path, manifest: dict):
+    """Raise if any file is missing or doesn't match its recorded checksum."""
+    for name, expected in manifest["sha256"].items():
+        path = snapshot / name
+        if not path.exists():
+            raise ValueError(f"Snapshot file missing: {path}")
+        if file_sha256(path) != expected:
+            raise ValueError(f"Snapshot file corrupt (checksum mismatch): {path}")
+
+
+def iter_payloads(snapshot: Path, manifest: dict) -> Iterator[dict]:
+    """Payload dicts row by row, read from the per-field columns together."""
+    with ExitStack() as stack:
+        columns = {
+            field: stack.enter_context(open(snapshot / name)) for field, name in manifest["payload_fields"].items()
+        }
+        for _ in range(manifest["count"]):
+            values = {field: json.loads(next(f)) for field, f in columns.items()}
+            yield {field: value for field, value in values.items() if value is not None}
+
+
+def import_snapshot(
+    client: QdrantClient,
+    snapshot: Path,
+    collection: str | None = None,
+    fresh: bool = False,
+) -> int:
+    """Create the collection from the snapshot's config and bulk-load its points. Returns the point count."""
+    manifest = load_manifest(snapshot)
+    check_snapshot(snapshot, manifest)
+    collection = collection or manifest["collection"]
+    config = CreateCollection(**manifest["config"])
+    count = manifest["count"]
+
+    if client.collection_exists(collection):
+        if not fresh:
+            raise ValueError(f"Collection {collection} already exists; use --fresh to replace it")
+        client.delete_collection(collection)
+        print(f"Deleted existing collection {collection}")
+    client.create_collection(
+        collection_name=collection,
+        vectors_config=config.vectors,
+        quantization_config=config.quantization_config,
+        on_disk_payload=config.on_disk_payload,
+    )
+
+    # Memory-mapped, so the OS pages vectors in as upload_collection walks them
+    matrices = {
+        name: np.load(snapshot / spec["file"], mmap_mode="r", allow_pickle=False)[:count]
+        for name, spec in manifest["vectors"].items()
+    }
+    raw_ids = np.load(snapshot / "ids.npy", mmap_mode="r", allow_pickle=False)[:count]
+    ids = (int(i) for i in raw_ids) if manifest["id_type"] == "int" else (str(i) for i in raw_ids)
+    client.upload_collection(
+        collection_name=collection,
+        vectors=matrices[""] if list(matrices) == [""] else matrices,
+        payload=iter_payloads(snapshot, manifest),
+        ids=ids,
+        batch_size=IMPORT_BATCH_SIZE,
+        parallel=IMPORT_PARALLEL,
+        wait=True,
+    )
+    return client.count(collection, exact=True).count
+
+
+def directory_mb(path: Path) -> float:
+    return sum(p.stat().st_size for p in path.iterdir()) / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import portable vector store snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("export", "Write a collection to a snapshot"), ("import", "Load a snapshot")):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("snapshot", type=Path, help="Snapshot directory")
+        cmd.add_argument("--path", type=Path, default=QDRANT_PATH, help="Embedded store (ignored with --url)")
+        cmd.add_argument("--url", help="Qdrant server (default QDRANT_URL, else the embedded store)")
+        cmd.add_argument("--collection", help=f"Collection (default {COLLECTION_NAME}, or the snapshot's on import)")
+    sub.choices["import"].add_argument("--fresh", action="store_true", help="Replace an existing collection")
+    info_cmd = sub.add_parser("info", help="Describe a snapshot")
+    info_cmd.add_argument("snapshot", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "info":
+        manifest = load_manifest(args.snapshot)
+        print(f"{manifest['collection']}: {manifest['count']} points, {manifest['id_type']} IDs, "
+              f"created {manifest['created']}")
+        for name, spec in manifest["vectors"].items():
+            print(f"  vector {name or '(default)'}: {spec['dims']} dims in {spec['file']}")
+        print(f"  payload fields: {', '.join(manifest['payload_fields'])}")
+        print(f"  {directory_mb(args.snapshot):.1f} MB")
+        return
+
+    client = get_qdrant_client(args.path, args.url)
+    start = time.perf_counter()
+    if args.command == "export":
+        manifest = export_snapshot(client, args.snapshot, args.collection or COLLECTION_NAME)
+        seconds = time.perf_counter() - start
+        print(f"Exported {manifest['count']} points in {seconds:.1f}s "
+              f"({directory_mb(args.snapshot):.1f} MB) to {args.snapshot}")
+    else:
+        try:
+            count = import_snapshot(client, args.snapshot, args.collection, args.fresh)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        seconds = time.perf_counter() - start
+        print(f"Imported {count} points in {seconds:.1f}s ({count / max(seconds, 1e-9):.0f} points/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI embeddings endpoint, for exercising the ingest
+and query paths without network access or API spend.
+
+Vectors are deterministic per (text, dims), unit-length, and returned as float
+lists or base64 float32 like the real API. Latency and 429 responses can be
+injected to test concurrency and rate-limit handling.
+
+Chat completions are stubbed too, enough for query.py: a request offering tools
+gets a search_islamic_texts call for the latest user message, anything else a
+canned answer, streamed as SSE when asked, one token per --token-latency.
+
+    python stub_embedding_server.py --latency 0.3 --rate-limit 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python pipeline.py
+"""
+
+import math
+import json
+import time
+import base64
+import random
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+DEFAULT_DIMS = 3072
+STUB_ANSWER_TOKENS = 40
+
+
+def fake_embedding(text: str, dims: int = DEFAULT_DIMS) -> list[float]:
+    """Deterministic unit vector for a text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dims)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class StubState:
+    """Counters shared by handler threads, served at GET /stats."""
+
+    def __init__(
+        self,
+        latency: float,
+        rate_limit: float,
+        retry_after: float,
+        dims: int,
+        token_latency: float = 0.0,
+    ):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.dims = dims
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.inputs = 0
+        self.chat_requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "rate_limited": self.rate_limited,
+                "inputs": self.inputs,
+                "chat_requests": self.chat_requests,
+                "max_in_flight": self.max_in_flight,
+            }
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status: int, body: dict, headers: dict | None = None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                self.send_json(200, state.stats())
+            else:
+                self.send_json(404, {"error": {"message": "not found"}})
+
+        def send_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def chat(self, request: dict):
+            with state.lock:
+                state.chat_requests += 1
+            time.sleep(state.latency)
+            model = request.get("model", "stub")
+            question = next(
+                (m["content"] for m in reversed(request.get("messages", [])) if m.get("role") == "user"), ""
+            )
+            wants_tool = request.get("tools") and request["messages"][-1].get("role") == "user"
+
+            if wants_tool:
+                message = {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [{
+                        "id": "call_stub",
+                        "type": "function",
+                        "function": {
+                            "name": request["tools"][0]["function"]["name"],
+                            "arguments": json.dumps({"query": question}),
+                        },
+                    }],
+                }
+                finish_reason = "tool_calls"
+            else:
+                words = f"Stub answer to: {question}".split()
+                tokens = [f"{words[i % len(words)]} " for i in range(STUB_ANSWER_TOKENS)]
+                message = {"role": "assistant", "content": "".join(tokens)}
+                finish_reason = "stop"
+
+            if not request.get("stream"):
+                self.send_json(200, {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            deltas = [{"role": "assistant", "content": ""}] + [{"content": t} for t in tokens]
+            for i, delta in enumerate(deltas + [{}]):
+                if i > 1:
+                    time.sleep(state.token_latency)
+                chunk = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None if delta else "stop"}],
+                }
+                self.send_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.send_chunk(b"data: [DONE]\n\n")
+            self.send_chunk(b"")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path.rstrip("/").endswith("/chat/completions"):
+                self.chat(request)
+                return
+            if not self.path.rstrip("/").endswith("/embeddings"):
+                self.send_json(404, {"error": {"message": "not found"}})
+                return
+
+            with state.lock:
+                state.requests += 1
+                limited = random.random() < state.rate_limit
+                if limited:
+                    state.rate_limited += 1
+                else:
+                    state.in_flight += 1
+                    state.max_in_flight = max(state.max_in_flight, state.in_flight)
+
+            if limited:
+                self.send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    {"Retry-After": str(state.retry_after)},
+                )
+                return
+
+            try:
+                time.sleep(state.latency)
+                inputs = request.get("input", [])
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                dims = request.get("dimensions") or state.dims
+                as_base64 = request.get("encoding_format") == "base64"
+
+                data = []
+                for i, text in enumerate(inputs):
+                    vector = fake_embedding(text, dims)
+                    if as_base64:
+                        vector = base64.b64encode(struct.pack(f"<{dims}f", *vector)).decode()
+                    data.append({"object": "embedding", "index": i, "embedding": vector})
+
+                tokens = sum(len(t.split()) for t in inputs)
+                with state.lock:
+                    state.inputs += len(inputs)
+                self.send_json(200, {
+                    "object": "list",
+                    "data": data,
+                    "model": request.get("model", "stub"),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                })
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+    return Handler
+
+
+def start_server(
+    port: int = DEFAULT_PORT,
+    latency: float = 0.0,
+    rate_limit: float = 0.0,
+    retry_after: float = 1.0,
+    dims: int = DEFAULT_DIMS,
+    token_latency: float = 0.0,
+) -> tuple[ThreadingHTTPServer, StubState]:
+    """Start the stub in a background thread. Returns (server, state); call server.shutdown() to stop."""
+    state = StubState(latency, rate_limit, retry_after, dims, token_latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI embeddings server")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--dims", type=int, default=DEFAULT_DIMS, help="Dimensions when the request doesn't set them")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep per request")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds between streamed chat tokens")
+    args = parser.parse_args()
+
+    server, state = start_server(
+        args.port, args.latency, args.rate_limit, args.retry_after, args.dims, args.token_latency
+    )
+    print(f"Stub embedding server on http://127.0.0.1:{args.port}/v1")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n{state.stats()}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
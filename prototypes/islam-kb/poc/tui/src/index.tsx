@@ -12,6 +12,8 @@ const __dirname = path.dirname(fileURLToPath(import.meta.url));
 const POC_DIR = path.join(__dirname, "../..");
 const PYTHON_SCRIPT = path.join(POC_DIR, "query.py");
 const VENV_PYTHON = path.join(POC_DIR, ".venv/bin/python");
+// Started separately with `python query_server.py`; falls back to query.py when not running
+const QUERY_SERVER_URL = process.env.QUERY_SERVER_URL || "http://127.0.0.1:8766";
 
 // Configure marked with terminal renderer
 marked.setOptions({
@@ -21,10 +23,14 @@ marked.setOptions({
 interface Source {
   book: string;
   page: number;
-  score: number;
+  score: number | null; // cosine similarity; null for keyword-only (BM25) matches
   text: string;
 }
 
+function formatScore(score: number | null): string {
+  return score === null ? "(keyword match)" : `(score: ${score.toFixed(3)})`;
+}
+
 interface ConversationTurn {
   question: string;
   answer: string;
@@ -33,6 +39,74 @@ interface ConversationTurn {
 
 type AppState = "input" | "searching" | "streaming";
 
+interface QueryHandlers {
+  onStatus: (text: string) => void;
+  onAnswer: (answer: string) => void;
+  onSources: (sources: Source[]) => void;
+  onError: (message: string) => void;
+  onDone: (answer: string, sources: Source[]) => void;
+}
+
+// Ask a running query_server.py, which streams newline-delimited JSON events.
+// Resolves false when no server is listening, so the caller can spawn query.py.
+async function askServer(
+  question: string,
+  history: { question: string; answer: string }[],
+  handlers: QueryHandlers
+): Promise<boolean> {
+  let response: Response;
+  try {
+    response = await fetch(`${QUERY_SERVER_URL}/query`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ query: question, history }),
+    });
+  } catch {
+    return false;
+  }
+  if (!response.ok || !response.body) {
+    handlers.onError(`Query server error: HTTP ${response.status}`);
+    return true;
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  let answer = "";
+  let sources: Source[] = [];
+  try {
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+      let newline;
+      while ((newline = buffered.indexOf("\n")) >= 0) {
+        const line = buffered.slice(0, newline).trim();
+        buffered = buffered.slice(newline + 1);
+        if (!line) continue;
+        const event = JSON.parse(line);
+        if ("status" in event) {
+          handlers.onStatus(event.status);
+        } else if ("token" in event) {
+          answer += event.token;
+          handlers.onAnswer(answer);
+        } else if ("sources" in event) {
+          sources = event.sources;
+          handlers.onSources(sources);
+        } else if ("error" in event) {
+          handlers.onError(event.error);
+          return true;
+        }
+      }
+    }
+  } catch {
+    handlers.onError("Lost connection to the query server.");
+    return true;
+  }
+  handlers.onDone(answer.trim(), sources);
+  return true;
+}
+
 function Spinner() {
   const [frame, setFrame] = useState(0);
   const frames = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"];
@@ -143,94 +217,127 @@ function App() {
     setQuery("");
     setError("");
 
-    // Build args with conversation history for context-aware search
-    const args = [PYTHON_SCRIPT, "--stream"];
-    if (conversation.length > 0) {
-      // Pass conversation history as JSON for query synthesis
-      const historyJson = JSON.stringify(
-        conversation.map((t) => ({ question: t.question, answer: t.answer }))
-      );
-      args.push("--history", historyJson);
-    }
-    args.push(value);
+    const history = conversation.map((t) => ({ question: t.question, answer: t.answer }));
 
-    const proc = spawn(VENV_PYTHON, args, {
-      cwd: POC_DIR,
+    // Prefer a running query_server.py (warm clients, no Python startup per turn)
+    const handled = askServer(value, history, {
+      onStatus: (text) => {
+        if (text.includes("Searching")) {
+          setStatus("Searching knowledge base...");
+        } else if (text.includes("Generating")) {
+          setStatus("Generating answer...");
+          setState("streaming");
+        }
+      },
+      onAnswer: (answer) => {
+        setState("streaming");
+        setCurrentAnswer(answer);
+      },
+      onSources: setCurrentSources,
+      onError: (message) => {
+        setError(message);
+        setState("input");
+      },
+      onDone: (answer, sources) => {
+        if (answer) {
+          setConversation((prev) => [...prev, { question: value, answer, sources }]);
+        }
+        setState("input");
+      },
     });
 
-    let fullOutput = "";
-    let stderrOutput = "";
+    const runSubprocess = () => {
+      // Build args with conversation history for context-aware search
+      const args = [PYTHON_SCRIPT, "--stream"];
+      if (conversation.length > 0) {
+        // Pass conversation history as JSON for query synthesis
+        const historyJson = JSON.stringify(history);
+        args.push("--history", historyJson);
+      }
+      args.push(value);
 
-    proc.stdout.on("data", (data: Buffer) => {
-      const text = data.toString();
-      fullOutput += text;
+      const proc = spawn(VENV_PYTHON, args, {
+        cwd: POC_DIR,
+      });
 
-      if (fullOutput.includes("---SOURCES---")) {
-        const [answerPart, sourcesPart] = fullOutput.split("---SOURCES---");
-        setCurrentAnswer(answerPart.trim());
+      let fullOutput = "";
+      let stderrOutput = "";
+
+      proc.stdout.on("data", (data: Buffer) => {
+        const text = data.toString();
+        fullOutput += text;
+
+        if (fullOutput.includes("---SOURCES---")) {
+          const [answerPart, sourcesPart] = fullOutput.split("---SOURCES---");
+          setCurrentAnswer(answerPart.trim());
+
+          try {
+            const parsedSources = JSON.parse(sourcesPart.trim());
+            setCurrentSources(parsedSources);
+          } catch {
+            // Sources not fully received yet
+          }
+        } else {
+          setState("streaming");
+          setCurrentAnswer(fullOutput);
+        }
+      });
 
-        try {
-          const parsedSources = JSON.parse(sourcesPart.trim());
-          setCurrentSources(parsedSources);
-        } catch {
-          // Sources not fully received yet
+      proc.stderr.on("data", (data: Buffer) => {
+        const text = data.toString().trim();
+        stderrOutput += text + "\n";
+        if (text.includes("Searching")) {
+          setStatus("Searching knowledge base...");
+        } else if (text.includes("Generating")) {
+          setStatus("Generating answer...");
+          setState("streaming");
         }
-      } else {
-        setState("streaming");
-        setCurrentAnswer(fullOutput);
-      }
-    });
+      });
 
-    proc.stderr.on("data", (data: Buffer) => {
-      const text = data.toString().trim();
-      stderrOutput += text + "\n";
-      if (text.includes("Searching")) {
-        setStatus("Searching knowledge base...");
-      } else if (text.includes("Generating")) {
-        setStatus("Generating answer...");
-        setState("streaming");
-      }
-    });
+      proc.on("close", (code) => {
+        // Check for errors
+        if (code !== 0 || (!fullOutput.trim() && stderrOutput.includes("Error"))) {
+          // Extract error message
+          const errorMatch = stderrOutput.match(/Error.*?:(.*?)(?:\n|$)/i)
+            || stderrOutput.match(/(RateLimitError|insufficient_quota|exceeded.*quota)/i);
+          const errorMsg = errorMatch
+            ? errorMatch[0].trim()
+            : "An error occurred. Check your API key and quota.";
+          setError(errorMsg);
+          setState("input");
+          return;
+        }
 
-    proc.on("close", (code) => {
-      // Check for errors
-      if (code !== 0 || (!fullOutput.trim() && stderrOutput.includes("Error"))) {
-        // Extract error message
-        const errorMatch = stderrOutput.match(/Error.*?:(.*?)(?:\n|$)/i)
-          || stderrOutput.match(/(RateLimitError|insufficient_quota|exceeded.*quota)/i);
-        const errorMsg = errorMatch
-          ? errorMatch[0].trim()
-          : "An error occurred. Check your API key and quota.";
-        setError(errorMsg);
-        setState("input");
-        return;
-      }
+        // Parse answer and sources from full output
+        let answer = fullOutput.trim();
+        let parsedSources: Source[] = [];
+
+        if (fullOutput.includes("---SOURCES---")) {
+          const [answerPart, sourcesPart] = fullOutput.split("---SOURCES---");
+          answer = answerPart.trim();
+          try {
+            parsedSources = JSON.parse(sourcesPart.trim());
+          } catch {
+            // Failed to parse sources
+          }
+        }
 
-      // Parse answer and sources from full output
-      let answer = fullOutput.trim();
-      let parsedSources: Source[] = [];
-
-      if (fullOutput.includes("---SOURCES---")) {
-        const [answerPart, sourcesPart] = fullOutput.split("---SOURCES---");
-        answer = answerPart.trim();
-        try {
-          parsedSources = JSON.parse(sourcesPart.trim());
-        } catch {
-          // Failed to parse sources
+        if (answer) {
+          setConversation((prev) => [
+            ...prev,
+            {
+              question: value,
+              answer,
+              sources: parsedSources,
+            },
+          ]);
         }
-      }
+        setState("input");
+      });
+    };
 
-      if (answer) {
-        setConversation((prev) => [
-          ...prev,
-          {
-            question: value,
-            answer,
-            sources: parsedSources,
-          },
-        ]);
-      }
-      setState("input");
+    handled.then((ok) => {
+      if (!ok) runSubprocess();
     });
   };
 
@@ -357,7 +464,7 @@ function App() {
             {lastSources[selectedSource].page}
             <Text color="gray">
               {" "}
-              (score: {lastSources[selectedSource].score.toFixed(3)})
+              {formatScore(lastSources[selectedSource].score)}
             </Text>
           </Text>
           <Box marginTop={1}>
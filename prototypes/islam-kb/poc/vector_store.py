@@ -0,0 +1,746 @@
+#!/usr/bin/env python3
+"""
+Vector stores behind one interface (VectorStore): QdrantStore, over a Qdrant
+collection (embedded or a server), and NumpyVectorStore, an in-process
+alternative to the embedded Qdrant store that opens instantly and searches
+with NumPy matrix multiplies. clients.get_vector_store picks one by VECTOR_STORE.
+
+NumpyVectorStore appends vectors (normalised, float32) to one raw matrix file
+that is memory-mapped for search; point IDs, payloads and the filterable
+fields live in SQLite next to it, as in lexical_index.py. Search scores the
+matrix in blocks of NUMPY_SEARCH_BLOCK rows and keeps the top k with
+argpartition; search_many scores a batch of queries with one multiply per
+block. Replaced and deleted points leave dead rows in the matrix until `compact`.
+Writers hold an exclusive lock on the store directory (fcntl.flock) across
+processes; readers use only the rows committed to SQLite and ignore anything
+a writer has appended past them, re-reading the count every
+FINGERPRINT_REFRESH_SECONDS.
+
+Optionally, `build-ivf` clusters the vectors (spherical k-means) into an IVF
+index; searches then score only the rows in the IVF_PROBES nearest clusters,
+plus any rows added since the index was built. Exact search needs no index.
+
+Set VECTOR_STORE=numpy to use the NumPy store for ingest and queries (clients.get_vector_store);
+`from-qdrant` fills it from an existing Qdrant collection without re-embedding.
+
+    python vector_store.py from-qdrant
+    python vector_store.py build-ivf --lists 64
+    python vector_store.py stats
+"""
+
+import os
+import sys
+import json
+import fcntl
+import time
+import uuid
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from typing import Protocol
+from contextlib import contextmanager
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.models import (
+    CollectionConfig,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchAny,
+    MatchValue,
+    PointStruct,
+    Prefetch,
+    QuantizationSearchParams,
+    QueryRequest,
+    SearchParams,
+    VectorParams,
+)
+
+from lexical_index import filter_values
+
+# Configuration
+VECTOR_STORE = os.getenv("VECTOR_STORE", "qdrant")  # "qdrant" (QdrantStore), or "numpy" for NumpyVectorStore
+COLLECTION_NAME = "islamic_books"
+FULL_VECTOR = "full"
+SHORT_VECTOR = "short"
+QDRANT_UPSERT_BATCH = 100  # points per upsert request
+# Stores cache what they know of the stored points; writes by another process
+# (e.g. pipeline.py while query_server.py runs) show up in searches and
+# fingerprint after at most this long
+FINGERPRINT_REFRESH_SECONDS = 10.0
+# Used when the collection is quantized (pipeline.QUANTIZATION): fetch
+# limit * oversampling candidates by quantized score, re-rank with float32 originals
+QUANTIZATION_RESCORE = True
+QUANTIZATION_OVERSAMPLING = 2.0
+# Used when the collection stores short Matryoshka vectors (pipeline.SHORTLIST_DIMS):
+# shortlist limit * SHORTLIST_OVERSAMPLING on them, then re-score on the full vectors.
+# RERANK = False searches the short vectors only.
+RERANK = True
+SHORTLIST_OVERSAMPLING = 4
+NUMPY_STORE_PATH = Path(__file__).parent / "numpy_store"
+NUMPY_SEARCH_BLOCK = 16384  # rows scored per matrix multiply
+GATHER_FRACTION = 0.2  # below this share of rows eligible, score just those rows
+IVF_PROBES = 8  # clusters searched per query
+IVF_TRAIN_SAMPLE = 20000  # vectors k-means is fitted on
+IVF_ITERATIONS = 10
+
+
+class VectorStore(Protocol):
+    """What ingest and search need from a vector store. Vectors are full-size embeddings."""
+
+    dims: int | None  # query embedding size; None while nothing is stored
+    thread_safe: bool  # True if searches may run concurrently with each other and with upserts
+    location: str  # for messages: where the vectors live
+
+    def upsert(self, ids: list[str], vectors: list[list[float]] | np.ndarray, payloads: list[dict]): ...
+
+    def delete_pdf(self, pdf_filename: str): ...
+
+    def set_author(self, pdf_filename: str, author: str): ...
+
+    def search_many(
+        self, vectors: list[list[float]] | np.ndarray, limit: int, filters: dict[str, list[str]] | None = None
+    ) -> list[list[dict]]: ...
+
+    def fingerprint(self) -> str:
+        """Changes with every upsert, delete_pdf and set_author, and when the vector layout changes."""
+        ...
+
+    def __len__(self) -> int: ...
+
+
+def normalized(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """The k best (rows, scores), best first."""
+    if len(scores) > k:
+        best = np.argpartition(-scores, k)[:k]
+        rows, scores = rows[best], scores[best]
+    order = np.argsort(-scores, kind="stable")
+    return rows[order], scores[order]
+
+
+def probe_mask(ivf: dict, query: np.ndarray, rows: int) -> np.ndarray:
+    """Rows in the IVF_PROBES clusters nearest the query, plus every row added after the index was built."""
+    nearest = np.argsort(-(ivf["centroids"] @ query))[:IVF_PROBES]
+    mask = np.ones(rows, dtype=bool)
+    covered = min(len(ivf["assignment"]), rows)
+    mask[:covered] = np.isin(ivf["assignment"][:covered], nearest)
+    return mask
+
+
+def rank(
+    matrix: np.ndarray, allowed: np.ndarray, queries: np.ndarray, limit: int
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """
+    Best (rows, scores) among the allowed rows for each of the (normalised) query
+    vectors. Scores just the allowed rows when they are few, else scans the whole
+    matrix in blocks; either way each block is one multiply for all the queries.
+    """
+    selected = np.flatnonzero(allowed)
+    if not len(selected):
+        return [(selected, np.zeros(0, dtype=np.float32)) for _ in queries]
+    if len(selected) < GATHER_FRACTION * len(allowed):
+        scores = np.concatenate([
+            matrix[selected[i:i + NUMPY_SEARCH_BLOCK]] @ queries.T
+            for i in range(0, len(selected), NUMPY_SEARCH_BLOCK)
+        ])
+        return [top_k(selected, scores[:, j], limit) for j in range(len(queries))]
+
+    best = [([], []) for _ in queries]
+    for start in range(0, len(allowed), NUMPY_SEARCH_BLOCK):
+        block = matrix[start:start + NUMPY_SEARCH_BLOCK] @ queries.T
+        block[~allowed[start:start + NUMPY_SEARCH_BLOCK]] = -np.inf
+        rows = np.arange(start, start + len(block))
+        for j, (best_rows, best_scores) in enumerate(best):
+            r, s = top_k(rows, block[:, j], limit)
+            best_rows.append(r)
+            best_scores.append(s)
+    ranked = []
+    for best_rows, best_scores in best:
+        rows, scores = top_k(np.concatenate(best_rows), np.concatenate(best_scores), limit)
+        keep = np.isfinite(scores)
+        ranked.append((rows[keep], scores[keep]))
+    return ranked
+
+
+def point_id(value) -> str:
+    """
+    One spelling per point ID: undashed hex for UUIDs, as pipeline.chunk_id
+    writes them (a Qdrant server returns them dashed), else the ID as a string.
+    """
+    try:
+        return uuid.UUID(str(value)).hex
+    except ValueError:
+        return str(value)
+
+
+def search_result(payload: dict, score: float) -> dict:
+    """A search hit in the shape query.search returns."""
+    return {
+        "text": payload["text"],
+        "book": payload["book"],
+        "page": payload["page"],
+        "pdf_filename": payload.get("pdf_filename"),
+        "chunk_index": payload.get("chunk_index"),
+        "author": payload.get("author", ""),
+        "score": score,
+    }
+
+
+def qdrant_filter(filters: dict[str, list[str]] | None) -> Filter | None:
+    """Qdrant filter for {"author": [...], "book": [...], ...}: any listed value of every field."""
+    if not filters:
+        return None
+    return Filter(
+        must=[FieldCondition(key=field, match=MatchAny(any=values)) for field, values in filter_values(filters).items()]
+    )
+
+
+def pdf_filter(pdf_filename: str) -> Filter:
+    return Filter(must=[FieldCondition(key="pdf_filename", match=MatchValue(value=pdf_filename))])
+
+
+def search_params(config: CollectionConfig) -> SearchParams | None:
+    """Rescoring params if the collection is quantized, else None (exact/HNSW search as-is)."""
+    if config.quantization_config is None:
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=QUANTIZATION_RESCORE,
+            oversampling=QUANTIZATION_OVERSAMPLING,
+        )
+    )
+
+
+def dense_query(
+    embedding: list[float],
+    vectors: VectorParams | dict[str, VectorParams],
+    limit: int,
+    query_filter: Filter | None,
+    params: SearchParams | None,
+) -> QueryRequest:
+    """The Qdrant query for one question embedding, for the collection's vector layout."""
+    if not isinstance(vectors, dict):
+        return QueryRequest(query=embedding, filter=query_filter, limit=limit, params=params, with_payload=True)
+    short_embedding = normalized(np.asarray(embedding[:vectors[SHORT_VECTOR].size], dtype=np.float64)).tolist()
+    if RERANK:
+        return QueryRequest(
+            prefetch=Prefetch(
+                query=short_embedding,
+                using=SHORT_VECTOR,
+                filter=query_filter,
+                limit=limit * SHORTLIST_OVERSAMPLING,
+                params=params,
+            ),
+            query=embedding,
+            using=FULL_VECTOR,
+            limit=limit,
+            with_payload=True,
+        )
+    return QueryRequest(
+        query=short_embedding,
+        using=SHORT_VECTOR,
+        filter=query_filter,
+        limit=limit,
+        params=params,
+        with_payload=True,
+    )
+
+
+def points(
+    ids: list[str],
+    vectors: list[list[float]],
+    payloads: list[dict],
+    layout: VectorParams | dict[str, VectorParams],
+) -> list[PointStruct]:
+    """Qdrant points for full-size vectors in the collection's vector layout."""
+    if not isinstance(layout, dict):
+        return [PointStruct(id=i, vector=v, payload=p) for i, v, p in zip(ids, vectors, payloads)]
+    short_dims = layout[SHORT_VECTOR].size
+    return [
+        PointStruct(
+            id=i,
+            vector={FULL_VECTOR: v, SHORT_VECTOR: normalized(np.asarray(v[:short_dims], dtype=np.float64)).tolist()},
+            payload=p,
+        )
+        for i, v, p in zip(ids, vectors, payloads)
+    ]
+
+
+class QdrantStore:
+    """
+    VectorStore over a Qdrant collection, in whichever vector layout it was
+    created with (pipeline.setup_qdrant): one unnamed vector, or full + short
+    named vectors, where the short one is the re-normalised prefix of the full one.
+    """
+
+    def __init__(self, client: QdrantClient, collection: str = COLLECTION_NAME, thread_safe: bool = False,
+                 location: str = ""):
+        self.client = client
+        self.collection = collection
+        # The embedded store isn't safe for concurrent use; a server handles it itself
+        self.thread_safe = thread_safe
+        self.location = location or collection
+        self._config: CollectionConfig | None = None
+        self._fingerprint: str | None = None
+        self._fingerprint_at = 0.0
+
+    def config(self, refresh: bool = False) -> CollectionConfig:
+        """
+        The collection config, fetched once. Requests that fail on it are retried
+        with a fresh one (_with_config), so a rebuilt collection is picked up.
+        """
+        if self._config is None or refresh:
+            self._config = self.client.get_collection(self.collection).config
+        return self._config
+
+    def _with_config(self, request):
+        """request(config), retried once if the collection's schema changed since config was fetched."""
+        config = self.config()
+        try:
+            return request(config)
+        except (ValueError, UnexpectedResponse):  # local mode / server errors for a vector layout mismatch
+            fresh = self.config(refresh=True)
+            if fresh == config:
+                raise
+            return request(fresh)
+
+    @property
+    def dims(self) -> int | None:
+        """Full vector size; None until pipeline.setup_qdrant has created the collection."""
+        try:
+            vectors = self.config().params.vectors
+        except (ValueError, UnexpectedResponse):  # local mode / server errors for a missing collection
+            if self.client.collection_exists(self.collection):
+                raise
+            return None
+        return vectors[FULL_VECTOR].size if isinstance(vectors, dict) else vectors.size
+
+    def _new_generation(self):
+        """Record a write: a new generation in the collection metadata, so fingerprint changes."""
+        self.client.update_collection(self.collection, metadata={"generation": uuid.uuid4().hex})
+        self._fingerprint = None
+
+    def upsert(self, ids: list[str], vectors: list[list[float]] | np.ndarray, payloads: list[dict]):
+        """Add points, replacing any with the same ID, QDRANT_UPSERT_BATCH per request."""
+        vectors = [v.tolist() if isinstance(v, np.ndarray) else v for v in vectors]
+        for i in range(0, len(ids), QDRANT_UPSERT_BATCH):
+            batch = slice(i, i + QDRANT_UPSERT_BATCH)
+            self._with_config(lambda config: self.client.upsert(
+                collection_name=self.collection,
+                points=points(ids[batch], vectors[batch], payloads[batch], config.params.vectors),
+            ))
+        self._new_generation()
+
+    def delete_pdf(self, pdf_filename: str):
+        self.client.delete(
+            collection_name=self.collection, points_selector=FilterSelector(filter=pdf_filter(pdf_filename))
+        )
+        self._new_generation()
+
+    def set_author(self, pdf_filename: str, author: str):
+        self.client.set_payload(self.collection, payload={"author": author}, points=pdf_filter(pdf_filename))
+        self._new_generation()
+
+    def search_many(
+        self,
+        vectors: list[list[float]] | np.ndarray,
+        limit: int,
+        filters: dict[str, list[str]] | None = None,
+    ) -> list[list[dict]]:
+        """Best `limit` points for each query vector, in one batch request."""
+        if not len(vectors):
+            return []
+        query_filter = qdrant_filter(filters)
+        embeddings = [list(map(float, v)) for v in vectors]
+        responses = self._with_config(lambda config: self.client.query_batch_points(
+            collection_name=self.collection,
+            requests=[
+                dense_query(e, config.params.vectors, limit, query_filter, search_params(config)) for e in embeddings
+            ],
+        ))
+        return [[search_result(r.payload, r.score) for r in response.points] for response in responses]
+
+    def fingerprint(self) -> str:
+        """
+        Point count, vector sizes and the generation of the last write (_new_generation),
+        fetched at most every FINGERPRINT_REFRESH_SECONDS. The count covers
+        collections written by other tools, which don't set a generation.
+        """
+        if self._fingerprint is None or time.monotonic() - self._fingerprint_at > FINGERPRINT_REFRESH_SECONDS:
+            info = self.client.get_collection(self.collection)
+            self._config = info.config
+            vectors = info.config.params.vectors
+            sizes = {name: v.size for name, v in vectors.items()} if isinstance(vectors, dict) else vectors.size
+            generation = (info.config.metadata or {}).get("generation", "")
+            self._fingerprint = f"{info.points_count}:{sizes}:{generation}"
+            self._fingerprint_at = time.monotonic()
+        return self._fingerprint
+
+    def __len__(self) -> int:
+        return self.client.count(self.collection, exact=True).count
+
+
+class NumpyVectorStore:
+    """VectorStore with points in a memory-mapped float32 matrix, keyed by ID, with payloads in SQLite."""
+
+    # Searches score a snapshot of the matrix outside the lock
+    thread_safe = True
+
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path or NUMPY_STORE_PATH)
+        self.location = str(self.path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.path / "vectors.f32"
+        self.ivf_path = self.path / "ivf.npz"
+        # Written by the ingest upsert thread, read by query server threads
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path / "points.sqlite", timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS points (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                pdf_filename TEXT NOT NULL DEFAULT '',
+                book TEXT NOT NULL DEFAULT '',
+                author TEXT NOT NULL DEFAULT '',
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS points_pdf_filename ON points (pdf_filename);
+            CREATE INDEX IF NOT EXISTS points_book ON points (book);
+            CREATE INDEX IF NOT EXISTS points_author ON points (author);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        self.dims: int | None = None
+        self.rows = 0  # committed rows in the matrix file, live or not
+        self.generation = ""  # random ID of the last write, for fingerprint
+        self._matrix = None
+        self._live = None
+        self.ivf = None
+        self._read_meta()
+        self._undash_ids()
+
+    @contextmanager
+    def _writer(self):
+        """Exclusive across processes: held while the matrix file or its committed row count changes."""
+        with open(self.path / "writer.lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _set_meta(self, **values):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [(k, str(v)) for k, v in values.items()]
+        )
+
+    def _read_meta(self):
+        """Load the committed row count, dims and generation. Call with the lock held."""
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        self._meta_read_at = time.monotonic()
+        rows, generation = int(meta.get("rows", 0)), meta.get("generation", "")
+        self.dims = int(meta["dims"]) if "dims" in meta else None
+        if rows < self.rows or not self.rows:
+            # Opened, or compacted by another process (which drops the IVF index)
+            self.ivf = dict(np.load(self.ivf_path)) if self.ivf_path.exists() else None
+        if (rows, generation) != (self.rows, self.generation):
+            self.rows, self.generation = rows, generation
+            self._changed()
+
+    def _undash_ids(self):
+        """
+        Respell dashed UUIDs (from-qdrant from a server before point_id existed),
+        dropping those since re-upserted by pipeline.py under the undashed ID.
+        """
+        dashed = "id GLOB '????????-????-????-????-????????????'"
+        with self.lock:
+            if self.conn.execute(f"SELECT 1 FROM points WHERE {dashed} LIMIT 1").fetchone() is None:
+                return
+            with self._writer():
+                self.conn.execute(
+                    f"DELETE FROM points WHERE {dashed} AND lower(replace(id, '-', '')) IN (SELECT id FROM points)"
+                )
+                self.conn.execute(f"UPDATE points SET id = lower(replace(id, '-', '')) WHERE {dashed}")
+                self._new_generation()
+                self.conn.commit()
+                self._changed()
+
+    def _refresh(self):
+        """_read_meta if it's older than FINGERPRINT_REFRESH_SECONDS. Call with the lock held."""
+        if time.monotonic() - self._meta_read_at > FINGERPRINT_REFRESH_SECONDS:
+            self._read_meta()
+
+    def _changed(self):
+        self._matrix = None
+        self._live = None
+
+    def _new_generation(self):
+        """Record a write (call before its commit), so fingerprint changes."""
+        self.generation = uuid.uuid4().hex
+        self._set_meta(generation=self.generation)
+
+    def _state(self) -> tuple[np.ndarray | None, np.ndarray]:
+        """(matrix, live row mask), opened on first use after a change. Call with the lock held."""
+        if self._matrix is None and self.rows:
+            self._matrix = np.memmap(self.vectors_path, dtype="<f4", mode="r", shape=(self.rows, self.dims))
+        if self._live is None:
+            self._live = self._mask("SELECT row FROM points", ())
+        return self._matrix, self._live
+
+    def _mask(self, sql: str, params: tuple) -> np.ndarray:
+        mask = np.zeros(self.rows, dtype=bool)
+        rows = np.fromiter((r for (r,) in self.conn.execute(sql, params)), dtype=np.int64)
+        mask[rows[rows < self.rows]] = True  # rows committed since self.rows was read come with the next refresh
+        return mask
+
+    def upsert(self, ids: list[str], vectors: list[list[float]] | np.ndarray, payloads: list[dict]):
+        """Add points, replacing any with the same ID."""
+        if not ids:
+            return
+        matrix = normalized(np.asarray(vectors, dtype=np.float32)).astype("<f4")
+        with self.lock, self._writer():
+            self._read_meta()  # another process may have written since
+            if self.dims is None:
+                self.dims = matrix.shape[1]
+                self._set_meta(dims=self.dims)
+            elif matrix.shape[1] != self.dims:
+                raise ValueError(f"Store holds {self.dims}-dim vectors, got {matrix.shape[1]}")
+            with open(self.vectors_path, "ab") as f:
+                # Drop rows appended by a write that didn't get to commit; safe only under _writer
+                f.truncate(self.rows * self.dims * 4)
+                f.write(matrix.tobytes())
+            start = self.rows
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO points (row, id, pdf_filename, book, author, payload)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (start + i, point_id(raw_id), p.get("pdf_filename", ""), p.get("book", ""), p.get("author", ""),
+                     json.dumps(p, ensure_ascii=False))
+                    for i, (raw_id, p) in enumerate(zip(ids, payloads))
+                ],
+            )
+            self.rows += len(ids)
+            self._set_meta(rows=self.rows)
+            self._new_generation()
+            self.conn.commit()
+            self._changed()
+
+    def delete_pdf(self, pdf_filename: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM points WHERE pdf_filename = ?", (pdf_filename,))
+            self._new_generation()
+            self.conn.commit()
+            self._changed()
+
+    def set_author(self, pdf_filename: str, author: str):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE points SET author = ?, payload = json_set(payload, '$.author', ?) WHERE pdf_filename = ?",
+                (author, author, pdf_filename),
+            )
+            self._new_generation()
+            self.conn.commit()
+
+    def search(
+        self,
+        vector: list[float] | np.ndarray,
+        limit: int,
+        filters: dict[str, list[str]] | None = None,
+    ) -> list[dict]:
+        """Best `limit` points by cosine similarity, in the same shape as query.dense_search results."""
+        return self.search_many([vector], limit, filters)[0]
+
+    def search_many(
+        self,
+        vectors: list[list[float]] | np.ndarray,
+        limit: int,
+        filters: dict[str, list[str]] | None = None,
+    ) -> list[list[dict]]:
+        """search for several query vectors at once: one pass over the matrix scores them all."""
+        if not len(vectors):
+            return []
+        queries = normalized(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1))
+        with self.lock:
+            self._refresh()
+            matrix, allowed = self._state()
+            if filters:
+                where = " AND ".join(f"{field} IN ({','.join('?' * len(values))})"
+                                     for field, values in filter_values(filters).items())
+                params = tuple(v for values in filter_values(filters).values() for v in values)
+                allowed = self._mask(f"SELECT row FROM points WHERE {where}", params)
+            ivf = self.ivf
+        if matrix is None or not allowed.any():
+            return [[] for _ in queries]
+
+        # The lock isn't held while scoring: the matrix file is append-only until compact
+        if ivf is None:
+            ranked = rank(matrix, allowed, queries, limit)
+        else:
+            # Each query probes its own clusters
+            ranked = [rank(matrix, allowed & probe_mask(ivf, q, len(allowed)), q[None], limit)[0] for q in queries]
+
+        wanted = sorted({int(r) for rows, _ in ranked for r in rows})
+        payloads = {}
+        with self.lock:
+            for i in range(0, len(wanted), 500):  # SQLite's bound-parameter limit
+                batch = wanted[i:i + 500]
+                payloads.update(self.conn.execute(
+                    f"SELECT row, payload FROM points WHERE row IN ({','.join('?' * len(batch))})", batch
+                ))
+        results = []
+        for rows, scores in ranked:
+            hits = []
+            for row, score in zip(rows, scores):
+                if int(row) not in payloads:
+                    continue  # deleted since scoring
+                hits.append(search_result(json.loads(payloads[int(row)]), float(score)))
+            results.append(hits)
+        return results
+
+    def build_ivf(self, lists: int | None = None, seed: int = 0) -> int:
+        """Cluster the live vectors into an IVF index (about sqrt(n) lists by default). Returns the list count."""
+        with self.lock:
+            matrix, live = self._state()
+        rows = np.flatnonzero(live)
+        if not len(rows):
+            raise ValueError("Store is empty")
+        lists = min(lists or max(1, int(np.sqrt(len(rows)))), len(rows))
+        rng = np.random.default_rng(seed)
+        sample = matrix[np.sort(rng.choice(rows, min(IVF_TRAIN_SAMPLE, len(rows)), replace=False))]
+        centroids = sample[rng.choice(len(sample), lists, replace=False)]
+        for _ in range(IVF_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(lists):
+                members = sample[labels == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = normalized(centroids)
+
+        assignment = np.concatenate([
+            np.argmax(matrix[start:start + NUMPY_SEARCH_BLOCK] @ centroids.T, axis=1)
+            for start in range(0, len(live), NUMPY_SEARCH_BLOCK)
+        ]).astype(np.int32)
+        np.savez(self.ivf_path, centroids=centroids.astype(np.float32), assignment=assignment)
+        with self.lock:
+            self.ivf = dict(np.load(self.ivf_path))
+        return lists
+
+    def drop_ivf(self):
+        with self.lock:
+            self.ivf_path.unlink(missing_ok=True)
+            self.ivf = None
+
+    def compact(self) -> int:
+        """
+        Rewrite the matrix without dead rows. Returns rows removed. Drops the
+        IVF index (rebuild it after); don't run while another process writes.
+        """
+        with self.lock, self._writer():
+            self._read_meta()
+            matrix, live = self._state()
+            rows = np.flatnonzero(live)
+            removed = self.rows - len(rows)
+            if not removed:
+                return 0
+            tmp_path = self.vectors_path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                for i in range(0, len(rows), NUMPY_SEARCH_BLOCK):
+                    f.write(np.ascontiguousarray(matrix[rows[i:i + NUMPY_SEARCH_BLOCK]]).tobytes())
+            # Rows only move down, so renumbering in order never collides
+            self.conn.executemany("UPDATE points SET row = ? WHERE row = ?", enumerate(int(r) for r in rows))
+            self.rows = len(rows)
+            self._set_meta(rows=self.rows)
+            self._matrix = None
+            tmp_path.replace(self.vectors_path)
+            self.conn.commit()
+            self._changed()
+            self.drop_ivf()
+            return removed
+
+    def fingerprint(self) -> str:
+        """Vector size and the generation of the last write, re-read every FINGERPRINT_REFRESH_SECONDS."""
+        with self.lock:
+            self._refresh()
+            return f"{self.dims}:{self.generation}"
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+_default_store: NumpyVectorStore | None = None
+_default_lock = threading.Lock()
+
+
+def get_default_store() -> NumpyVectorStore:
+    """Process-wide store at NUMPY_STORE_PATH, opened (and created if needed) on first use."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = NumpyVectorStore()
+        return _default_store
+
+
+def copy_from_qdrant(client, store: NumpyVectorStore, collection: str, vector_name: str = "full") -> int:
+    """Copy every point of a Qdrant collection (its full vectors, for named layouts). Returns points copied."""
+    copied, offset = 0, None
+    while True:
+        records, offset = client.scroll(collection, limit=256, offset=offset, with_payload=True, with_vectors=True)
+        if records:
+            vectors = [r.vector[vector_name] if isinstance(r.vector, dict) else r.vector for r in records]
+            store.upsert([point_id(r.id) for r in records], vectors, [r.payload or {} for r in records])
+            copied += len(records)
+            print(f"Copied {copied} points", flush=True)
+        if offset is None:
+            return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the NumPy vector store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Points, dead rows, size and IVF index")
+    copy_cmd = sub.add_parser("from-qdrant", help="Fill the store from a Qdrant collection")
+    copy_cmd.add_argument("--path", type=Path, default=Path(__file__).parent / "qdrant_data")
+    copy_cmd.add_argument("--url", help="Qdrant server (default QDRANT_URL, else the embedded store)")
+    copy_cmd.add_argument("--collection", default="islamic_books")
+    ivf_cmd = sub.add_parser("build-ivf", help="Build (or rebuild) the IVF index")
+    ivf_cmd.add_argument("--lists", type=int, help="Clusters (default about sqrt(points))")
+    sub.add_parser("drop-ivf", help="Remove the IVF index (exact search)")
+    sub.add_parser("compact", help="Rewrite the matrix without replaced and deleted rows")
+    args = parser.parse_args()
+
+    store = get_default_store()
+    start = time.perf_counter()
+    if args.command == "stats":
+        size_mb = sum(p.stat().st_size for p in store.path.iterdir()) / 1024 ** 2
+        ivf = f"{len(store.ivf['centroids'])} lists" if store.ivf is not None else "none"
+        print(f"{len(store)} points, {store.rows - len(store)} dead rows, {store.dims} dims, "
+              f"{size_mb:.1f} MB, IVF index: {ivf}")
+    elif args.command == "from-qdrant":
+        from clients import get_qdrant_client
+        copied = copy_from_qdrant(get_qdrant_client(args.path, args.url), store, args.collection)
+        print(f"Copied {copied} points in {time.perf_counter() - start:.1f}s to {store.path}")
+    elif args.command == "build-ivf":
+        if not len(store):
+            print("Store is empty; run from-qdrant or pipeline.py with VECTOR_STORE=numpy first")
+            sys.exit(1)
+        lists = store.build_ivf(args.lists)
+        print(f"Built IVF index with {lists} lists in {time.perf_counter() - start:.1f}s")
+    elif args.command == "drop-ivf":
+        store.drop_ivf()
+        print("IVF index removed")
+    else:
+        print(f"Removed {store.compact()} dead rows")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()